@@ -0,0 +1,787 @@
+# aggregation.py
+# 此檔案包含跨評審、輸入與重複取樣的評分統計彙總。
+# - ScoreTable: 以欄式陣列保存每則評審的總體評分；模型、評審與輸入以整數代碼儲存，
+#   每則評分只佔 20 位元組，十萬則以上的評分也只需數 MB 記憶體。
+# - summarize: 計算平均評分、評審間一致性、bootstrap 信賴區間與模型兩兩勝率。
+#   已安裝 NumPy 時以向量化運算完成 (十萬則評分約在 0.1 秒內)，
+#   否則退回純 Python 實作 (統計定義相同，適合小型資料集)。
+# - render_summary: 將統計結果轉為報告的 Markdown 段落。
+# 直接執行時可彙總一或多個檢查點日誌或執行結果檔案 (--save_run 寫出的 .cmrun)，例如:
+#   python aggregation.py --journal run1.journal.jsonl --journal run2.journal.jsonl
+#   python aggregation.py --run run1.cmrun --run run2.cmrun
+# 多個日誌中相同的模型、評審與輸入組合視為重複取樣，先取平均再計算統計值。
+
+import argparse  # 用於解析命令列參數
+import json  # 用於讀取檢查點日誌
+import logging  # 用於記錄程式運行訊息
+import math  # 用於純 Python 實作的平方根與 NaN 判斷
+import random  # 用於純 Python 實作的 bootstrap 抽樣
+import sys  # 用於輸出彙總結果
+import time  # 用於量測彙總耗時
+from array import array  # 用於欄式儲存評分資料
+from collections import Counter  # 用於純 Python 實作的 bootstrap 抽樣次數
+
+from results import ModelResult, iter_run_scores  # 處理結果的記錄類型與執行結果檔案
+
+# 可選的 NumPy，用於向量化計算；未安裝時使用純 Python 實作。
+# 匯入 NumPy 約需 0.1 秒，因此延後到第一次計算統計時才匯入 (見 _load_numpy)，
+# 只顯示說明或在統計前就失敗的執行不需要付出這個成本
+np = None
+_numpy_checked = False
+
+# 預設的 bootstrap 重新抽樣次數
+DEFAULT_BOOTSTRAP_SAMPLES = 1000
+# 預設的信賴水準
+DEFAULT_CONFIDENCE = 0.95
+# NumPy 實作中每批 bootstrap 抽樣矩陣的最大元素數量，用於限制記憶體用量
+_BOOTSTRAP_BATCH_ELEMENTS = 1 << 20
+
+
+def item_key(task, record_id, input_text_snippet) -> tuple:
+    """
+    取得輸入項目鍵，不同模型對同一輸入的結果會得到相同的鍵。
+
+    Args:
+        task (str): 任務類型。
+        record_id (str or None): 記錄識別碼；單一輸入模式為 None。
+        input_text_snippet (str): 輸入文字片段。
+
+    Returns:
+        tuple: 資料集模式為 (任務類型, 記錄識別碼)，單一輸入模式為 (任務類型, 輸入文字片段)。
+    """
+    if record_id is not None:
+        return (task, record_id)
+    return (task, input_text_snippet)
+
+
+def result_item_key(result: ModelResult) -> tuple:
+    """
+    取得模型處理結果所屬的輸入項目鍵 (見 item_key)。
+
+    Args:
+        result (ModelResult): 單一模型的處理結果。
+
+    Returns:
+        tuple: 輸入項目鍵。
+    """
+    return item_key(result.task, result.record_id, result.input_text_snippet)
+
+
+class ScoreTable:
+    """
+    評分的欄式資料表。
+    每則有數值總體評分的評審為一列，依序保存於四個欄位：
+    模型代碼 (int32)、評審代碼 (int32)、輸入項目代碼 (int32) 與評分 (float64)。
+    欄位以標準函式庫的 array 儲存，NumPy 可不複製地直接讀取。
+    """
+
+    def __init__(self):
+        self.models = []  # 模型代碼對應的 Ollama 模型名稱
+        self.reviewers = []  # 評審代碼對應的評審模型名稱
+        self.items = []  # 輸入項目代碼對應的項目鍵
+        self.review_errors = 0  # 沒有數值評分的評審數量 (錯誤或無法解析)
+        self._model_codes = {}
+        self._reviewer_codes = {}
+        self._item_codes = {}
+        self._model = array("i")  # 每列的模型代碼
+        self._reviewer = array("i")  # 每列的評審代碼
+        self._item = array("i")  # 每列的輸入項目代碼
+        self._score = array("d")  # 每列的總體評分
+
+    @staticmethod
+    def _code(codes: dict, names: list, name) -> int:
+        """
+        取得名稱的整數代碼，第一次出現時配置新代碼。
+
+        Args:
+            codes (dict): 名稱對應代碼的字典。
+            names (list): 代碼對應名稱的列表。
+            name: 模型名稱、評審名稱或輸入項目鍵。
+
+        Returns:
+            int: 整數代碼。
+        """
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def add(self, model: str, reviewer: str, item, score: float):
+        """
+        加入一則評分。
+
+        Args:
+            model (str): Ollama 模型名稱。
+            reviewer (str): 評審模型名稱。
+            item: 輸入項目鍵 (可雜湊的值)。
+            score (float): 總體評分。
+        """
+        self._model.append(self._code(self._model_codes, self.models, model))
+        self._reviewer.append(self._code(self._reviewer_codes, self.reviewers, reviewer))
+        self._item.append(self._code(self._item_codes, self.items, item))
+        self._score.append(score)
+
+    def add_result(self, result):
+        """
+        加入一筆模型處理結果中所有評審的總體評分。
+        生成失敗的結果仍會登記其模型，讓統計表格列出所有模型。
+
+        Args:
+            result (ModelResult or dict): 單一模型的處理結果 (也接受 to_dict 格式的字典)。
+        """
+        result = ModelResult.coerce(result)
+        self.add_scores(
+            result.ollama_model,
+            result_item_key(result),
+            [(review.reviewer_model, review.overall_score) for review in result.reviews],
+        )
+
+    def add_scores(self, model: str, item, scores):
+        """
+        加入同一個模型對同一輸入項目的所有評審評分。
+
+        Args:
+            model (str): Ollama 模型名稱；沒有評分時仍會登記。
+            item: 輸入項目鍵。
+            scores (list): (評審模型名稱, 總體評分) 列表；評分為 None 的評審計為錯誤。
+        """
+        self._code(self._model_codes, self.models, model)
+        for reviewer, score in scores:
+            if score is None:
+                self.review_errors += 1
+            else:
+                self.add(model, reviewer, item, score)
+
+    def __len__(self):
+        return len(self._score)
+
+    def columns(self) -> tuple:
+        """
+        取得欄位資料。
+
+        Returns:
+            tuple: (模型代碼, 評審代碼, 輸入項目代碼, 評分)；已安裝 NumPy 時為不複製的
+                   NumPy 陣列，否則為標準函式庫的 array。
+        """
+        if _load_numpy() is None:
+            return self._model, self._reviewer, self._item, self._score
+        return (
+            np.frombuffer(self._model, dtype=np.intc),
+            np.frombuffer(self._reviewer, dtype=np.intc),
+            np.frombuffer(self._item, dtype=np.intc),
+            np.frombuffer(self._score, dtype=np.float64),
+        )
+
+
+def _load_numpy():
+    """
+    第一次呼叫時嘗試匯入 NumPy，之後直接回傳先前的結果。
+
+    Returns:
+        module: numpy 模組；未安裝時為 None。
+    """
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+        _numpy_checked = True
+    return np
+
+
+def _quantile(sorted_values: list, q: float) -> float:
+    """
+    以線性內插計算已排序數值的分位數 (與 numpy.quantile 的預設方法相同)。
+
+    Args:
+        sorted_values (list): 已排序且非空的數值列表。
+        q (float): 分位 (0 到 1 之間)。
+
+    Returns:
+        float: 分位數。
+    """
+    position = q * (len(sorted_values) - 1)
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def _pearson(xs, ys):
+    """
+    計算 Pearson 相關係數 (純 Python 實作)。
+
+    Args:
+        xs (list): 數值列表。
+        ys (list): 與 xs 等長的數值列表。
+
+    Returns:
+        float or None: 相關係數；少於兩個數值或任一方沒有變異時為 None。
+    """
+    count = len(xs)
+    if count < 2:
+        return None
+    mean_x = sum(xs) / count
+    mean_y = sum(ys) / count
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance_x = sum((x - mean_x) ** 2 for x in xs)
+    variance_y = sum((y - mean_y) ** 2 for y in ys)
+    if variance_x == 0 or variance_y == 0:
+        return None
+    return covariance / math.sqrt(variance_x * variance_y)
+
+
+def _bootstrap_means_numpy(values, weights, bootstrap_samples: int, rng):
+    """
+    以 NumPy 計算成對 bootstrap 的模型平均評分。
+    每次重新抽樣以「每個輸入被抽中的次數」表示，抽樣次數矩陣與評分矩陣相乘一次即可算出
+    所有模型的平均。評分通常是少數幾種整數，許多輸入的評分組合完全相同；此時改為對不同的
+    評分組合做多項分佈抽樣，結果與逐一抽樣輸入相同，但成本只與組合數量有關。
+
+    Args:
+        values (numpy.ndarray): (輸入, 模型) 評分矩陣，沒有評分處為 0。
+        weights (numpy.ndarray): (輸入, 模型) 矩陣，有評分處為 1，否則為 0。
+        bootstrap_samples (int): 重新抽樣次數。
+        rng (numpy.random.Generator): 亂數產生器。
+
+    Returns:
+        numpy.ndarray: (重新抽樣次數, 模型) 的平均評分矩陣；抽樣中沒有評分的模型為 NaN。
+    """
+    sample_size = len(values)
+    patterns, pattern_counts = np.unique(
+        np.concatenate([values, weights], axis=1), axis=0, return_counts=True
+    )
+    compress = len(patterns) * 4 <= sample_size
+    if compress:
+        model_count = values.shape[1]
+        values, weights = patterns[:, :model_count], patterns[:, model_count:]
+        probabilities = pattern_counts / sample_size
+    columns = len(values)
+    boot = np.empty((bootstrap_samples, values.shape[1]))
+    batch = max(1, min(bootstrap_samples, _BOOTSTRAP_BATCH_ELEMENTS // columns))
+    for start in range(0, bootstrap_samples, batch):
+        rows = min(batch, bootstrap_samples - start)
+        if compress:
+            counts = rng.multinomial(sample_size, probabilities, size=rows)
+        else:
+            # 每列抽樣加上不同的位移後一次計數，得到 (抽樣, 輸入) 的抽中次數矩陣
+            draws = rng.integers(0, sample_size, size=(rows, sample_size), dtype=np.int64)
+            draws += (np.arange(rows) * sample_size)[:, None]
+            counts = np.bincount(draws.ravel(), minlength=rows * sample_size).reshape(
+                rows, sample_size
+            )
+        # 轉為浮點數讓矩陣乘法使用 BLAS
+        counts = counts.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            boot[start:start + rows] = (counts @ values) / (counts @ weights)
+    return boot
+
+
+def _summarize_numpy(table: ScoreTable, bootstrap_samples: int, confidence: float, seed: int):
+    """
+    以 NumPy 向量化計算統計值。回傳格式請見 summarize。
+    """
+    model, reviewer, item, score = table.columns()
+    model_count, reviewer_count, item_count = (
+        len(table.models),
+        len(table.reviewers),
+        len(table.items),
+    )
+    # 每個 (模型, 評審, 輸入) 格子的平均評分 (重複取樣先取平均)，沒有評分的格子為 NaN
+    flat = (model.astype(np.int64) * reviewer_count + reviewer) * item_count + item
+    size = model_count * reviewer_count * item_count
+    cell_counts = np.bincount(flat, minlength=size)
+    cell_sums = np.bincount(flat, weights=score, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cells = (cell_sums / cell_counts).reshape(model_count, reviewer_count, item_count)
+    cell_valid = cell_counts.reshape(cells.shape) > 0
+    filled = np.where(cell_valid, cells, 0.0)
+
+    # 每個模型與評審組合的平均評分 (各輸入等權重)
+    pair_items = cell_valid.sum(axis=2)
+    pair_reviews = cell_counts.reshape(cells.shape).sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pair_means = filled.sum(axis=2) / pair_items
+    reviewer_means = [
+        {
+            "model": table.models[m],
+            "reviewer": table.reviewers[r],
+            "mean": float(pair_means[m, r]) if pair_items[m, r] else None,
+            "items": int(pair_items[m, r]),
+            "reviews": int(pair_reviews[m, r]),
+        }
+        for m in range(model_count)
+        for r in range(reviewer_count)
+        if pair_reviews[m, r]
+    ]
+
+    # 每個模型在每個輸入上的評分：所有評審的平均
+    reviewer_hits = cell_valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        item_scores = filled.sum(axis=1) / reviewer_hits
+    item_valid = reviewer_hits > 0
+    item_filled = np.where(item_valid, item_scores, 0.0)
+    model_items = item_valid.sum(axis=1)
+    model_reviews = np.bincount(model, minlength=model_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        model_means = item_filled.sum(axis=1) / model_items
+
+    # 成對 bootstrap：每次對輸入重新抽樣，所有模型共用同一組抽樣
+    intervals = [(None, None)] * model_count
+    columns = np.flatnonzero(item_valid.any(axis=0))
+    if bootstrap_samples > 0 and len(columns) >= 2:
+        boot = _bootstrap_means_numpy(
+            item_filled[:, columns].T,  # (輸入, 模型)
+            item_valid[:, columns].T.astype(np.float64),
+            bootstrap_samples,
+            np.random.default_rng(seed),
+        )
+        alpha = (1.0 - confidence) / 2
+        intervals = []
+        for m in range(model_count):
+            samples = boot[:, m]
+            samples = samples[~np.isnan(samples)]
+            if model_items[m] >= 2 and samples.size:
+                low, high = np.quantile(samples, [alpha, 1.0 - alpha])
+                intervals.append((float(low), float(high)))
+            else:
+                intervals.append((None, None))
+
+    model_stats = [
+        {
+            "model": table.models[m],
+            "mean": float(model_means[m]) if model_items[m] else None,
+            "ci_low": intervals[m][0],
+            "ci_high": intervals[m][1],
+            "items": int(model_items[m]),
+            "reviews": int(model_reviews[m]),
+        }
+        for m in range(model_count)
+    ]
+
+    # 評審間一致性：兩位評審對相同 (模型, 輸入) 格子的評分
+    agreement = []
+    by_reviewer = cells.transpose(1, 0, 2).reshape(reviewer_count, -1)
+    valid_by_reviewer = cell_valid.transpose(1, 0, 2).reshape(reviewer_count, -1)
+    for a in range(reviewer_count):
+        for b in range(a + 1, reviewer_count):
+            both = valid_by_reviewer[a] & valid_by_reviewer[b]
+            pairs = int(both.sum())
+            x = by_reviewer[a][both]
+            y = by_reviewer[b][both]
+            pearson = None
+            if pairs >= 2 and x.std() > 0 and y.std() > 0:
+                pearson = float(np.corrcoef(x, y)[0, 1])
+            agreement.append(
+                {
+                    "reviewers": (table.reviewers[a], table.reviewers[b]),
+                    "pairs": pairs,
+                    "pearson": pearson,
+                    "mean_abs_diff": float(np.abs(x - y).mean()) if pairs else None,
+                }
+            )
+
+    # 模型兩兩勝率：兩者都有評分的輸入上，列模型評分較高的比例 (平手計半場)
+    both = item_valid[:, None, :] & item_valid[None, :, :]
+    wins = ((item_scores[:, None, :] > item_scores[None, :, :]) & both).sum(axis=2)
+    ties = ((item_scores[:, None, :] == item_scores[None, :, :]) & both).sum(axis=2)
+    compared = both.sum(axis=2)
+    win_rates = [
+        [
+            float((wins[a, b] + 0.5 * ties[a, b]) / compared[a, b])
+            if a != b and compared[a, b]
+            else None
+            for b in range(model_count)
+        ]
+        for a in range(model_count)
+    ]
+    return model_stats, reviewer_means, agreement, win_rates, compared.tolist()
+
+
+def _summarize_python(table: ScoreTable, bootstrap_samples: int, confidence: float, seed: int):
+    """
+    以純 Python 計算統計值 (未安裝 NumPy 時使用)。回傳格式請見 summarize。
+    """
+    model, reviewer, item, score = table.columns()
+    model_count, reviewer_count = len(table.models), len(table.reviewers)
+    # 每個 (模型, 評審, 輸入) 格子的 [評分總和, 評分數量]
+    cells = {}
+    for key in zip(model, reviewer, item, score):
+        entry = cells.setdefault(key[:3], [0.0, 0])
+        entry[0] += key[3]
+        entry[1] += 1
+
+    pair_scores = {}  # (模型, 評審) 對應 [格子平均總和, 輸入數, 評分數]
+    item_sums = {}  # (模型, 輸入) 對應 [評審平均總和, 評審數]
+    reviewer_cells = {}  # 評審對應 {(模型, 輸入): 格子平均}
+    for (m, r, i), (total, count) in cells.items():
+        mean = total / count
+        pair = pair_scores.setdefault((m, r), [0.0, 0, 0])
+        pair[0] += mean
+        pair[1] += 1
+        pair[2] += count
+        entry = item_sums.setdefault((m, i), [0.0, 0])
+        entry[0] += mean
+        entry[1] += 1
+        reviewer_cells.setdefault(r, {})[(m, i)] = mean
+    reviewer_means = [
+        {
+            "model": table.models[m],
+            "reviewer": table.reviewers[r],
+            "mean": pair_scores[(m, r)][0] / pair_scores[(m, r)][1],
+            "items": pair_scores[(m, r)][1],
+            "reviews": pair_scores[(m, r)][2],
+        }
+        for m in range(model_count)
+        for r in range(reviewer_count)
+        if (m, r) in pair_scores
+    ]
+
+    # 每個輸入上各模型的評分 (所有評審的平均)
+    by_item = {}  # 輸入對應 {模型: 評分}
+    for (m, i), (total, count) in item_sums.items():
+        by_item.setdefault(i, {})[m] = total / count
+    model_totals = [[0.0, 0] for _ in range(model_count)]
+    for scores in by_item.values():
+        for m, value in scores.items():
+            model_totals[m][0] += value
+            model_totals[m][1] += 1
+    model_reviews = Counter(model)
+
+    intervals = [(None, None)] * model_count
+    item_rows = list(by_item.values())
+    if bootstrap_samples > 0 and len(item_rows) >= 2:
+        rng = random.Random(seed)
+        indices = range(len(item_rows))
+        boot = [[] for _ in range(model_count)]
+        for _ in range(bootstrap_samples):
+            sums = [0.0] * model_count
+            counts = [0] * model_count
+            for index, times in Counter(rng.choices(indices, k=len(item_rows))).items():
+                for m, value in item_rows[index].items():
+                    sums[m] += value * times
+                    counts[m] += times
+            for m in range(model_count):
+                if counts[m]:
+                    boot[m].append(sums[m] / counts[m])
+        alpha = (1.0 - confidence) / 2
+        intervals = []
+        for m in range(model_count):
+            samples = sorted(boot[m])
+            if model_totals[m][1] >= 2 and samples:
+                intervals.append((_quantile(samples, alpha), _quantile(samples, 1.0 - alpha)))
+            else:
+                intervals.append((None, None))
+
+    model_stats = [
+        {
+            "model": table.models[m],
+            "mean": model_totals[m][0] / model_totals[m][1] if model_totals[m][1] else None,
+            "ci_low": intervals[m][0],
+            "ci_high": intervals[m][1],
+            "items": model_totals[m][1],
+            "reviews": model_reviews.get(m, 0),
+        }
+        for m in range(model_count)
+    ]
+
+    agreement = []
+    for a in range(reviewer_count):
+        for b in range(a + 1, reviewer_count):
+            cells_a = reviewer_cells.get(a, {})
+            cells_b = reviewer_cells.get(b, {})
+            shared = [key for key in cells_a if key in cells_b]
+            xs = [cells_a[key] for key in shared]
+            ys = [cells_b[key] for key in shared]
+            agreement.append(
+                {
+                    "reviewers": (table.reviewers[a], table.reviewers[b]),
+                    "pairs": len(shared),
+                    "pearson": _pearson(xs, ys),
+                    "mean_abs_diff": (
+                        sum(abs(x - y) for x, y in zip(xs, ys)) / len(shared) if shared else None
+                    ),
+                }
+            )
+
+    wins = [[0.0] * model_count for _ in range(model_count)]
+    compared = [[0] * model_count for _ in range(model_count)]
+    for scores in item_rows:
+        for a, score_a in scores.items():
+            for b, score_b in scores.items():
+                compared[a][b] += 1
+                if score_a > score_b:
+                    wins[a][b] += 1
+                elif score_a == score_b:
+                    wins[a][b] += 0.5
+    win_rates = [
+        [
+            wins[a][b] / compared[a][b] if a != b and compared[a][b] else None
+            for b in range(model_count)
+        ]
+        for a in range(model_count)
+    ]
+    return model_stats, reviewer_means, agreement, win_rates, compared
+
+
+def summarize(
+    table: ScoreTable,
+    bootstrap_samples: int = DEFAULT_BOOTSTRAP_SAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = 0,
+) -> dict:
+    """
+    計算評分表的統計值。
+    同一模型、評審與輸入的多則評分 (重複取樣) 先取平均；模型在每個輸入上的評分為所有評審的平均，
+    模型平均評分再對所有輸入等權重平均。
+
+    Args:
+        table (ScoreTable): 評分表。
+        bootstrap_samples (int, optional): bootstrap 重新抽樣次數；0 表示不計算信賴區間。
+        confidence (float, optional): 信賴水準。
+        seed (int, optional): 亂數種子，讓相同資料的信賴區間可重現。
+
+    Returns:
+        dict: 包含以下鍵的字典：
+              'models': 每個模型的 {'model', 'mean', 'ci_low', 'ci_high', 'items', 'reviews'}；
+              'reviewer_means': 每個模型與評審組合的 {'model', 'reviewer', 'mean', 'items', 'reviews'}；
+              'agreement': 每對評審的 {'reviewers', 'pairs', 'pearson', 'mean_abs_diff'}；
+              'win_rates': 模型 × 模型的勝率矩陣 (列模型勝過欄模型的比例，無比較時為 None)；
+              'compared': 模型 × 模型的共同輸入數量矩陣；
+              以及 'rows', 'items', 'review_errors', 'bootstrap_samples', 'confidence',
+              'backend' ("numpy" 或 "python") 與 'elapsed_s'。
+    """
+    start = time.perf_counter()
+    compute = _summarize_numpy if _load_numpy() is not None else _summarize_python
+    if len(table):
+        model_stats, reviewer_means, agreement, win_rates, compared = compute(
+            table, bootstrap_samples, confidence, seed
+        )
+    else:
+        # 沒有任何數值評分，只列出模型
+        model_stats = [
+            {"model": name, "mean": None, "ci_low": None, "ci_high": None, "items": 0, "reviews": 0}
+            for name in table.models
+        ]
+        reviewer_means, agreement = [], []
+        win_rates = [[None] * len(table.models) for _ in table.models]
+        compared = [[0] * len(table.models) for _ in table.models]
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"Aggregated {len(table)} review scores over {len(table.items)} inputs "
+        f"in {elapsed:.3f}s ({'numpy' if np is not None else 'python'})"
+    )
+    return {
+        "models": model_stats,
+        "reviewer_means": reviewer_means,
+        "agreement": agreement,
+        "win_rates": win_rates,
+        "compared": compared,
+        "rows": len(table),
+        "items": len(table.items),
+        "review_errors": table.review_errors,
+        "bootstrap_samples": bootstrap_samples,
+        "confidence": confidence,
+        "backend": "numpy" if np is not None else "python",
+        "elapsed_s": elapsed,
+    }
+
+
+def _format(value, digits=2):
+    """
+    將數值格式化為報告用字串；無資料時回傳 "N/A"。
+    """
+    return "N/A" if value is None else f"{value:.{digits}f}"
+
+
+def render_summary(summary: dict) -> list:
+    """
+    產生統計分析的 Markdown 行。
+
+    Args:
+        summary (dict): summarize 的回傳值。
+
+    Returns:
+        list: 統計分析段落的 Markdown 行列表；沒有任何數值評分時回傳空列表。
+    """
+    if not summary["rows"]:
+        return []
+    report_lines = ["## 統計分析", ""]
+    report_lines.append(
+        f"共 {summary['rows']} 則評分、{summary['items']} 筆輸入。"
+        "同一模型、評審與輸入的多次評分先取平均，模型在每筆輸入上的評分再平均所有評審，"
+        "各輸入等權重。"
+    )
+    report_lines.append("")
+
+    # 模型平均評分與信賴區間，依平均評分排序
+    confidence_label = f"{summary['confidence'] * 100:g}% 信賴區間"
+    report_lines.append("### 模型平均評分")
+    report_lines.append("")
+    report_lines.append(f"| Ollama 模型 | 平均評分 | {confidence_label} | 輸入數 | 評分數 |")
+    report_lines.append("| --- | --- | --- | --- | --- |")
+    ranked = sorted(
+        summary["models"],
+        key=lambda row: (row["mean"] is None, -(row["mean"] or 0.0)),
+    )
+    for row in ranked:
+        interval = (
+            f"{row['ci_low']:.2f} – {row['ci_high']:.2f}" if row["ci_low"] is not None else "N/A"
+        )
+        report_lines.append(
+            f"| {row['model']} | {_format(row['mean'])} | {interval} "
+            f"| {row['items']} | {row['reviews']} |"
+        )
+    report_lines.append("")
+    if summary["bootstrap_samples"]:
+        report_lines.append(
+            f"_信賴區間為對輸入重新抽樣 {summary['bootstrap_samples']} 次的 bootstrap 百分位區間。_"
+        )
+        report_lines.append("")
+
+    # 各評審的平均評分 (模型 × 評審)
+    reviewers = []
+    for row in summary["reviewer_means"]:
+        if row["reviewer"] not in reviewers:
+            reviewers.append(row["reviewer"])
+    if len(reviewers) > 1:
+        means = {(row["model"], row["reviewer"]): row["mean"] for row in summary["reviewer_means"]}
+        report_lines.append("### 各評審平均評分")
+        report_lines.append("")
+        report_lines.append("| Ollama 模型 | " + " | ".join(reviewers) + " |")
+        report_lines.append("| --- " * (len(reviewers) + 1) + "|")
+        for row in ranked:
+            cells = [_format(means.get((row["model"], name))) for name in reviewers]
+            report_lines.append(f"| {row['model']} | " + " | ".join(cells) + " |")
+        report_lines.append("")
+
+    # 評審間一致性
+    if summary["agreement"]:
+        report_lines.append("### 評審間一致性")
+        report_lines.append("")
+        report_lines.append("| 評審 A | 評審 B | 共同評分數 | Pearson 相關係數 | 平均絕對差 |")
+        report_lines.append("| --- | --- | --- | --- | --- |")
+        for row in summary["agreement"]:
+            reviewer_a, reviewer_b = row["reviewers"]
+            report_lines.append(
+                f"| {reviewer_a} | {reviewer_b} | {row['pairs']} "
+                f"| {_format(row['pearson'], 3)} | {_format(row['mean_abs_diff'])} |"
+            )
+        report_lines.append("")
+
+    # 模型兩兩勝率矩陣
+    # 與平均評分表格相同，依平均評分排序
+    order = sorted(range(len(summary["models"])), key=lambda index: ranked.index(summary["models"][index]))
+    models = [summary["models"][index]["model"] for index in order]
+    if len(models) > 1:
+        report_lines.append("### 模型兩兩勝率")
+        report_lines.append("")
+        report_lines.append(
+            "_每格為列模型在兩者都有評分的輸入上勝過欄模型的比例 (平手計半場)，括號內為共同輸入數。_"
+        )
+        report_lines.append("")
+        report_lines.append("| 列 \\ 欄 | " + " | ".join(models) + " |")
+        report_lines.append("| --- " * (len(models) + 1) + "|")
+        for a, model_a in zip(order, models):
+            cells = []
+            for b in order:
+                rate = summary["win_rates"][a][b]
+                cells.append(
+                    "-" if rate is None else f"{rate * 100:.0f}% ({summary['compared'][a][b]})"
+                )
+            report_lines.append(f"| {model_a} | " + " | ".join(cells) + " |")
+        report_lines.append("")
+    return report_lines
+
+
+def load_journal_results(path: str):
+    """
+    讀取檢查點日誌中完成的模型處理結果；續跑時重複寫入的結果只保留最後一筆。
+
+    Args:
+        path (str): 檢查點日誌 (JSONL) 路徑。
+
+    Returns:
+        list: ModelResult 列表。
+    """
+    results = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # 中斷時可能留下寫到一半的最後一行
+                continue
+            if entry.get("type") == "result":
+                results[entry.get("key")] = entry.get("result")
+    return [ModelResult.from_dict(result) for result in results.values()]
+
+
+def main(argv=None):
+    """
+    命令列進入點：彙總一或多個檢查點日誌或執行結果檔案並輸出統計分析的 Markdown。
+
+    Args:
+        argv (list, optional): 命令列參數；預設為 sys.argv[1:]。
+    """
+    # 延遲匯入，避免 tracing 成為函式庫用途的相依
+    from tracing import setup_logging
+
+    parser = argparse.ArgumentParser(
+        description="Aggregate review scores from one or more run journals or saved runs."
+    )
+    parser.add_argument(
+        "--journal",
+        action="append",
+        default=[],
+        help="Run journal (JSONL) to aggregate; repeat for repeated samples of the same inputs.",
+    )
+    parser.add_argument(
+        "--run",
+        action="append",
+        default=[],
+        help="Saved run file (main.py --save_run) to aggregate; only the score columns are read.",
+    )
+    parser.add_argument(
+        "--bootstrap_samples",
+        type=int,
+        default=DEFAULT_BOOTSTRAP_SAMPLES,
+        help="Bootstrap resamples for the confidence intervals (0 disables).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the bootstrap.")
+    parser.add_argument("--output", type=str, help="Write the Markdown here instead of stdout.")
+    args = parser.parse_args(argv)
+    if not args.journal and not args.run:
+        parser.error("give at least one --journal or --run")
+    setup_logging()
+
+    table = ScoreTable()
+    start = time.perf_counter()
+    for path in args.journal:
+        for result in load_journal_results(path):
+            table.add_result(result)
+    for path in args.run:
+        # 執行結果檔案以欄式保存評分，不需要建立完整的處理結果物件
+        for task, model, record_id, snippet, scores in iter_run_scores(path):
+            table.add_scores(model, item_key(task, record_id, snippet), scores)
+    logging.info(f"Loaded {len(table)} scores in {(time.perf_counter() - start) * 1000:.1f} ms")
+    lines = render_summary(summarize(table, args.bootstrap_samples, seed=args.seed))
+    if not lines:
+        lines = ["沒有可彙總的評分。"]
+    text = "\n".join(lines) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        logging.info(f"統計分析已儲存到: {args.output}")
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
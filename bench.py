@@ -0,0 +1,777 @@
+# bench.py
+# 此檔案包含離線的效能基準測試工具。
+# - 在本機啟動模擬的 Ollama 與 OpenAI 相容評審 HTTP 伺服器，可設定延遲分佈、錯誤率與 token 速率。
+# - 依 (Ollama 主機數 × 模型數 × 評審數 × 記錄數) 的參數組合，在獨立的子行程中執行 main.run，
+#   以 JSON 輸出吞吐量、p50/p95/p99 延遲與峰值記憶體 (RSS)，讓每項效能改動都有可重複的離線數據。
+# - --startup: 量測 main.py 的啟動時間 (--help、匯入 main、建立評審客戶端)，
+#   並以 python -X importtime 列出各模組的匯入耗時，讓啟動時間的退步能被發現。
+
+import argparse  # 用於解析命令列參數
+import http.server  # 用於建立模擬的 HTTP 伺服器
+import itertools  # 用於展開參數組合
+import json  # 用於處理 HTTP 內容、子行程設定與輸出結果
+import logging  # 用於記錄程式運行訊息
+import math  # 用於對數常態分佈與百分位數計算
+import os  # 用於組合暫存檔案路徑
+import random  # 用於產生延遲與錯誤
+import re  # 用於計算打包評審中的候選數量
+import shlex  # 用於解析傳給 main 的額外參數
+import subprocess  # 用於在獨立子行程中執行每個參數組合
+import sys  # 用於取得 Python 執行檔與處理子行程模式
+import tempfile  # 用於建立每次執行的暫存目錄
+import threading  # 用於在背景執行模擬伺服器
+import time  # 用於模擬延遲與量測耗時
+import types  # 用於在子行程中建立設定模組
+
+from tracing import setup_logging  # 統一的日誌設定
+
+try:
+    import resource  # 用於讀取峰值記憶體 (僅限 Unix)
+except ImportError:
+    resource = None
+
+# 基準測試中評審提供者的使用順序 (與 main.py 的 REVIEWER_MODELS 鍵一致)
+REVIEWER_PROVIDERS = ["gpt", "gemini", "deepseek"]
+# 基準測試使用的任務類型設定
+BENCH_TASKS = {
+    "translate": "Translate to Traditional Chinese",
+    "summarize": "Summarize text",
+}
+# 模擬的 Ollama 輸出每段包含的 token 數量 (每段之間依 token 速率等待)
+_TOKENS_PER_STREAM_CHUNK = 8
+# 模擬的 Ollama 輸出使用的繁體中文字；每個請求以模型名稱與提示詞為種子抽樣，
+# 輸出不會形成重複迴圈，能通過送交評審前的本地檢查
+_STUB_OUTPUT_CHARS = "這是模型針對輸入內容產生的繁體中文輸出我們比較各個語言模型在翻譯與總結任務上的品質和速度結果會交給評審"
+# 啟動時間基準測試的情境：名稱對應傳給 Python 直譯器的參數 (在專案目錄中執行)。
+# 'python' 為直譯器本身的啟動時間下限；'init' 以基準測試的設定取代 config.py，
+# 匯入 main 並建立所有評審客戶端 (不送出任何請求)
+STARTUP_SCENARIOS = {
+    "python": ["-c", "pass"],
+    "help": ["main.py", "--help"],
+    "import": ["-c", "import main"],
+    "init": [
+        "-c",
+        "import sys, types\n"
+        "config = types.ModuleType('config')\n"
+        "config.__dict__.update(" + repr({
+            "OLLAMA_API_BASE_URL": "http://127.0.0.1:11434",
+            "OLLAMA_MODELS_TO_COMPARE": ["bench-model-0"],
+            "OPENAI_API_KEY": "bench",
+            "GOOGLE_API_KEY": "bench",
+            "DEEPSEEK_API_KEY": "bench",
+            "REVIEWER_MODELS": {p: f"bench-reviewer-{p}" for p in REVIEWER_PROVIDERS},
+            "SUPPORTED_TASKS": BENCH_TASKS,
+            "REVIEWER_API_BASE_URLS": {"gpt": "http://127.0.0.1:9/v1"},
+        }) + ")\n"
+        "sys.modules['config'] = config\n"
+        "import main\n"
+        "main.build_reviewers(main.load_config())\n",
+    ],
+}
+
+
+def parse_latency(spec: str):
+    """
+    解析延遲分佈設定。
+
+    Args:
+        spec (str): 延遲分佈，格式為下列之一 (單位皆為秒)：
+                    "0.05" 或 "fixed:0.05"、"uniform:最小值:最大值"、
+                    "exp:平均值"、"lognormal:中位數:sigma"。
+
+    Returns:
+        callable: 以 random.Random 實例為參數、回傳一次取樣延遲秒數的函數。
+
+    Raises:
+        ValueError: 分佈名稱或參數不正確時。
+    """
+    name, _, params = spec.partition(":")
+    try:
+        if not params:
+            value = float(name)
+            return lambda rng: value
+        values = [float(value) for value in params.split(":")]
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec!r}") from None
+    if name == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if name == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if name == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    if name == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+def percentiles(values) -> dict:
+    """
+    計算延遲統計 (線性內插的百分位數)。
+
+    Args:
+        values (list): 數值列表。
+
+    Returns:
+        dict: 包含 'count', 'mean', 'p50', 'p95', 'p99' 與 'max' 鍵的字典；沒有數值時各統計為 None。
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+
+    def at(fraction):
+        position = (len(ordered) - 1) * fraction
+        lower = math.floor(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": ordered[-1],
+    }
+
+
+class _StubServer(http.server.ThreadingHTTPServer):
+    """
+    在背景執行緒中運作的模擬 HTTP 伺服器基礎類別。
+    """
+
+    daemon_threads = True
+    # 預設的 listen backlog (5) 在高並行時會讓連線被拒，基準測試需要較大的佇列
+    request_queue_size = 128
+
+    def __init__(self, handler_class, latency: str, error_rate: float, seed: int):
+        """
+        Args:
+            handler_class (type): 處理請求的 BaseHTTPRequestHandler 子類別。
+            latency (str): 延遲分佈設定 (見 parse_latency)。
+            error_rate (float): 請求回傳錯誤的機率 (0 到 1)。
+            seed (int): 亂數種子，讓延遲與錯誤可重現。
+        """
+        super().__init__(("127.0.0.1", 0), handler_class)
+        self.sample_latency = parse_latency(latency)  # 延遲取樣函數
+        self.error_rate = error_rate  # 錯誤率
+        self.stats = {"requests": 0, "errors": 0}  # 處理的請求數量與注入的錯誤數量
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """
+        str: 伺服器的基礎位址。
+        """
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def draw(self):
+        """
+        取樣一次請求的延遲並決定是否注入錯誤。
+
+        Returns:
+            tuple: (延遲秒數, 是否回傳錯誤)。
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = max(0.0, self.sample_latency(self._rng))
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+            return delay, failed
+
+    def start(self):
+        """
+        在背景執行緒中啟動伺服器。
+        """
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止伺服器並釋放連接埠。
+        """
+        self.shutdown()
+        self.server_close()
+
+
+class _JSONHandler(http.server.BaseHTTPRequestHandler):
+    """
+    回傳 JSON 的請求處理基礎類別 (HTTP/1.1 保持連線)。
+    """
+
+    protocol_version = "HTTP/1.1"
+    # 標頭與內容分兩次寫出；與實際服務 (例如 Go net/http) 一樣停用 Nagle 演算法，
+    # 否則重複使用的 keep-alive 連線會遇到延遲 ACK 造成的約 40ms 額外延遲
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # 基準測試時不輸出每個請求的存取紀錄
+        pass
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _OllamaHandler(_JSONHandler):
+    """
+    模擬 Ollama API：/api/version、/api/tags、/api/ps 與 /api/generate (串流與非串流)。
+    延遲分佈套用在首個 token 之前 (提示詞處理)，之後依 token 速率分段串流輸出。
+    """
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/api/version":
+            self.send_json({"version": "bench"})
+        elif self.path == "/api/tags":
+            self.send_json(
+                {"models": [{"name": name, "digest": "bench"} for name in server.models]}
+            )
+        elif self.path == "/api/ps":
+            with server.resident_lock:
+                self.send_json({"models": [{"name": name} for name in sorted(server.resident)]})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        server = self.server
+        request = self.read_json()
+        if self.path != "/api/generate":
+            return self.send_json({"error": "not found"}, status=404)
+        model_name = request.get("model")
+        with server.resident_lock:
+            if request.get("keep_alive") == 0:
+                server.resident.discard(model_name)
+            else:
+                server.resident.add(model_name)
+        if not request.get("prompt"):
+            # 載入或卸載模型的請求
+            return self.send_json({"model": model_name, "response": "", "done": True})
+        if request.get("stream") is False:
+            # 暖機請求只產生一個 token，不套用延遲分佈與錯誤率
+            return self.send_json({"model": model_name, "response": "好", "done": True})
+        delay, failed = server.draw()
+        time.sleep(delay)
+        if failed:
+            return self.send_json({"error": "injected bench error"}, status=500)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(payload):
+            data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        start = time.perf_counter()
+        remaining = server.output_tokens
+        # 輸出內容由模型與提示決定：同一模型的重複請求結果相同 (快取與去重行為可重現)，
+        # 不同模型的輸出不同，評審去重不會把不同模型的輸出合併成一次評審
+        chars = random.Random(f"{model_name}\0{request['prompt']}")
+        while remaining > 0:
+            count = min(_TOKENS_PER_STREAM_CHUNK, remaining)
+            text = "".join(chars.choices(_STUB_OUTPUT_CHARS, k=count))
+            write_chunk({"model": model_name, "response": text, "done": False})
+            remaining -= count
+            if remaining and server.tokens_per_sec:
+                time.sleep(count / server.tokens_per_sec)
+        eval_ns = int((time.perf_counter() - start) * 1e9)
+        write_chunk(
+            {
+                "model": model_name,
+                "response": "",
+                "done": True,
+                "total_duration": int(delay * 1e9) + eval_ns,
+                "load_duration": 0,
+                "prompt_eval_count": len(request["prompt"]) // 4,
+                "prompt_eval_duration": int(delay * 1e9),
+                "eval_count": server.output_tokens,
+                "eval_duration": eval_ns,
+                "done_reason": "stop",
+            }
+        )
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class _ReviewerHandler(_JSONHandler):
+    """
+    模擬 OpenAI 相容的 /chat/completions；錯誤以 HTTP 429 回傳，用於測試速率限制與重試。
+    打包評審的請求會依候選數量回傳對應的評分列表。
+    """
+
+    def do_GET(self):
+        self.send_json(self.server.stats)
+
+    def do_POST(self):
+        server = self.server
+        request = self.read_json()
+        if not self.path.endswith("/chat/completions"):
+            return self.send_json({"error": {"message": "not found"}}, status=404)
+        delay, failed = server.draw()
+        time.sleep(delay)
+        if failed:
+            return self.send_json(
+                {"error": {"message": "injected rate limit"}}, status=429, headers={"Retry-After": "0"}
+            )
+        scores = {
+            "overall_score": 4,
+            "accuracy_score": 4,
+            "fluency_score": 4,
+            "traditional_chinese_usage_score": 4,
+            "conciseness_score": 4,
+            "coverage_score": 4,
+            "comment": "bench review",
+        }
+        candidates = len(re.findall(r"Candidate \d+:", request["messages"][-1]["content"]))
+        if candidates:
+            content = {
+                "candidates": [dict(scores, candidate=number + 1) for number in range(candidates)]
+            }
+        else:
+            content = scores
+        self.send_json({"choices": [{"message": {"content": json.dumps(content)}}]})
+
+
+def start_ollama_server(models, latency, tokens_per_sec, output_tokens, error_rate, seed):
+    """
+    啟動一台模擬的 Ollama 伺服器。
+
+    Args:
+        models (list): 伺服器提供的模型名稱列表。
+        latency (str): 首個 token 之前的延遲分佈設定。
+        tokens_per_sec (float): 輸出的 token 速率，0 表示不等待。
+        output_tokens (int): 每次生成輸出的 token 數量。
+        error_rate (float): 生成請求回傳 HTTP 500 的機率。
+        seed (int): 亂數種子。
+
+    Returns:
+        _StubServer: 已啟動的伺服器。
+    """
+    server = _StubServer(_OllamaHandler, latency, error_rate, seed)
+    server.models = list(models)  # 提供的模型名稱
+    server.tokens_per_sec = tokens_per_sec  # 輸出 token 速率
+    server.output_tokens = output_tokens  # 每次輸出的 token 數量
+    server.resident = set()  # 目前常駐的模型
+    server.resident_lock = threading.Lock()
+    return server.start()
+
+
+def start_reviewer_server(latency, error_rate, seed):
+    """
+    啟動一台模擬的 OpenAI 相容評審伺服器。
+
+    Args:
+        latency (str): 評審請求的延遲分佈設定。
+        error_rate (float): 請求回傳 HTTP 429 的機率。
+        seed (int): 亂數種子。
+
+    Returns:
+        _StubServer: 已啟動的伺服器。
+    """
+    return _StubServer(_ReviewerHandler, latency, error_rate, seed).start()
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    解析 python -X importtime 的輸出。
+
+    Args:
+        stderr (str): 子行程的標準錯誤輸出。
+
+    Returns:
+        list: 依匯入完成順序排列的字典列表，每個字典包含 'module'、'depth' (巢狀層級，0 為最外層)、
+              'self_ms' 與 'cumulative_ms'。
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 標題列
+        name = parts[2].rstrip()
+        entries.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip(" ")) - 1) // 2,
+                "self_ms": int(parts[0]) / 1000,
+                "cumulative_ms": int(parts[1]) / 1000,
+            }
+        )
+    return entries
+
+
+def measure_startup(scenario: str, runs: int, top: int) -> dict:
+    """
+    量測一個啟動情境：先以 -X importtime 執行一次取得匯入耗時的分解
+    (同時讓 .pyc 快取就緒)，再重複執行 runs 次量測實際耗時。
+
+    Args:
+        scenario (str): STARTUP_SCENARIOS 中的情境名稱。
+        runs (int): 量測實際耗時的執行次數。
+        top (int): 分解中列出的模組數量。
+
+    Returns:
+        dict: 包含 'scenario'、'wall_ms' (percentiles 的統計)、'import_ms' (最外層匯入的累計耗時總和)、
+              'imports' (最外層與第二層匯入中累計耗時最高的模組) 與 'slowest_self' (自身耗時最高的模組)。
+    """
+    command = [sys.executable] + STARTUP_SCENARIOS[scenario]
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    profile = subprocess.run(
+        [sys.executable, "-X", "importtime"] + STARTUP_SCENARIOS[scenario],
+        cwd=project_dir,
+        capture_output=True,
+        text=True,
+    )
+    if profile.returncode != 0:
+        raise RuntimeError(f"startup scenario {scenario!r} failed: {profile.stderr.strip()[-500:]}")
+    entries = parse_importtime(profile.stderr)
+    wall = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=project_dir, capture_output=True, check=True)
+        wall.append((time.perf_counter() - start) * 1000)
+    return {
+        "scenario": scenario,
+        "wall_ms": percentiles(wall),
+        "import_ms": sum(entry["cumulative_ms"] for entry in entries if entry["depth"] == 0),
+        "imports": sorted(
+            (entry for entry in entries if entry["depth"] <= 1),
+            key=lambda entry: -entry["cumulative_ms"],
+        )[:top],
+        "slowest_self": sorted(entries, key=lambda entry: -entry["self_ms"])[:top],
+    }
+
+
+def run_startup(args) -> list:
+    """
+    執行所有啟動情境，並依 --max_startup_ms 檢查啟動時間是否退步。
+
+    Args:
+        args (argparse.Namespace): 基準測試的命令列參數。
+
+    Returns:
+        list: 每個情境的 measure_startup 結果。
+    """
+    results = []
+    for scenario in STARTUP_SCENARIOS:
+        result = measure_startup(scenario, args.startup_runs, args.startup_top)
+        wall = result["wall_ms"]
+        logging.info(
+            f"startup {scenario}: p50 {wall['p50']:.1f} ms, p95 {wall['p95']:.1f} ms, "
+            f"imports {result['import_ms']:.1f} ms"
+        )
+        results.append(result)
+    return results
+
+
+def _write_dataset(path: str, records: int, input_chars: int, seed: int):
+    """
+    產生基準測試用的 JSONL 資料集。
+
+    Args:
+        path (str): 資料集路徑。
+        records (int): 記錄數量。
+        input_chars (int): 每筆記錄的輸入字元數。
+        seed (int): 亂數種子。
+    """
+    rng = random.Random(seed)
+    words = ["model", "latency", "review", "token", "batch", "cache", "stream", "host"]
+    with open(path, "w", encoding="utf-8") as f:
+        for index in range(records):
+            text = ""
+            while len(text) < input_chars:
+                text += rng.choice(words) + (". " if rng.random() < 0.1 else " ")
+            f.write(json.dumps({"id": f"r{index}", "text": text[:input_chars]}) + "\n")
+
+
+def run_point(args, hosts: int, models: int, reviewers: int, records: int, repeat: int) -> dict:
+    """
+    執行單一參數組合：啟動模擬伺服器，在子行程中執行 main.run，並收集統計。
+
+    Args:
+        args (argparse.Namespace): 基準測試的命令列參數。
+        hosts (int): 模擬 Ollama 主機數量。
+        models (int): 比較的模型數量。
+        reviewers (int): 評審數量 (最多 3 個)。
+        records (int): 資料集記錄數量。
+        repeat (int): 重複執行的序號，用於變化亂數種子。
+
+    Returns:
+        dict: 參數組合、子行程回報的統計與模擬伺服器的請求計數。
+    """
+    seed = args.seed + repeat
+    model_names = [f"bench-model-{index}" for index in range(models)]
+    providers = REVIEWER_PROVIDERS[:reviewers]
+    ollama_servers = [
+        start_ollama_server(
+            model_names,
+            args.ollama_latency,
+            args.tokens_per_sec,
+            args.output_tokens,
+            args.ollama_error_rate,
+            seed + index,
+        )
+        for index in range(hosts)
+    ]
+    reviewer_server = start_reviewer_server(
+        args.reviewer_latency, args.reviewer_error_rate, seed
+    )
+    point = {
+        "hosts": hosts,
+        "models": models,
+        "reviewers": reviewers,
+        "records": records,
+        "repeat": repeat,
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            dataset_path = os.path.join(workdir, "dataset.jsonl")
+            _write_dataset(dataset_path, records, args.input_chars, seed)
+            spec = {
+                # 子行程的設定模組內容 (取代 config.py)
+                "config": {
+                    "OLLAMA_API_BASE_URL": [server.url for server in ollama_servers],
+                    "OLLAMA_MODELS_TO_COMPARE": model_names,
+                    "OPENAI_API_KEY": "bench",
+                    "GOOGLE_API_KEY": "bench",
+                    "DEEPSEEK_API_KEY": "bench",
+                    "REVIEWER_MODELS": {p: f"bench-reviewer-{p}" for p in providers},
+                    "SUPPORTED_TASKS": BENCH_TASKS,
+                    "REVIEWER_API_BASE_URLS": {p: reviewer_server.url + "/v1" for p in providers},
+                },
+                "argv": [
+                    "--dataset",
+                    dataset_path,
+                    "--task",
+                    args.task,
+                    "--output_report",
+                    os.path.join(workdir, "report.md"),
+                    "--no_cache",
+                ]
+                + shlex.split(args.main_args),
+                "result_path": os.path.join(workdir, "result.json"),
+            }
+            spec_path = os.path.join(workdir, "spec.json")
+            with open(spec_path, "w", encoding="utf-8") as f:
+                json.dump(spec, f)
+            logging.info(f"Benchmark point {point}")
+            with open(os.path.join(workdir, "bench.log"), "w", encoding="utf-8") as log:
+                completed = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", spec_path],
+                    cwd=workdir,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    timeout=args.timeout,
+                )
+            if completed.returncode != 0 or not os.path.exists(spec["result_path"]):
+                with open(os.path.join(workdir, "bench.log"), encoding="utf-8") as log:
+                    tail = log.read()[-2000:]
+                raise RuntimeError(f"Benchmark worker failed ({completed.returncode}):\n{tail}")
+            with open(spec["result_path"], encoding="utf-8") as f:
+                point.update(json.load(f))
+    finally:
+        for server in ollama_servers:
+            point.setdefault("ollama_requests", 0)
+            point["ollama_requests"] += server.stats["requests"]
+            server.stop()
+        point["reviewer_requests"] = reviewer_server.stats["requests"]
+        point["reviewer_injected_errors"] = reviewer_server.stats["errors"]
+        reviewer_server.stop()
+    return point
+
+
+def _worker(spec_path: str):
+    """
+    子行程模式：以基準測試產生的設定執行 main.run，並將統計寫入結果檔案。
+
+    Args:
+        spec_path (str): run_point 寫出的設定檔路徑。
+    """
+    with open(spec_path, encoding="utf-8") as f:
+        spec = json.load(f)
+    # 以基準測試的設定取代 config.py，必須在匯入 main 之前完成
+    config = types.ModuleType("config")
+    config.__dict__.update(spec["config"])
+    sys.modules["config"] = config
+    import main
+
+    generation, ttft, review = [], [], []  # 各筆結果的生成耗時、首個 token 時間與評審耗時
+    counts = {"results": 0, "generation_errors": 0, "review_errors": 0}
+
+    def collect(result):
+        counts["results"] += 1
+        if result.error is not None:
+            counts["generation_errors"] += 1
+        metrics = result.generation_metrics
+        if metrics.get("wall_time_s") is not None:
+            generation.append(metrics["wall_time_s"])
+        if metrics.get("ttft_s") is not None:
+            ttft.append(metrics["ttft_s"])
+        for item in result.reviews:
+            if item.error is not None:
+                counts["review_errors"] += 1
+            if item.latency_s is not None and not item.local_gate:
+                review.append(item.latency_s)
+
+    start = time.perf_counter()
+    main.run(main.build_parser().parse_args(spec["argv"]), on_result=collect)
+    wall = time.perf_counter() - start
+    peak_rss_mb = None
+    if resource is not None:
+        # Linux 的 ru_maxrss 單位為 KB，macOS 為 bytes
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    stats = dict(
+        counts,
+        wall_s=wall,
+        results_per_s=counts["results"] / wall if wall else None,
+        generation_s=percentiles(generation),
+        ttft_s=percentiles(ttft),
+        review_s=percentiles(review),
+        peak_rss_mb=peak_rss_mb,
+    )
+    with open(spec["result_path"], "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+
+
+def _write_output(args, data: dict):
+    """
+    以 JSON 輸出基準測試結果：指定 --output 時寫入檔案，否則印出到標準輸出。
+    """
+    output = json.dumps(data, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        logging.info(f"Benchmark results saved to: {args.output}")
+    else:
+        print(output)
+
+
+def _int_list(value: str) -> list:
+    """
+    解析以逗號分隔的整數列表，例如 "1,2,4"。
+    """
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv=None):
+    """
+    基準測試主函數：展開參數組合，逐一執行並輸出 JSON 結果。
+
+    Args:
+        argv (list, optional): 命令列參數列表，預設使用 sys.argv。
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the comparison pipeline against local stub Ollama/reviewer servers."
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--hosts", type=_int_list, default=[1], help="Stub Ollama host counts, e.g. 1,2.")
+    parser.add_argument("--models", type=_int_list, default=[2], help="Model counts, e.g. 1,2,4.")
+    parser.add_argument("--reviewers", type=_int_list, default=[3], help="Reviewer counts (1-3).")
+    parser.add_argument("--records", type=_int_list, default=[20], help="Dataset sizes, e.g. 10,100.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per grid point.")
+    parser.add_argument("--task", choices=sorted(BENCH_TASKS), default="translate", help="Task type.")
+    parser.add_argument("--input_chars", type=int, default=400, help="Characters per input record.")
+    parser.add_argument(
+        "--ollama_latency",
+        default="lognormal:0.05:0.3",
+        help="Stub Ollama time-to-first-token distribution: "
+        "SECONDS | fixed:S | uniform:MIN:MAX | exp:MEAN | lognormal:MEDIAN:SIGMA.",
+    )
+    parser.add_argument("--tokens_per_sec", type=float, default=400.0, help="Stub Ollama token rate.")
+    parser.add_argument("--output_tokens", type=int, default=64, help="Tokens per stub Ollama output.")
+    parser.add_argument(
+        "--ollama_error_rate", type=float, default=0.0, help="Probability of HTTP 500 per generation."
+    )
+    parser.add_argument(
+        "--reviewer_latency", default="lognormal:0.2:0.3", help="Stub reviewer latency distribution."
+    )
+    parser.add_argument(
+        "--reviewer_error_rate", type=float, default=0.0, help="Probability of HTTP 429 per review request."
+    )
+    parser.add_argument("--main_args", default="", help='Extra main.py arguments, e.g. --main_args="--batch_reviews".')
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for latencies and errors.")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Timeout per grid point (seconds).")
+    parser.add_argument("--output", help="Write the JSON results to this path instead of stdout.")
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Measure main.py startup time with an import-time breakdown instead of the pipeline grid.",
+    )
+    parser.add_argument("--startup_runs", type=int, default=10, help="Timed runs per startup scenario.")
+    parser.add_argument("--startup_top", type=int, default=15, help="Modules listed per import breakdown.")
+    parser.add_argument(
+        "--max_startup_ms",
+        type=float,
+        default=None,
+        help="With --startup, exit with status 1 if any main.py scenario's p50 exceeds this.",
+    )
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.worker:
+        _worker(args.worker)
+        return
+    if any(count < 1 or count > len(REVIEWER_PROVIDERS) for count in args.reviewers):
+        parser.error(f"--reviewers must be between 1 and {len(REVIEWER_PROVIDERS)}")
+    # 驗證延遲分佈設定，避免在模擬伺服器中才發生錯誤
+    for spec in (args.ollama_latency, args.reviewer_latency):
+        try:
+            parse_latency(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.startup:
+        startup = run_startup(args)
+        settings = {
+            key: getattr(args, key) for key in ("startup_runs", "startup_top", "max_startup_ms")
+        }
+        _write_output(args, {"settings": settings, "startup": startup})
+        slow = [
+            result["scenario"]
+            for result in startup
+            if args.max_startup_ms is not None
+            and result["scenario"] != "python"
+            and result["wall_ms"]["p50"] > args.max_startup_ms
+        ]
+        if slow:
+            logging.error(f"Startup p50 above {args.max_startup_ms} ms: {', '.join(slow)}")
+            sys.exit(1)
+        return
+
+    results = []
+    for hosts, models, reviewers, records in itertools.product(
+        args.hosts, args.models, args.reviewers, args.records
+    ):
+        for repeat in range(args.repeat):
+            point = run_point(args, hosts, models, reviewers, records, repeat)
+            logging.info(
+                f"hosts={hosts} models={models} reviewers={reviewers} records={records}: "
+                f"{point['results_per_s']:.2f} results/s, wall {point['wall_s']:.2f}s, "
+                f"peak RSS {point['peak_rss_mb']} MB"
+            )
+            results.append(point)
+    settings = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("worker", "output", "startup", "startup_runs", "startup_top", "max_startup_ms")
+    }
+    _write_output(args, {"settings": settings, "runs": results})
+
+
+if __name__ == "__main__":
+    main()
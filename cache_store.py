@@ -0,0 +1,198 @@
+# cache_store.py
+# 此檔案包含以 SQLite 實作的持久化鍵值快取，供 Ollama 生成結果與評審結果重複使用。
+# 快取以內容雜湊為鍵，依總大小進行 LRU 淘汰，並可選擇設定存活時間 (TTL)。
+
+import hashlib  # 用於計算內容雜湊鍵
+import json  # 用於序列化快取鍵與快取值
+import logging  # 用於記錄程式運行訊息
+import os  # 用於建立快取目錄
+import sqlite3  # 用於持久化儲存快取資料
+import threading  # 用於保護跨執行緒共用的資料庫連線
+import time  # 用於記錄存取時間與判斷過期
+
+
+def content_key(*parts) -> str:
+    """
+    將任意可序列化為 JSON 的內容組合為固定長度的雜湊鍵。
+
+    Args:
+        *parts: 組成快取鍵的內容 (字串、數字、字典等)。
+
+    Returns:
+        str: SHA-256 十六進位雜湊字串。
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """
+    計算文字內容的 SHA-256 雜湊值。
+
+    Args:
+        text (str): 要計算雜湊的文字。
+
+    Returns:
+        str: SHA-256 十六進位雜湊字串。
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """
+    以 SQLite 實作的持久化快取類別。
+    值以 JSON 儲存；總大小超過上限時淘汰最久未存取的項目 (LRU)，
+    並可選擇讓超過存活時間的項目失效。
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds=None, name="cache"):
+        """
+        初始化快取並在需要時建立資料表。
+
+        Args:
+            path (str): SQLite 資料庫檔案路徑。
+            max_bytes (int): 快取值總大小上限 (位元組)，超過時進行 LRU 淘汰。
+            ttl_seconds (float, optional): 項目存活時間 (秒)，None 表示永不過期。
+            name (str, optional): 快取名稱，用於日誌訊息。
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path  # 資料庫檔案路徑
+        self.max_bytes = max_bytes  # 快取總大小上限
+        self.ttl_seconds = ttl_seconds  # 項目存活時間
+        self.name = name  # 快取名稱
+        # stats: 命中、未命中、寫入、淘汰與過期次數的計數器
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expired": 0}
+        self._lock = threading.Lock()
+        # 連線會在多個工作執行緒間共用，所有存取都由 _lock 保護
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)"
+        )
+        self._conn.commit()
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        self._total_bytes = row[0]  # 目前快取值的總大小
+
+    def get(self, key: str):
+        """
+        讀取快取項目並更新其存取時間。
+
+        Args:
+            key (str): 快取鍵。
+
+        Returns:
+            任何型別或 None: 反序列化後的快取值；未命中或已過期時回傳 None。
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value, size, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                # 過期項目視為未命中並直接移除
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total_bytes -= size
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return json.loads(value)
+
+    def contains(self, key: str) -> bool:
+        """
+        檢查快取中是否有未過期的項目，不更新存取時間也不計入統計。
+
+        Args:
+            key (str): 快取鍵。
+
+        Returns:
+            bool: 項目存在且未過期時為 True。
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False
+        return self.ttl_seconds is None or time.time() - row[0] <= self.ttl_seconds
+
+    def put(self, key: str, value):
+        """
+        寫入快取項目，必要時淘汰最久未存取的項目。
+
+        Args:
+            key (str): 快取鍵。
+            value: 可序列化為 JSON 的快取值。
+        """
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            # 單一項目超過整個快取上限時不寫入
+            return
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._total_bytes -= row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            self._total_bytes += size
+            self.stats["writes"] += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        """
+        在持有鎖的情況下，依最久未存取順序淘汰項目直到總大小低於上限。
+        """
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    return
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.stats["evictions"] += 1
+
+    def log_stats(self):
+        """
+        將快取的命中/未命中等計數記錄到日誌。
+        """
+        logging.info(
+            f"{self.name}: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+            f"{self.stats['writes']} writes, {self.stats['evictions']} evictions, "
+            f"{self.stats['expired']} expired, {self._total_bytes} bytes stored"
+        )
+
+    def close(self):
+        """
+        關閉資料庫連線。
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,350 @@
+# chunking.py
+# 此檔案包含長輸入的分段處理邏輯。
+# - chunk_text: 依估計的 token 數量將文字切成段落/句子對齊的區段。
+# - ChunkedOllamaClient: 包裝 Ollama 客戶端，超過上限的輸入分段並行生成後再合併：
+#   翻譯任務依原文順序串接各段譯文；總結任務先分別總結各段 (map)，再整合成最終總結 (reduce)。
+
+import logging  # 用於記錄程式運行訊息
+import re  # 用於切分段落與句子
+import time  # 用於量測每個區段與整體的耗時
+from concurrent.futures import ThreadPoolExecutor  # 用於並行生成各區段
+
+from http_session import to_thread  # 用於在工作執行緒中執行分段生成
+from rate_limit import estimate_tokens, is_cjk_char  # 用於估計文字的 token 數量
+from tracing import span  # 每個區段的追蹤 span
+
+# 單一區段預設的估計 token 上限 (小型本地模型的上下文長度需同時容納提示詞與輸出)
+DEFAULT_CHUNK_TOKENS = 1500
+# 預設同時送給同一台 Ollama 主機的區段數量 (需配合 Ollama 的 OLLAMA_NUM_PARALLEL)
+DEFAULT_CHUNK_CONCURRENCY = 2
+# 整合各段總結時使用的任務類型 (提示詞定義於 ollama_client.PROMPT_TEMPLATES)
+REDUCE_TASK = "summarize_reduce"
+
+# 段落分隔：一個以上的空行
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n\s*")
+# 句子結尾：中英文句末標點 (可接引號或括號) 之後的空白，或中文句末標點本身
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])[\"')\]]*\s+|(?<=[。！？；])[」』）]*")
+
+
+def _split_keep(text: str, pattern) -> list:
+    """
+    依分隔規則切分文字，分隔字元保留在前一段的結尾，串接後與原文完全相同。
+
+    Args:
+        text (str): 要切分的文字。
+        pattern (re.Pattern): 分隔規則。
+
+    Returns:
+        list: 非空的文字片段列表。
+    """
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        end = match.end()
+        if end > start:
+            pieces.append(text[start:end])
+            start = end
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _hard_split(text: str, max_tokens: int) -> list:
+    """
+    將單一句子依字元切成不超過上限的片段 (只用於沒有句末標點的超長句子)。
+
+    Args:
+        text (str): 要切分的文字。
+        max_tokens (int): 每個片段的估計 token 上限。
+
+    Returns:
+        list: 文字片段列表。
+    """
+    pieces = []
+    start = 0
+    cjk = other = 0  # 目前片段中的中日韓文字數量與其他字元數量
+    for index, char in enumerate(text):
+        is_cjk = is_cjk_char(char)
+        if index > start and cjk + is_cjk + (other + (not is_cjk) + 3) // 4 > max_tokens:
+            pieces.append(text[start:index])
+            start = index
+            cjk = other = 0
+        if is_cjk:
+            cjk += 1
+        else:
+            other += 1
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> list:
+    """
+    依估計的 token 數量將文字切成區段。
+    優先在段落邊界切分，段落過長時改在句子邊界切分，只有單一句子超過上限時才依字元切分；
+    相鄰的短段落/句子會合併到同一個區段中。所有區段串接後與原文完全相同。
+
+    Args:
+        text (str): 要切分的文字。
+        max_tokens (int, optional): 每個區段的估計 token 上限。
+
+    Returns:
+        list: 區段文字列表；文字不超過上限時只有一個區段。
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    # 先將文字拆成不超過上限的最小單位 (段落、句子或字元片段)
+    units = []
+    for paragraph in _split_keep(text, _PARAGRAPH_RE):
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for sentence in _split_keep(paragraph, _SENTENCE_RE):
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append(sentence)
+            else:
+                units.extend(_hard_split(sentence, max_tokens))
+    # 再依序合併相鄰單位，直到加入下一個單位會超過上限為止
+    chunks = []
+    current = ""
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(current)
+            current = ""
+            current_tokens = 0
+        current += unit
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _trailing_break(text: str) -> str:
+    """
+    取得區段結尾的換行，用於串接譯文時保留原文的段落結構。
+
+    Args:
+        text (str): 原文區段。
+
+    Returns:
+        str: 結尾包含空行時為 "\\n\\n"，包含換行時為 "\\n"，否則為空字串。
+    """
+    tail = text[len(text.rstrip()):]
+    newlines = tail.count("\n")
+    if newlines >= 2:
+        return "\n\n"
+    return "\n" if newlines == 1 else ""
+
+
+class ChunkedOllamaClient:
+    """
+    長輸入分段包裝類別。
+    估計 token 數量不超過上限的輸入直接交給被包裝的客戶端；超過時分段並行生成後合併，
+    生成指標中的 'chunks' 記錄每個區段的耗時與 token 數量。
+    被包裝的客戶端若有生成快取，每個區段會各自快取。
+    """
+
+    def __init__(
+        self,
+        client,
+        max_tokens: int = DEFAULT_CHUNK_TOKENS,
+        concurrency: int = DEFAULT_CHUNK_CONCURRENCY,
+    ):
+        """
+        初始化分段包裝客戶端。
+
+        Args:
+            client: 實際執行生成的 Ollama 客戶端 (可為 CachedOllamaClient)。
+            max_tokens (int, optional): 每個區段的估計 token 上限。
+            concurrency (int, optional): 同時生成的區段數量。
+        """
+        self.client = client  # 被包裝的 Ollama 客戶端
+        self.max_tokens = max(1, max_tokens)  # 每個區段的估計 token 上限
+        self.concurrency = max(1, concurrency)  # 同時生成的區段數量
+
+    def __getattr__(self, name):
+        # 其餘屬性與方法直接轉交給被包裝的客戶端
+        return getattr(self.client, name)
+
+    def _generate_chunks(self, model_name: str, chunks: list, task_type: str, stage: str):
+        """
+        並行生成所有區段。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+            chunks (list): 區段文字列表。
+            task_type (str): 任務類型。
+            stage (str): 區段所屬的階段 ("map" 或 "reduce")，記錄於區段指標中。
+
+        Returns:
+            tuple: (依區段順序排列的輸出列表, 依區段順序排列的區段指標列表)。
+
+        Raises:
+            Exception: 任一區段生成失敗時引發該區段的例外。
+        """
+
+        def run(index_chunk):
+            index, chunk = index_chunk
+            with span(
+                "chunk",
+                model=model_name,
+                task=task_type,
+                stage=stage,
+                index=index,
+                input_bytes=len(chunk.encode("utf-8")),
+            ):
+                start = time.perf_counter()
+                output, metrics = self.client.generate_with_metrics(model_name, chunk, task_type)
+                elapsed = time.perf_counter() - start
+            logging.info(
+                f"[stage:chunk] {model_name} {stage} chunk {index + 1}/{len(chunks)} "
+                f"took {elapsed:.3f}s"
+            )
+            return output, {
+                "stage": stage,  # 區段所屬階段
+                "index": index,  # 區段索引
+                "input_tokens_est": estimate_tokens(chunk),  # 區段的估計 token 數量
+                "wall_time_s": elapsed,  # 區段生成耗時 (秒)
+                "ttft_s": metrics.get("ttft_s"),  # 區段的首個 token 時間
+                "prompt_eval_count": metrics.get("prompt_eval_count"),
+                "eval_count": metrics.get("eval_count"),
+                "done_reason": metrics.get("done_reason"),  # 區段的結束原因
+                "cached": bool(metrics.get("cached")),  # 區段是否來自生成快取
+            }
+
+        if len(chunks) == 1 or self.concurrency == 1:
+            results = [run(item) for item in enumerate(chunks)]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.concurrency, len(chunks)), thread_name_prefix="ollama-chunk"
+            ) as executor:
+                results = list(executor.map(run, enumerate(chunks)))
+        return [output for output, _ in results], [metrics for _, metrics in results]
+
+    def _reduce_summaries(self, model_name: str, summaries: list, chunk_metrics: list) -> str:
+        """
+        將各段總結整合成最終總結；合併後仍超過上限時先分組整合，直到只剩一份總結。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+            summaries (list): 各段總結列表。
+            chunk_metrics (list): 區段指標列表，整合階段的指標會附加到此列表。
+
+        Returns:
+            str: 最終總結。
+        """
+        while True:
+            combined = "\n\n".join(summary.strip() for summary in summaries)
+            groups = chunk_text(combined, self.max_tokens)
+            outputs, metrics = self._generate_chunks(model_name, groups, REDUCE_TASK, "reduce")
+            chunk_metrics.extend(metrics)
+            if len(outputs) == 1:
+                return outputs[0]
+            if len(outputs) >= len(summaries):
+                # 整合後沒有變短 (例如模型輸出過長)，直接串接避免無限迴圈
+                logging.warning(f"{model_name} summaries did not shrink while reducing")
+                return "\n\n".join(output.strip() for output in outputs)
+            summaries = outputs
+
+    def generate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        產生輸出與生成指標；長輸入分段生成後合併。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (輸出文字, 生成指標字典)。分段時 'wall_time_s' 為整體耗時，
+                   token 數量為各區段的總和，'ttft_s' 為最早的區段首個 token 時間，
+                   'chunks' 為各區段的指標列表。
+        """
+        chunks = chunk_text(input_text, self.max_tokens)
+        if len(chunks) == 1:
+            return self.client.generate_with_metrics(model_name, input_text, task_type)
+        logging.info(
+            f"Splitting {task_type} input for {model_name} into {len(chunks)} chunks "
+            f"(~{self.max_tokens} tokens each)"
+        )
+        start = time.perf_counter()
+        outputs, chunk_metrics = self._generate_chunks(model_name, chunks, task_type, "map")
+        if task_type == "summarize":
+            output = self._reduce_summaries(model_name, outputs, chunk_metrics)
+        else:
+            # 翻譯等逐段對應的任務依原文順序串接，並保留原文區段之間的換行
+            output = "".join(
+                translated.strip() + _trailing_break(chunk)
+                for chunk, translated in zip(chunks, outputs)
+            ).rstrip()
+        wall_time = time.perf_counter() - start
+        eval_count = sum(metrics.get("eval_count") or 0 for metrics in chunk_metrics)
+        ttfts = [metrics["ttft_s"] for metrics in chunk_metrics if metrics.get("ttft_s") is not None]
+        return output, {
+            "wall_time_s": wall_time,  # 整體耗時 (秒)
+            "ttft_s": min(ttfts) if ttfts else None,  # 最早的區段首個 token 時間
+            "prompt_eval_count": sum(
+                metrics.get("prompt_eval_count") or 0 for metrics in chunk_metrics
+            ),
+            "eval_count": eval_count,
+            "tokens_per_sec": eval_count / wall_time if wall_time else None,
+            # 任一區段達到長度上限時，合併後的輸出也不完整
+            "done_reason": next(
+                (
+                    "length"
+                    for metrics in chunk_metrics
+                    if metrics.get("done_reason") == "length"
+                ),
+                "stop",
+            ),
+            "cached": all(metrics["cached"] for metrics in chunk_metrics),
+            "chunks": chunk_metrics,  # 各區段的指標
+        }
+
+    def generate(self, model_name: str, input_text: str, task_type: str) -> str:
+        """
+        產生輸出；長輸入分段生成後合併。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            str: 模型產生的輸出文字。
+        """
+        return self.generate_with_metrics(model_name, input_text, task_type)[0]
+
+    async def agenerate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        generate_with_metrics 的非同步版本。
+        不需分段的輸入直接 await 被包裝的客戶端；需要分段時沿用同步實作
+        (各區段以執行緒池並行)，在工作執行緒中執行，不會阻塞事件迴圈。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (輸出文字, 生成指標字典)。
+        """
+        if len(chunk_text(input_text, self.max_tokens)) == 1:
+            return await self.client.agenerate_with_metrics(model_name, input_text, task_type)
+        return await to_thread(self.generate_with_metrics, model_name, input_text, task_type)
+
+    async def agenerate(self, model_name: str, input_text: str, task_type: str) -> str:
+        """
+        generate 的非同步版本。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            str: 模型產生的輸出文字。
+        """
+        return (await self.agenerate_with_metrics(model_name, input_text, task_type))[0]
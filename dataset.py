@@ -0,0 +1,105 @@
+# dataset.py
+# 此檔案包含批次 (資料集) 模式的輸入讀取函數。
+# 資料集為 JSONL 檔案，每一行是一筆 JSON 記錄，會以串流方式逐筆讀取，
+# 讓整個資料集在同一個程序中共用 Ollama 與評審客戶端。
+
+import json  # 用於解析 JSONL 記錄
+import logging  # 用於記錄程式運行訊息
+
+# 未指定文字欄位時，依序嘗試的欄位名稱
+TEXT_FIELD_CANDIDATES = ("text", "input_text", "input", "body")
+# 未指定識別碼欄位時，依序嘗試的欄位名稱
+ID_FIELD_CANDIDATES = ("id", "record_id", "request_id")
+# 未指定參考答案欄位時，依序嘗試的欄位名稱
+REFERENCE_FIELD_CANDIDATES = ("reference", "references", "target")
+
+
+def _pick_field(record: dict, field, candidates):
+    """
+    從記錄中選出要使用的欄位值。
+
+    Args:
+        record (dict): JSON 記錄。
+        field (str or None): 使用者指定的欄位名稱，None 表示自動偵測。
+        candidates (tuple): 自動偵測時依序嘗試的欄位名稱。
+
+    Returns:
+        任何型別或 None: 欄位值；找不到時回傳 None。
+    """
+    if field:
+        return record.get(field)
+    for candidate in candidates:
+        if record.get(candidate) not in (None, ""):
+            return record[candidate]
+    return None
+
+
+def _clean_reference(value):
+    """
+    整理參考答案欄位的值，只保留非空白的字串。
+
+    Args:
+        value: 欄位值：字串、字串列表 (多個參考答案)，或任務類型對應參考答案的字典。
+
+    Returns:
+        str, list, dict 或 None: 整理後的參考答案；沒有可用的參考答案時回傳 None。
+    """
+    if isinstance(value, str):
+        return value if value.strip() else None
+    if isinstance(value, list):
+        references = [item for item in value if isinstance(item, str) and item.strip()]
+        return references or None
+    if isinstance(value, dict):
+        references = {
+            task: reference
+            for task, reference in ((task, _clean_reference(item)) for task, item in value.items())
+            if reference is not None
+        }
+        return references or None
+    return None
+
+
+def iter_dataset_records(file_path: str, text_field=None, id_field=None, reference_field=None):
+    """
+    以串流方式逐筆讀取 JSONL 資料集。
+
+    Args:
+        file_path (str): JSONL 資料集檔案路徑。
+        text_field (str, optional): 包含輸入文字的欄位名稱，
+                                    未指定時依序嘗試 TEXT_FIELD_CANDIDATES。
+        id_field (str, optional): 包含記錄識別碼的欄位名稱，
+                                  未指定時依序嘗試 ID_FIELD_CANDIDATES，再退回行號。
+        reference_field (str, optional): 包含參考答案的欄位名稱，
+                                         未指定時依序嘗試 REFERENCE_FIELD_CANDIDATES。
+                                         欄位值可以是字串、字串列表 (多個參考答案)，
+                                         或任務類型對應參考答案的字典。
+
+    Yields:
+        dict: 包含 'record_id'、'input_text' 與 'reference' (沒有參考答案時為 None) 鍵的記錄。
+              無法解析或缺少輸入文字的行會記錄警告後略過。
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.warning(f"Skipping invalid JSON at {file_path}:{line_number}: {e}")
+                continue
+            if not isinstance(record, dict):
+                logging.warning(f"Skipping non-object record at {file_path}:{line_number}")
+                continue
+            input_text = _pick_field(record, text_field, TEXT_FIELD_CANDIDATES)
+            if not isinstance(input_text, str) or not input_text.strip():
+                logging.warning(f"Skipping record without input text at {file_path}:{line_number}")
+                continue
+            record_id = _pick_field(record, id_field, ID_FIELD_CANDIDATES)
+            yield {
+                "record_id": str(record_id) if record_id is not None else f"line-{line_number}",
+                "input_text": input_text,
+                "reference": _clean_reference(
+                    _pick_field(record, reference_field, REFERENCE_FIELD_CANDIDATES)
+                ),
+            }
@@ -0,0 +1,242 @@
+# early_stop.py
+# 此檔案包含資料集模式的提前停止 (逐輪淘汰) 邏輯。
+# 模型分輪處理資料集：每一輪所有仍在比較中的模型處理接下來的一批記錄，
+# 每輪的記錄數量加倍 (與 successive halving 相同的排程，模型切換次數只隨記錄數量對數成長)。
+# 每輪結束後以成對的評分差異檢定淘汰統計上明顯落後的模型，
+# 之後的 Ollama 生成與評審呼叫只花在仍難分高下的模型上。
+
+import logging  # 用於記錄程式運行訊息
+import math  # 用於計算標準誤
+from statistics import NormalDist  # 用於計算常態分佈的臨界值
+
+from aggregation import result_item_key  # 用於辨識不同模型對同一輸入的結果
+
+# 第一輪的記錄數量，也是淘汰模型前最少需要的共同評分輸入數
+DEFAULT_MIN_RECORDS = 10
+# 淘汰檢定的整體信賴水準
+DEFAULT_CONFIDENCE = 0.95
+# 剩餘模型數量降到此值時停止整個比較
+DEFAULT_MIN_MODELS = 1
+
+
+class SequentialElimination:
+    """
+    逐輪淘汰控制器。
+    第 r 輪 (從 0 起算) 處理 min_records × 2^r 筆記錄。每輪結束後，
+    對每一對仍在比較中的模型，在兩者都有評分的輸入上計算評分差異 (每筆輸入的評分為所有評審的平均)，
+    若某個模型明顯優於另一個模型 (差異的單尾信賴下界大於 0)，落後的模型即被淘汰。
+    為了控制多輪檢視與多重比較造成的誤判，第 r 輪的顯著水準為 (1 - confidence) / 2^(r+1)，
+    再除以每個模型的比較對象數量 (Bonferroni 校正)，讓每個模型在所有輪次中被誤淘汰的機率不超過 1 - confidence。
+    """
+
+    def __init__(
+        self,
+        models,
+        min_records: int = DEFAULT_MIN_RECORDS,
+        confidence: float = DEFAULT_CONFIDENCE,
+        min_models: int = DEFAULT_MIN_MODELS,
+        task_count: int = 1,
+    ):
+        """
+        初始化逐輪淘汰控制器。
+
+        Args:
+            models (list): 參與比較的 Ollama 模型名稱列表。
+            min_records (int, optional): 第一輪的記錄數量，以及淘汰前最少需要的共同評分輸入數。
+            confidence (float, optional): 淘汰檢定的整體信賴水準。
+            min_models (int, optional): 剩餘模型數量降到此值時停止比較。
+            task_count (int, optional): 每筆記錄要執行的任務數量，用於計算生成數量。
+        """
+        self.models = list(models)  # 所有參與比較的模型
+        self.active = list(models)  # 仍在比較中的模型 (保持設定檔中的順序)
+        self.min_records = max(2, min_records)  # 第一輪的記錄數量
+        self.confidence = confidence  # 整體信賴水準
+        self.min_models = max(1, min_models)  # 停止比較的剩餘模型數量
+        self.task_count = max(1, task_count)  # 每筆記錄的任務數量
+        self.eliminated = []  # 已淘汰模型的淘汰資訊
+        self.rounds = []  # 每輪的起始記錄、記錄數量與參與模型
+        self.generations = 0  # 實際處理的 (模型, 任務, 記錄) 組合數量
+        # _scores: 模型名稱對應 {輸入項目鍵: [評分總和, 評分數量]}
+        self._scores = {model: {} for model in self.models}
+
+    def schedule(self):
+        """
+        產生每一輪要處理的記錄範圍；由呼叫端在記錄用完或 finished() 為 True 時停止迭代。
+
+        Yields:
+            tuple: (輪次, 起始記錄索引, 結束記錄索引 (不含))。
+        """
+        start = 0
+        round_index = 0
+        while True:
+            stop = start + self.min_records * 2 ** round_index
+            yield round_index, start, stop
+            start = stop
+            round_index += 1
+
+    def start_round(self, round_index: int, start: int, size: int):
+        """
+        記錄一輪的開始。
+
+        Args:
+            round_index (int): 輪次。
+            start (int): 起始記錄索引。
+            size (int): 本輪的記錄數量。
+        """
+        self.rounds.append(
+            {"round": round_index, "start": start, "size": size, "models": list(self.active)}
+        )
+        self.generations += size * len(self.active) * self.task_count
+        logging.info(
+            f"[early-stop] round {round_index + 1}: records {start + 1}-{start + size} "
+            f"for {len(self.active)} models ({', '.join(self.active)})"
+        )
+
+    def observe(self, result):
+        """
+        加入一筆完成的模型處理結果的評分。
+
+        Args:
+            result (ModelResult): 單一模型的處理結果。
+        """
+        scores = self._scores.get(result.ollama_model)
+        if scores is None:
+            return
+        item = result_item_key(result)
+        for review in result.reviews:
+            score = review.overall_score
+            if score is not None:
+                entry = scores.setdefault(item, [0.0, 0])
+                entry[0] += score
+                entry[1] += 1
+
+    def _compare(self, better: str, worse: str, z: float):
+        """
+        檢定 better 是否明顯優於 worse。
+
+        Args:
+            better (str): 候選的較佳模型。
+            worse (str): 候選的較差模型。
+            z (float): 單尾檢定的常態臨界值。
+
+        Returns:
+            tuple: (平均評分差異, 差異的信賴下界, 共同評分輸入數)；共同輸入不足時差異與下界為 None。
+        """
+        scores_better = self._scores[better]
+        scores_worse = self._scores[worse]
+        differences = [
+            total / count - scores_worse[item][0] / scores_worse[item][1]
+            for item, (total, count) in scores_better.items()
+            if item in scores_worse
+        ]
+        pairs = len(differences)
+        if pairs < self.min_records:
+            return None, None, pairs
+        mean = sum(differences) / pairs
+        variance = sum((value - mean) ** 2 for value in differences) / (pairs - 1)
+        return mean, mean - z * math.sqrt(variance / pairs), pairs
+
+    def eliminate(self, round_index: int) -> list:
+        """
+        一輪結束後淘汰明顯落後的模型。
+
+        Args:
+            round_index (int): 剛結束的輪次。
+
+        Returns:
+            list: 本輪淘汰的模型名稱列表。
+        """
+        if len(self.active) < 2:
+            return []
+        alpha = (1.0 - self.confidence) / 2 ** (round_index + 1) / (len(self.active) - 1)
+        z = NormalDist().inv_cdf(1.0 - alpha)
+        dominated = {}
+        for worse in self.active:
+            best = None
+            for better in self.active:
+                if better == worse:
+                    continue
+                mean, lower, pairs = self._compare(better, worse, z)
+                if lower is not None and lower > 0 and (best is None or lower > best["lower"]):
+                    best = {
+                        "model": worse,
+                        "round": round_index,
+                        "by": better,
+                        "mean_diff": mean,
+                        "lower": lower,
+                        "pairs": pairs,
+                    }
+            if best is not None:
+                dominated[worse] = best
+        if len(dominated) >= len(self.active):
+            # 各對模型的共同輸入不同時理論上可能互相勝出，此時不淘汰任何模型
+            return []
+        for worse, info in dominated.items():
+            self.active.remove(worse)
+            self.eliminated.append(info)
+            logging.info(
+                f"[early-stop] eliminated {worse} after round {round_index + 1}: "
+                f"{info['by']} scores {info['mean_diff']:+.2f} higher on {info['pairs']} shared inputs "
+                f"(lower bound {info['lower']:+.2f})"
+            )
+        return list(dominated)
+
+    def finished(self) -> bool:
+        """
+        Returns:
+            bool: 剩餘模型數量已降到 min_models 以下時為 True。
+        """
+        return len(self.active) <= self.min_models
+
+    def log_summary(self, total_records: int):
+        """
+        記錄提前停止節省的生成數量。
+
+        Args:
+            total_records (int): 資料集的記錄總數。
+        """
+        full = total_records * len(self.models) * self.task_count
+        saved = 1.0 - self.generations / full if full else 0.0
+        logging.info(
+            f"[early-stop] ran {self.generations} of {full} generations "
+            f"({saved:.0%} saved) in {len(self.rounds)} rounds; remaining: {', '.join(self.active)}"
+        )
+
+    def render(self, total_records: int) -> list:
+        """
+        產生提前停止段落的 Markdown 行。
+
+        Args:
+            total_records (int): 資料集的記錄總數。
+
+        Returns:
+            list: 提前停止段落的 Markdown 行列表。
+        """
+        full = total_records * len(self.models) * self.task_count
+        report_lines = ["## 提前停止", ""]
+        report_lines.append(
+            f"分 {len(self.rounds)} 輪處理，實際執行 {self.generations} / {full} 次生成"
+            f" (信賴水準 {self.confidence * 100:g}%)。被淘汰的模型只處理了淘汰前的記錄，"
+            "其平均評分與排名僅供參考。"
+        )
+        report_lines.append("")
+        report_lines.append("| 輪次 | 記錄 | 參與模型數 |")
+        report_lines.append("| --- | --- | --- |")
+        for entry in self.rounds:
+            report_lines.append(
+                f"| {entry['round'] + 1} | {entry['start'] + 1}-{entry['start'] + entry['size']} "
+                f"| {len(entry['models'])} |"
+            )
+        report_lines.append("")
+        if self.eliminated:
+            report_lines.append("| 淘汰模型 | 淘汰輪次 | 明顯較佳的模型 | 平均評分差異 | 差異信賴下界 | 共同輸入數 |")
+            report_lines.append("| --- | --- | --- | --- | --- | --- |")
+            for info in self.eliminated:
+                report_lines.append(
+                    f"| {info['model']} | {info['round'] + 1} | {info['by']} "
+                    f"| {info['mean_diff']:+.2f} | {info['lower']:+.2f} | {info['pairs']} |"
+                )
+        else:
+            report_lines.append("- _沒有模型被淘汰。_")
+        report_lines.append("")
+        return report_lines
@@ -0,0 +1,778 @@
+# http_session.py
+# 此檔案包含所有客戶端共用的非同步 HTTP 工作階段。
+# - 一個在背景執行緒中運行的共用事件迴圈：同步呼叫端以 run() 提交協程並等待結果，
+#   非同步呼叫端 (包含在其他事件迴圈中執行的協程) 則直接 await。
+# - 依 (協定, 主機, 連接埠) 分組的 keep-alive 連線池，Ollama 與所有評審提供者共用，
+#   大量同時進行中的請求只佔用 socket，不需要每個請求一個執行緒。
+# - 安裝 httpx 與 h2 時，HTTPS 請求改用 httpx.AsyncClient，對支援的服務 (以 ALPN 協商) 啟用 HTTP/2 多工；
+#   純文字 HTTP (例如本機 Ollama) 與未安裝時使用標準函式庫 asyncio 實作的 HTTP/1.1 客戶端。
+
+import asyncio  # 用於事件迴圈、串流連線與逾時
+import contextvars  # 用於將呼叫端的追蹤內容傳入工作執行緒
+import functools  # 用於組合在工作執行緒中執行的呼叫
+import importlib.util  # 用於在不匯入的情況下檢查選用套件是否安裝
+import logging  # 用於記錄程式運行訊息
+import ssl  # 用於 HTTPS 連線
+import threading  # 用於執行共用事件迴圈的背景執行緒
+from collections import deque  # 用於保存閒置連線
+from urllib.parse import urlsplit  # 用於解析請求位址
+
+# 選用的 httpx (提供 HTTP/2 與連線池的非同步 HTTP 客戶端) 與 h2 (httpx 啟用 HTTP/2 所需的套件)。
+# httpx 的匯入成本不低，而且只有 HTTPS 來源會用到，因此這裡只檢查是否安裝，
+# 第一個 HTTPS 請求時才由 _load_httpx 匯入
+httpx = None
+_HTTP2_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("httpx", "h2"))
+
+# 每個來源 (協定, 主機, 連接埠) 同時開啟的連線數量上限
+DEFAULT_MAX_CONNECTIONS = 256
+# 每個來源保留的閒置 keep-alive 連線數量上限
+DEFAULT_MAX_KEEPALIVE = 32
+# 連線與每次讀取的預設逾時 (秒)
+DEFAULT_TIMEOUT = 600
+# 讀取回應內容時每次最多讀取的位元組數量
+_READ_SIZE = 65536
+# 串流讀取結束的哨兵物件
+_END = object()
+
+
+async def _wait(awaitable, timeout):
+    """
+    在逾時內等待，並將 asyncio 特有的例外轉換為一般的連線錯誤。
+
+    Raises:
+        TimeoutError: 逾時。
+        ConnectionError: 連線在讀取完成前關閉。
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"HTTP request timed out after {timeout}s") from None
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError(f"Connection closed mid-response: {e}") from None
+
+
+async def to_thread(func, *args):
+    """
+    在事件迴圈的預設執行緒池中執行阻塞的函數 (例如 SQLite 快取讀寫) 並等待結果，
+    不會阻塞共用事件迴圈上其他進行中的請求。
+    等同於 Python 3.9 的 asyncio.to_thread (同樣會傳入呼叫端的 contextvars)，在 Python 3.8 也能使用。
+
+    Args:
+        func (callable): 要執行的函數。
+        *args: 傳給函數的參數。
+
+    Returns:
+        函數的回傳值。
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await loop.run_in_executor(None, call)
+
+
+class HTTPResult:
+    """
+    完整讀取的 HTTP 回應。
+    """
+    __slots__ = ("status", "headers", "body", "http_version")
+
+    def __init__(self, status: int, headers: dict, body: bytes, http_version: str):
+        """
+        Args:
+            status (int): HTTP 狀態碼。
+            headers (dict): 回應標頭，鍵為小寫的標頭名稱。
+            body (bytes): 回應內容。
+            http_version (str): 實際使用的協定版本，例如 "HTTP/1.1" 或 "HTTP/2"。
+        """
+        self.status = status  # HTTP 狀態碼
+        self.headers = headers  # 回應標頭
+        self.body = body  # 回應內容
+        self.http_version = http_version  # 協定版本
+
+    def text(self) -> str:
+        """
+        Returns:
+            str: 以 UTF-8 解碼的回應內容，無法解碼的位元組以替代字元表示。
+        """
+        return self.body.decode("utf-8", errors="replace")
+
+
+class HTTPStatusError(RuntimeError):
+    """
+    串流請求收到非 200 狀態碼時引發的錯誤。
+    """
+
+    def __init__(self, result: HTTPResult):
+        """
+        Args:
+            result (HTTPResult): 錯誤回應 (內容已完整讀取)。
+        """
+        super().__init__(f"HTTP {result.status}: {result.text()[:200]}")
+        self.result = result  # 錯誤回應
+
+
+class _Connection:
+    """
+    一條 HTTP/1.1 連線 (asyncio 串流)。
+    """
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader, writer):
+        self.reader = reader  # asyncio.StreamReader
+        self.writer = writer  # asyncio.StreamWriter
+
+    def close(self):
+        self.writer.close()
+
+
+class _Response:
+    """
+    標準函式庫後端的 HTTP/1.1 回應，依 Content-Length、chunked 或連線關閉判斷內容結尾。
+    """
+
+    def __init__(self, connection: _Connection, status: int, headers: dict, method: str, timeout):
+        self.connection = connection  # 回應所在的連線
+        self.status = status  # HTTP 狀態碼
+        self.headers = headers  # 回應標頭 (小寫鍵)
+        self.timeout = timeout  # 每次讀取的逾時
+        self.complete = False  # 內容是否已讀取完畢
+        # keep_alive: 伺服器未要求關閉且內容有明確結尾時，連線可以重複使用
+        self.keep_alive = "close" not in headers.get("connection", "").lower()
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        self._remaining = None  # Content-Length 模式下剩餘的位元組數量
+        self._chunk_left = 0  # chunked 模式下目前區塊剩餘的位元組數量
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            self.complete = True
+        elif not self._chunked:
+            length = headers.get("content-length")
+            if length is not None:
+                self._remaining = int(length)
+                self.complete = self._remaining == 0
+            else:
+                # 沒有長度資訊時讀到連線關閉為止，之後不能再重複使用
+                self.keep_alive = False
+
+    async def _read(self, awaitable):
+        return await _wait(awaitable, self.timeout)
+
+    async def read_chunk(self) -> bytes:
+        """
+        讀取下一段回應內容。
+
+        Returns:
+            bytes: 回應內容片段；內容讀取完畢時回傳空位元組。
+        """
+        if self.complete:
+            return b""
+        reader = self.connection.reader
+        if self._chunked:
+            if self._chunk_left == 0:
+                size_line = await self._read(reader.readline())
+                if not size_line:
+                    raise ConnectionError("Connection closed inside chunked response")
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # 略過 trailer 直到空行
+                    while (await self._read(reader.readline())).strip():
+                        pass
+                    self.complete = True
+                    return b""
+                self._chunk_left = size
+            data = await self._read(reader.read(min(self._chunk_left, _READ_SIZE)))
+            if not data:
+                raise ConnectionError("Connection closed inside chunked response")
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                await self._read(reader.readexactly(2))  # 區塊結尾的 CRLF
+            return data
+        if self._remaining is not None:
+            data = await self._read(reader.read(min(self._remaining, _READ_SIZE)))
+            if not data:
+                raise ConnectionError("Connection closed before the response body was complete")
+            self._remaining -= len(data)
+            self.complete = self._remaining == 0
+            return data
+        data = await self._read(reader.read(_READ_SIZE))
+        if not data:
+            self.complete = True
+        return data
+
+    async def read(self) -> bytes:
+        """
+        Returns:
+            bytes: 剩餘的完整回應內容。
+        """
+        parts = []
+        while True:
+            data = await self.read_chunk()
+            if not data:
+                return b"".join(parts)
+            parts.append(data)
+
+
+class _OriginPool:
+    """
+    單一來源 (協定, 主機, 連接埠) 的 HTTP/1.1 連線池。
+    以號誌限制同時開啟的連線數量，並以 LIFO 順序重複使用閒置連線 (最近使用的連線最不可能已被關閉)。
+    """
+
+    def __init__(self, scheme: str, hostname: str, port: int, max_connections: int, max_keepalive: int):
+        self.scheme = scheme  # 連線協定
+        self.hostname = hostname  # 主機名稱
+        self.port = port  # 連接埠
+        self.max_keepalive = max_keepalive  # 保留的閒置連線數量上限
+        self._idle = deque()  # 閒置連線
+        self._slots = asyncio.Semaphore(max_connections)  # 同時開啟的連線數量上限
+        self._ssl = ssl.create_default_context() if scheme == "https" else None
+
+    async def open(self, timeout) -> _Connection:
+        """
+        建立一條新連線。
+
+        Returns:
+            _Connection: 新建立的連線。
+        """
+        reader, writer = await _wait(
+            asyncio.open_connection(
+                self.hostname,
+                self.port,
+                ssl=self._ssl,
+                server_hostname=self.hostname if self._ssl else None,
+                limit=_READ_SIZE,
+            ),
+            timeout,
+        )
+        return _Connection(reader, writer)
+
+    def take_idle(self):
+        """
+        Returns:
+            _Connection or None: 仍然開啟的閒置連線；沒有時回傳 None。
+        """
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.reader.at_eof() and not connection.writer.is_closing():
+                return connection
+            connection.close()
+        return None
+
+    def release(self, connection: _Connection, reusable: bool):
+        """
+        歸還連線；無法重複使用或閒置連線已滿時直接關閉。
+        """
+        if reusable and len(self._idle) < self.max_keepalive:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        """
+        關閉所有閒置連線。
+        """
+        while self._idle:
+            self._idle.pop().close()
+
+
+class _StdlibBackend:
+    """
+    以 asyncio 串流實作的 HTTP/1.1 keep-alive 客戶端。
+    """
+    http_version = "HTTP/1.1"
+
+    def __init__(self, max_connections: int, max_keepalive: int, timeout):
+        self.max_connections = max_connections  # 每個來源的連線數量上限
+        self.max_keepalive = max_keepalive  # 每個來源的閒置連線數量上限
+        self.timeout = timeout  # 預設逾時
+        self._pools = {}  # (協定, 主機, 連接埠) 對應 _OriginPool
+
+    def _pool(self, parts) -> _OriginPool:
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _OriginPool(
+                scheme, parts.hostname or "localhost", port, self.max_connections, self.max_keepalive
+            )
+        return pool
+
+    async def _send(self, connection, method, target, host, body, headers, timeout):
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}"]
+        for name, value in headers.items():
+            lines.append(f"{name}: {value}")
+        if body is not None or method in ("POST", "PUT", "PATCH"):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        connection.writer.write(head + body if body else head)
+        await _wait(connection.writer.drain(), timeout)
+        reader = connection.reader
+        status_line = await _wait(reader.readline(), timeout)
+        if not status_line:
+            raise ConnectionError("Connection closed before the response status line")
+        parts = status_line.decode("latin-1").split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ConnectionError(f"Malformed HTTP status line: {status_line[:80]!r}")
+        response_headers = {}
+        while True:
+            line = await _wait(reader.readline(), timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            key = name.strip().lower()
+            value = value.strip()
+            # 重複的標頭以逗號合併 (RFC 9110)
+            response_headers[key] = f"{response_headers[key]}, {value}" if key in response_headers else value
+        return _Response(connection, int(parts[1]), response_headers, method, timeout)
+
+    async def open(self, method, url, body, headers, timeout):
+        """
+        送出請求並讀取狀態列與標頭。
+
+        Returns:
+            tuple: (連線池, 回應)；呼叫端讀完內容後需以 finish 歸還連線。
+        """
+        parts = urlsplit(url)
+        pool = self._pool(parts)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        host = parts.netloc.rpartition("@")[2]
+        timeout = self.timeout if timeout is None else timeout
+        await pool._slots.acquire()
+        try:
+            connection = pool.take_idle()
+            reused = connection is not None
+            if connection is None:
+                connection = await pool.open(timeout)
+            try:
+                response = await self._send(connection, method, target, host, body, headers, timeout)
+            except ConnectionError:
+                connection.close()
+                if not reused:
+                    raise
+                # 閒置的 keep-alive 連線可能已被伺服器關閉，改用新連線重試一次
+                connection = await pool.open(timeout)
+                response = await self._send(connection, method, target, host, body, headers, timeout)
+        except BaseException:
+            pool._slots.release()
+            raise
+        return pool, response
+
+    def finish(self, pool, response):
+        """
+        歸還回應所在的連線；只有完整讀取內容且可 keep-alive 時才會重複使用。
+        """
+        pool.release(response.connection, response.complete and response.keep_alive)
+        pool._slots.release()
+
+    async def request(self, method, url, body, headers, timeout) -> HTTPResult:
+        pool, response = await self.open(method, url, body, headers, timeout)
+        try:
+            data = await response.read()
+        finally:
+            self.finish(pool, response)
+        return HTTPResult(response.status, response.headers, data, self.http_version)
+
+    async def stream(self, method, url, body, headers, timeout):
+        pool, response = await self.open(method, url, body, headers, timeout)
+        try:
+            if response.status != 200:
+                data = await response.read()
+                raise HTTPStatusError(
+                    HTTPResult(response.status, response.headers, data, self.http_version)
+                )
+            while True:
+                data = await response.read_chunk()
+                if not data:
+                    return
+                yield data
+        finally:
+            self.finish(pool, response)
+
+    async def aclose(self):
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+
+
+def _load_httpx():
+    """
+    匯入 httpx (只在第一次呼叫時實際匯入)。
+
+    Returns:
+        module: httpx 模組。
+    """
+    global httpx
+    if httpx is None:
+        import httpx as module
+        httpx = module
+    return httpx
+
+
+class _HttpxBackend:
+    """
+    以 httpx.AsyncClient 實作的 HTTP/2 客戶端，只用於 HTTPS 來源。
+    """
+
+    def __init__(self, max_connections: int, max_keepalive: int, timeout):
+        self.timeout = timeout  # 預設逾時
+        # AsyncClient 綁定第一次使用時的事件迴圈，因此在共用事件迴圈中才建立
+        self._client = None
+        self._limits = (max_connections, max_keepalive)
+
+    def _get_client(self):
+        if self._client is None:
+            module = _load_httpx()
+            limits = module.Limits(
+                max_connections=self._limits[0], max_keepalive_connections=self._limits[1]
+            )
+            self._client = module.AsyncClient(http2=True, limits=limits, timeout=self.timeout)
+        return self._client
+
+    async def request(self, method, url, body, headers, timeout) -> HTTPResult:
+        client = self._get_client()
+        try:
+            response = await client.request(
+                method, url, content=body, headers=headers,
+                timeout=self.timeout if timeout is None else timeout,
+            )
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+        return HTTPResult(
+            response.status_code,
+            {key.lower(): value for key, value in response.headers.items()},
+            response.content,
+            response.http_version,
+        )
+
+    async def stream(self, method, url, body, headers, timeout):
+        client = self._get_client()
+        try:
+            async with client.stream(
+                method, url, content=body, headers=headers,
+                timeout=self.timeout if timeout is None else timeout,
+            ) as response:
+                if response.status_code != 200:
+                    data = await response.aread()
+                    raise HTTPStatusError(
+                        HTTPResult(
+                            response.status_code,
+                            {key.lower(): value for key, value in response.headers.items()},
+                            data,
+                            response.http_version,
+                        )
+                    )
+                # aiter_bytes 會依 Content-Encoding 解壓縮 (gzip、deflate)，與 request 的 response.content 一致
+                async for data in response.aiter_bytes():
+                    yield data
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def _next_item(iterator):
+    # run_coroutine_threadsafe 只接受協程，因此以協程包裝 __anext__；結束時回傳哨兵而非引發例外
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+async def _captured(coroutine):
+    # 在共用事件迴圈中取回例外並以回傳值傳遞；呼叫端在其他事件迴圈中被取消時，
+    # 例外不會成為「從未取回」的工作例外
+    try:
+        return True, await coroutine
+    except Exception as e:
+        return False, e
+
+
+class AsyncHTTPSession:
+    """
+    共用的非同步 HTTP 工作階段。
+    所有網路 I/O 都在工作階段自己的事件迴圈 (背景執行緒) 中執行，連線池因此可以被
+    同步與非同步的呼叫端、以及不同提供者的客戶端共用。事件迴圈在第一次使用時啟動，
+    close() 關閉所有連線並停止事件迴圈；也可以 with 陳述式使用。
+    HTTP/2 只在 HTTPS 上協商，因此 HTTPS 來源在可用時交給 httpx 後端，其餘使用標準函式庫後端。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+        timeout: float = DEFAULT_TIMEOUT,
+        use_httpx: bool = True,
+    ):
+        """
+        初始化工作階段 (尚未啟動事件迴圈)。
+
+        Args:
+            max_connections (int, optional): 每個來源同時開啟的連線數量上限。
+            max_keepalive (int, optional): 每個來源保留的閒置 keep-alive 連線數量上限。
+            timeout (float, optional): 連線與每次讀取的預設逾時 (秒)。
+            use_httpx (bool, optional): 安裝 httpx 與 h2 時，HTTPS 請求是否使用 httpx 以取得 HTTP/2；
+                                        False 時一律使用標準函式庫的 HTTP/1.1 後端。
+        """
+        limits = (max(1, max_connections), max(0, max_keepalive), timeout)
+        self._stdlib = _StdlibBackend(*limits)  # 純文字 HTTP 與未安裝 httpx 時的後端
+        # _https: HTTPS 來源使用的後端
+        self._https = (
+            _HttpxBackend(*limits)
+            if use_httpx and _HTTP2_AVAILABLE
+            else self._stdlib
+        )
+        self._loop = None  # 共用事件迴圈
+        self._thread = None  # 執行事件迴圈的背景執行緒
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def http2(self) -> bool:
+        """
+        Returns:
+            bool: HTTPS 請求是否會嘗試協商 HTTP/2。
+        """
+        return self._https is not self._stdlib
+
+    def _backend(self, url: str):
+        return self._https if url.startswith("https:") else self._stdlib
+
+    def loop(self):
+        """
+        取得共用事件迴圈，第一次呼叫時在背景執行緒中啟動。
+
+        Returns:
+            asyncio.AbstractEventLoop: 共用事件迴圈。
+
+        Raises:
+            RuntimeError: 工作階段已關閉時。
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HTTP session is closed")
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run_loop():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name="http-session", daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+                logging.info(
+                    "Shared HTTP session started "
+                    f"(HTTPS: {'HTTP/2 via httpx' if self.http2 else 'HTTP/1.1'}, HTTP: HTTP/1.1 keep-alive)"
+                )
+            return self._loop
+
+    def in_loop(self) -> bool:
+        """
+        Returns:
+            bool: 目前是否在共用事件迴圈的執行緒中執行。
+        """
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coroutine):
+        """
+        將協程提交到共用事件迴圈執行。
+
+        Args:
+            coroutine: 要執行的協程。
+
+        Returns:
+            concurrent.futures.Future: 協程的結果。
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop())
+
+    def run(self, coroutine, timeout=None):
+        """
+        從同步程式碼執行協程並等待結果。
+
+        Args:
+            coroutine: 要執行的協程。
+            timeout (float, optional): 等待結果的最長秒數。
+
+        Returns:
+            任何型別: 協程的回傳值。
+
+        Raises:
+            RuntimeError: 在共用事件迴圈的執行緒中呼叫時 (會造成死結)。
+        """
+        if self.in_loop():
+            coroutine.close()
+            raise RuntimeError("AsyncHTTPSession.run() called from the session event loop; use await")
+        return self.submit(coroutine).result(timeout)
+
+    def iterate(self, iterator):
+        """
+        從同步程式碼逐一取得非同步迭代器 (例如串流生成) 的項目，迭代器在共用事件迴圈中執行。
+
+        Args:
+            iterator: 非同步產生器。
+
+        Yields:
+            任何型別: 迭代器產出的項目。
+        """
+        try:
+            while True:
+                item = self.run(_next_item(iterator))
+                if item is _END:
+                    return
+                yield item
+        finally:
+            self.run(iterator.aclose())
+
+    async def _on_loop(self, coroutine):
+        # 協程必須在共用事件迴圈中執行 (連線屬於該事件迴圈)；從其他事件迴圈呼叫時轉交並等待
+        if self.in_loop():
+            return await coroutine
+        succeeded, value = await asyncio.wrap_future(self.submit(_captured(coroutine)))
+        if not succeeded:
+            raise value
+        return value
+
+    async def request(self, method: str, url: str, body=None, headers=None, timeout=None) -> HTTPResult:
+        """
+        送出請求並完整讀取回應。
+
+        Args:
+            method (str): HTTP 方法。
+            url (str): 完整的請求位址。
+            body (bytes, optional): 請求內容。
+            headers (dict, optional): 請求標頭。
+            timeout (float, optional): 逾時秒數，預設使用工作階段的逾時。
+
+        Returns:
+            HTTPResult: 完整讀取的回應 (不論狀態碼)。
+
+        Raises:
+            ConnectionError: 連線失敗或連線在回應完成前中斷時。
+            TimeoutError: 連線或讀取逾時。
+        """
+        return await self._on_loop(
+            self._backend(url).request(method, url, body, dict(headers or {}), timeout)
+        )
+
+    async def stream(self, method: str, url: str, body=None, headers=None, timeout=None):
+        """
+        送出請求並以串流方式逐段產出回應內容。
+
+        Args:
+            method (str): HTTP 方法。
+            url (str): 完整的請求位址。
+            body (bytes, optional): 請求內容。
+            headers (dict, optional): 請求標頭。
+            timeout (float, optional): 每次讀取的逾時秒數，預設使用工作階段的逾時。
+
+        Yields:
+            bytes: 回應內容片段。
+
+        Raises:
+            HTTPStatusError: 狀態碼不是 200 時 (內容已讀取並附在例外中)。
+            ConnectionError: 連線失敗或連線在回應完成前中斷時。
+        """
+        iterator = self._backend(url).stream(method, url, body, dict(headers or {}), timeout)
+        try:
+            while True:
+                data = await self._on_loop(_next_item(iterator))
+                if data is _END:
+                    return
+                yield data
+        finally:
+            # 提前停止讀取時關閉串流，連線不會被放回連線池
+            await self._on_loop(iterator.aclose())
+
+    async def stream_lines(self, method: str, url: str, body=None, headers=None, timeout=None):
+        """
+        以串流方式逐行產出回應內容，用於換行分隔的 JSON (NDJSON) 或 SSE。
+
+        Args:
+            與 stream 相同。
+
+        Yields:
+            bytes: 不含換行字元的一行內容。
+        """
+        buffer = b""
+        async for data in self.stream(method, url, body, headers, timeout):
+            buffer += data
+            if b"\n" not in buffer:
+                continue
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line
+        if buffer:
+            yield buffer
+
+    async def _shutdown(self):
+        # 先取消仍在進行中的請求 (例如呼叫端已放棄等待的請求)，再關閉所有連線
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._stdlib.aclose()
+        if self.http2:
+            await self._https.aclose()
+
+    def close(self):
+        """
+        關閉所有連線並停止共用事件迴圈；之後再使用工作階段會引發 RuntimeError。
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, thread = self._loop, self._thread
+        if loop is None:
+            return
+        if thread is threading.current_thread():
+            raise RuntimeError("AsyncHTTPSession.close() called from the session event loop")
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(5)
+        except Exception as e:
+            logging.warning(f"Error while closing HTTP session connections: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+# 預設的共用工作階段，第一次呼叫 get_session 時建立
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def get_session() -> AsyncHTTPSession:
+    """
+    取得行程內共用的 HTTP 工作階段，不存在或已關閉時建立新的工作階段。
+
+    Returns:
+        AsyncHTTPSession: 共用的 HTTP 工作階段。
+    """
+    global _default_session
+    with _default_lock:
+        if _default_session is None or _default_session._closed:
+            _default_session = AsyncHTTPSession()
+        return _default_session
+
+
+def close_session():
+    """
+    關閉行程內共用的 HTTP 工作階段 (如果已建立)。
+    """
+    global _default_session
+    with _default_lock:
+        session, _default_session = _default_session, None
+    if session is not None:
+        session.close()
@@ -0,0 +1,181 @@
+# journal.py
+# 此檔案包含可續跑執行的檢查點日誌 (JSONL)。
+# 每個生成結果、每則評審與每筆完成的模型處理結果都會在完成當下附加寫入日誌，
+# 程式中斷後以 --resume 重新執行時，已完成的推論與評審呼叫不需要重做。
+
+import json  # 用於序列化日誌項目
+import logging  # 用於記錄程式運行訊息
+import os  # 用於建立日誌目錄
+import threading  # 用於保護跨執行緒共用的檔案寫入
+
+from cache_store import content_key, text_hash  # 用於組合工作鍵
+from results import ModelResult, Review  # 日誌項目與記錄類型之間的轉換
+
+
+def job_key(job: dict) -> str:
+    """
+    計算工作在日誌中的識別鍵。
+
+    Args:
+        job (dict): 包含 'ollama_model', 'task', 'input_text' 以及可選 'record_id' 鍵的工作字典。
+
+    Returns:
+        str: 由記錄識別碼、模型名稱、任務類型與輸入文字雜湊組成的鍵。
+    """
+    return content_key(
+        "job",
+        job.get("record_id"),
+        job["ollama_model"],
+        job["task"],
+        text_hash(job["input_text"]),
+    )
+
+
+class RunJournal:
+    """
+    執行檢查點日誌類別。
+    日誌為附加寫入的 JSONL 檔案，包含三種項目：
+    - "generation": Ollama 成功產生輸出後寫入 (尚未評審的模型處理結果)。
+    - "review": 每則評審完成後寫入。
+    - "result": 模型處理結果 (含所有評審) 完成後寫入。
+    生成失敗的結果不會寫入，續跑時會重新嘗試；評審失敗的評審 (錯誤字典) 不算完成，續跑時會重新評審。
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        """
+        初始化日誌；續跑時先載入既有項目，否則清空日誌重新開始。
+
+        Args:
+            path (str): 日誌檔案路徑。
+            resume (bool, optional): 為 True 時載入既有日誌並接續寫入。
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path  # 日誌檔案路徑
+        # 以下保存日誌中的原始字典，續跑時才轉換為新的記錄物件，避免修改日誌內保存的資料
+        self._generations = {}  # 工作鍵對應已生成但尚未完成評審的模型處理結果
+        self._reviews = {}  # 工作鍵對應已完成的評審列表
+        self._results = {}  # 工作鍵對應已完成的模型處理結果
+        # stats: 續跑時略過的完整結果數量與沿用生成結果的數量
+        self.stats = {"resumed_results": 0, "resumed_generations": 0}
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+        """
+        讀取既有日誌；最後一行若因中斷而不完整則略過。
+        """
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping truncated journal entry at {self.path}:{line_number}")
+                    continue
+                key = entry.get("key")
+                kind = entry.get("type")
+                if kind == "generation":
+                    self._generations[key] = entry["result"]
+                elif kind == "review":
+                    self._reviews.setdefault(key, []).append(entry["review"])
+                elif kind == "result":
+                    self._results[key] = entry["result"]
+        logging.info(
+            f"Loaded journal {self.path}: {len(self._results)} finished results, "
+            f"{len(self._generations)} generations"
+        )
+
+    def _append(self, entry: dict):
+        """
+        附加寫入一筆日誌項目並立即清空緩衝區，讓程式中斷時已完成的工作不會遺失。
+
+        Args:
+            entry (dict): 要寫入的日誌項目。
+        """
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def resume_state(self, job: dict):
+        """
+        查詢工作在日誌中的進度。
+
+        Args:
+            job (dict): 工作字典。
+
+        Returns:
+            tuple: (ModelResult 或 None, 是否已完成)。
+                   已完成時回傳完整結果；只完成生成，或完成的結果中有評審失敗 (例如重試後仍被限流) 時，
+                   回傳只包含成功評審的結果，失敗的評審會在續跑時重新執行；
+                   尚未生成時回傳 (None, False)。
+        """
+        key = job_key(job)
+        with self._lock:
+            if key in self._results:
+                result = ModelResult.from_dict(self._results[key])
+                if not result.drop_failed_reviews():
+                    self.stats["resumed_results"] += 1
+                    return result, True
+                self.stats["resumed_generations"] += 1
+                return result, False
+            if key in self._generations:
+                self.stats["resumed_generations"] += 1
+                result = ModelResult.from_dict(self._generations[key])
+                result.reviews = [Review.from_dict(review) for review in self._reviews.get(key, [])]
+                result.drop_failed_reviews()
+                return result, False
+        return None, False
+
+    def record_generation(self, job: dict, model_result: ModelResult):
+        """
+        記錄成功的生成結果。
+
+        Args:
+            job (dict): 工作字典。
+            model_result (ModelResult): 已包含 Ollama 輸出與生成指標的模型處理結果。
+        """
+        result = dict(model_result.to_dict(), reviews=[])
+        self._append({"type": "generation", "key": job_key(job), "result": result})
+
+    def record_review(self, job: dict, review: Review):
+        """
+        記錄一則完成的評審。
+
+        Args:
+            job (dict): 工作字典。
+            review (Review): 評審結果。
+        """
+        self._append({"type": "review", "key": job_key(job), "review": review.to_dict()})
+
+    def record_result(self, job: dict, model_result: ModelResult):
+        """
+        記錄完成的模型處理結果 (含所有評審)。
+
+        Args:
+            job (dict): 工作字典。
+            model_result (ModelResult): 完成的模型處理結果。
+        """
+        self._append({"type": "result", "key": job_key(job), "result": model_result.to_dict()})
+
+    def log_stats(self):
+        """
+        將續跑時沿用的結果數量記錄到日誌。
+        """
+        logging.info(
+            f"Journal {self.path}: resumed {self.stats['resumed_results']} finished results "
+            f"and {self.stats['resumed_generations']} generations"
+        )
+
+    def close(self):
+        """
+        關閉日誌檔案。
+        """
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,433 @@
+# local_metrics.py
+# 此檔案包含送交雲端評審前的本地檢查 (評審串接的第一層)。
+# - 不需要參考答案的檢查：空輸出、中文字比例 (中文字對拉丁詞)、繁簡字比例、與原文重疊 (直接複製原文)、
+#   重複迴圈、輸出/原文的長度比，以及生成因長度上限被截斷。
+# - 資料集提供參考答案時另外計算 chrF 與 BLEU (中日韓文字以字為單位，其他文字以詞為單位)。
+# LocalGate 依檢查結果決定每份輸出要交給哪些評審：未通過硬性檢查的輸出不呼叫任何雲端評審，
+# 直接以最低評分記錄；分層模式下只有警告或參考分數偏低的輸出只交給第一個評審。
+# 所有檢查都是以集合查詢與 map 在 C 層逐字處理的字串運算，每份輸出只需數十微秒。
+
+import logging  # 用於記錄程式運行訊息
+import math  # 用於 BLEU 的幾何平均與長度懲罰
+import re  # 用於切分詞與正規化空白
+import threading  # 用於保護跨評審工作執行緒共用的統計
+from collections import Counter  # 用於計算 n-gram 出現次數
+
+from rate_limit import estimate_tokens, is_cjk_char  # 用於估計長度比與辨識中日韓文字
+from results import Review  # 被攔截輸出的本地評審結果
+
+# 常用的「簡體字 繁體字」對照，只收錄簡體字形不會出現在正體中文中的字
+# (例如「后」「里」「台」「干」在正體中文中也是正確用字，因此不列入)
+_SCRIPT_PAIRS = """
+们們 这這 个個 说說 国國 时時 会會 来來 为為 对對 过過 学學 动動 还還 进進 经經 现現 问問 点點 开開
+关關 长長 实實 样樣 种種 体體 从從 两兩 与與 东東 业業 义義 乐樂 书書 买買 乱亂 亚亞 产產 亲親 亿億
+仅僅 价價 众眾 优優 传傳 伤傷 伦倫 侧側 债債 倾傾 儿兒 兴興 农農 决決 况況 冻凍 净淨 减減 则則 刚剛
+创創 删刪 别別 划劃 剧劇 办辦 务務 劳勞 势勢 区區 医醫 华華 单單 卖賣 卫衛 厂廠 历歷 压壓 厅廳 县縣
+双雙 变變 号號 叶葉 吗嗎 听聽 启啟 员員 响響 围圍 图圖 场場 坏壞 块塊 坚堅 处處 备備 头頭 夺奪 奋奮
+妇婦 妈媽 孙孫 宁寧 宝寶 审審 宪憲 宽寬 导導 寻尋 层層 岁歲 岛島 币幣 师師 带帶 帮幫 广廣 应應 废廢
+异異 张張 弹彈 强強 归歸 当當 录錄 忆憶 态態 怀懷 恶惡 惊驚 惯慣 战戰 户戶 扩擴 扫掃 执執 护護 报報
+担擔 拥擁 择擇 挥揮 损損 换換 据據 数數 断斷 无無 旧舊 显顯 晓曉 术術 机機 杂雜 权權 条條 极極 构構
+标標 档檔 桥橋 检檢 欢歡 欧歐 毕畢 气氣 汇匯 汉漢 没沒 沟溝 济濟 测測 浓濃 浅淺 湾灣 灭滅 灯燈 灵靈
+热熱 爱愛 爷爺 状狀 独獨 猫貓 环環 电電 画畫 疗療 监監 盘盤 确確 码碼 础礎 礼禮 积積 称稱 稳穩 穷窮
+竞競 笔筆 简簡 类類 纪紀 约約 级級 纸紙 线線 组組 细細 终終 结結 给給 统統 继繼 续續 维維 网網 罗羅
+职職 联聯 肃肅 胜勝 脑腦 节節 苏蘇 药藥 获獲 虑慮 补補 装裝 见見 观觀 规規 视視 览覽 觉覺 计計 订訂
+认認 让讓 议議 记記 讲講 许許 论論 设設 访訪 证證 评評 识識 试試 话話 该該 详詳 语語 误誤 请請 读讀
+调調 谈談 谢謝 谁誰 贝貝 负負 财財 责責 败敗 货貨 质質 购購 费費 资資 赛賽 车車 转轉 轮輪 软軟 轻輕
+较較 辆輛 边邊 达達 迁遷 运運 远遠 连連 选選 递遞 释釋 钟鐘 钱錢 铁鐵 银銀 错錯 键鍵 门門 闭閉 间間
+闻聞 队隊 阳陽 阶階 际際 陆陸 险險 随隨 隐隱 难難 页頁 项項 须須 顺順 预預 领領 题題 风風 飞飛 饭飯
+馆館 马馬 验驗 鱼魚 鸟鳥 齐齊 龙龍 讯訊 么麼 党黨 静靜 黄黃 译譯 总總 写寫
+""".split()
+# 只出現在簡體中文的字，與其對應的繁體字
+SIMPLIFIED_ONLY = frozenset(pair[0] for pair in _SCRIPT_PAIRS)
+TRADITIONAL_ONLY = frozenset(pair[1] for pair in _SCRIPT_PAIRS)
+
+# 閘門模式：
+# - "off": 不執行本地檢查
+# - "report": 只計算並在報告中列出本地檢查結果，所有輸出仍交給所有評審
+# - "gate": 未通過硬性檢查的輸出不呼叫任何雲端評審
+# - "tiered": 同 "gate"，另外有警告或參考分數偏低的輸出只交給第一個評審
+# 門檻尚未以人工標註的資料驗證，預設只回報，攔截需要明確以 --local_gate 啟用
+GATE_MODES = ("off", "report", "gate", "tiered")
+DEFAULT_GATE_MODE = "report"
+# 分層模式下，chrF 低於此值的輸出只交給第一個評審
+DEFAULT_TIER_CHRF = 20.0
+# 未通過硬性檢查的輸出記錄的評分 (評審評分範圍 1-5 的最低分)
+GATED_SCORE = 1
+
+# 硬性檢查的門檻
+MIN_CJK_RATIO = 0.3  # 中日韓文字占文字 (中日韓文字與拉丁詞) 的最低比例
+MAX_SIMPLIFIED_RATIO = 0.5  # 可辨識繁簡的字中，簡體字的最高比例
+MIN_SIMPLIFIED_CHARS = 2  # 判定為簡體輸出至少需要的簡體字數量
+COPY_NGRAM = 5  # 判斷與原文重疊時使用的字元 n-gram 長度
+REPETITION_NGRAM = 10  # 判斷重複迴圈時使用的字元 n-gram 長度
+MIN_REPETITION_NGRAMS = 40  # 輸出至少有這麼多 n-gram 時才判斷重複迴圈
+MIN_UNIQUE_NGRAM_RATIO = 0.3  # 不重複 n-gram 比例低於此值視為重複迴圈
+# 任務類型對應 (與原文重疊比例上限, 判定複製時的最低長度比)；
+# 翻譯的輸出會保留指令、套件名稱等識別字，識別字較多的正確翻譯重疊比例可達五成以上，
+# 因此只有大部分片段來自原文且長度接近原文時才視為複製；總結則允許摘錄原文，只有幾乎整篇照抄才視為複製
+SOURCE_COPY_LIMITS = {"translate": (0.8, 0.5), "summarize": (0.9, 0.8)}
+# 任務類型對應輸出/原文估計 token 數量比例的合理範圍 (超出時為警告)
+LENGTH_RATIO_BOUNDS = {"translate": (0.3, 3.0), "summarize": (0.0, 1.0)}
+
+# 檢查項目在報告中的名稱
+CHECK_LABELS = {
+    "empty": "空輸出",
+    "not_chinese": "非中文輸出",
+    "simplified": "簡體字",
+    "source_copy": "複製原文",
+    "repetitive": "重複迴圈",
+    "truncated": "達到長度上限",
+    "mixed_script": "混用簡體字",
+    "length_ratio": "長度比異常",
+    "low_reference_score": "參考分數偏低",
+}
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+# 拉丁詞：以字母開頭，可包含數字與 . _ - ' 的連續 ASCII 片段 (例如 numpy.array、don't)
+_LATIN_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9_.'-]*")
+# 程式碼區塊與行內程式碼：翻譯時應原樣保留，不計入中文字比例與原文重疊
+_CODE_PATTERN = re.compile(r"```.*?```|`[^`\n]*`", re.DOTALL)
+_SPACE_PATTERN = re.compile(r"\s+")
+
+
+def _ngrams(text: str, n: int) -> list:
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+def _normalize(text: str) -> str:
+    # 比較重疊時忽略大小寫與空白差異
+    return _SPACE_PATTERN.sub(" ", text.lower()).strip()
+
+
+def tokenize(text: str) -> list:
+    """
+    切分 BLEU 使用的 token：中日韓文字每字一個 token，其他文字以詞為單位。
+
+    Args:
+        text (str): 要切分的文字。
+
+    Returns:
+        list: token 列表。
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if any(map(is_cjk_char, word)):
+            # 中日韓文字與夾雜的拉丁字母/數字分開，拉丁字母/數字連續的部分視為一個 token
+            run = ""
+            for char in word:
+                if is_cjk_char(char):
+                    if run:
+                        tokens.append(run)
+                        run = ""
+                    tokens.append(char)
+                else:
+                    run += char
+            if run:
+                tokens.append(run)
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def chrf(hypothesis: str, references, max_order: int = 6, beta: float = 2.0) -> float:
+    """
+    計算 chrF (字元 n-gram F 分數，忽略空白)；多個參考答案時取最高分。
+
+    Args:
+        hypothesis (str): 模型輸出。
+        references (str or list): 一或多個參考答案。
+        max_order (int, optional): 最長的字元 n-gram。
+        beta (float, optional): 召回率相對於精確率的權重。
+
+    Returns:
+        float: 0 到 100 的分數。
+    """
+    if isinstance(references, str):
+        references = [references]
+    hypothesis = _SPACE_PATTERN.sub("", hypothesis)
+    best = 0.0
+    for reference in references:
+        reference = _SPACE_PATTERN.sub("", reference)
+        precisions, recalls = [], []
+        for n in range(1, max_order + 1):
+            hyp_counts = Counter(_ngrams(hypothesis, n))
+            ref_counts = Counter(_ngrams(reference, n))
+            if not hyp_counts or not ref_counts:
+                continue
+            matches = sum((hyp_counts & ref_counts).values())
+            precisions.append(matches / sum(hyp_counts.values()))
+            recalls.append(matches / sum(ref_counts.values()))
+        if not precisions:
+            continue
+        precision = sum(precisions) / len(precisions)
+        recall = sum(recalls) / len(recalls)
+        if precision + recall == 0:
+            continue
+        score = (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+        best = max(best, score * 100)
+    return best
+
+
+def bleu(hypothesis: str, references, max_order: int = 4) -> float:
+    """
+    計算句子層級的 BLEU (n-gram 精確率的幾何平均乘以長度懲罰，n > 1 時加一平滑)。
+
+    Args:
+        hypothesis (str): 模型輸出。
+        references (str or list): 一或多個參考答案。
+        max_order (int, optional): 最長的 n-gram。
+
+    Returns:
+        float: 0 到 100 的分數。
+    """
+    if isinstance(references, str):
+        references = [references]
+    hyp_tokens = tokenize(hypothesis)
+    ref_tokens = [tokenize(reference) for reference in references]
+    if not hyp_tokens or not any(ref_tokens):
+        return 0.0
+    log_precision = 0.0
+    for n in range(1, max_order + 1):
+        hyp_counts = Counter(tuple(hyp_tokens[i:i + n]) for i in range(len(hyp_tokens) - n + 1))
+        # 每個 n-gram 的次數上限為它在任一參考答案中出現的最多次數
+        max_ref_counts = Counter()
+        for tokens in ref_tokens:
+            max_ref_counts |= Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        matches = sum((hyp_counts & max_ref_counts).values())
+        total = sum(hyp_counts.values())
+        if n == 1:
+            if matches == 0:
+                return 0.0
+            log_precision += math.log(matches / total)
+        else:
+            log_precision += math.log((matches + 1) / (total + 1))
+    # 長度懲罰以長度最接近輸出的參考答案計算
+    ref_length = min((abs(len(tokens) - len(hyp_tokens)), len(tokens)) for tokens in ref_tokens)[1]
+    brevity = 1.0 if len(hyp_tokens) > ref_length else math.exp(1 - ref_length / len(hyp_tokens))
+    return brevity * math.exp(log_precision / max_order) * 100
+
+
+def check_output(output: str, source: str, task_type: str, reference=None, generation_metrics=None) -> dict:
+    """
+    對單一輸出執行所有本地檢查。
+
+    Args:
+        output (str): 模型輸出文字。
+        source (str): 原始輸入文字。
+        task_type (str): 任務類型 ("translate" 或 "summarize")；兩種任務的輸出都應為繁體中文。
+        reference (str or list, optional): 參考答案；提供時計算 chrF 與 BLEU。
+        generation_metrics (dict, optional): 生成指標；'done_reason' 為 "length" 時視為被截斷。
+
+    Returns:
+        dict: 包含以下鍵的字典：
+              'cjk_ratio', 'simplified_ratio' (沒有可辨識繁簡的字時為 None), 'source_overlap',
+              'unique_ngram_ratio' (輸出太短時為 None), 'length_ratio' (原文為空時為 None),
+              'chrf' 與 'bleu' (沒有參考答案時為 None)，
+              'failed' (未通過的硬性檢查列表)、'warnings' (警告列表)。
+    """
+    failed, warnings = [], []
+    metrics = {
+        "cjk_ratio": None,
+        "simplified_ratio": None,
+        "source_overlap": None,
+        "unique_ngram_ratio": None,
+        "length_ratio": None,
+        "chrf": None,
+        "bleu": None,
+        "failed": failed,
+        "warnings": warnings,
+    }
+    if not output or not output.strip():
+        failed.append("empty")
+        if reference:
+            metrics["chrf"] = metrics["bleu"] = 0.0
+        return metrics
+
+    # 中文字比例：中日韓文字占所有文字 (中日韓文字與拉丁詞) 的比例，過低表示輸出不是中文；
+    # 拉丁文字以詞計算、並排除程式碼片段，保留的指令與識別字不會壓低正確翻譯的比例
+    prose = _CODE_PATTERN.sub(" ", output)
+    cjk = sum(map(is_cjk_char, prose))
+    latin = len(_LATIN_WORD_PATTERN.findall(prose))
+    metrics["cjk_ratio"] = cjk / (cjk + latin) if cjk + latin else 0.0
+    if metrics["cjk_ratio"] < MIN_CJK_RATIO:
+        failed.append("not_chinese")
+
+    # 繁簡字比例：只計算有明確繁簡差異的字
+    simplified = sum(map(SIMPLIFIED_ONLY.__contains__, output))
+    traditional = sum(map(TRADITIONAL_ONLY.__contains__, output))
+    if simplified + traditional:
+        metrics["simplified_ratio"] = simplified / (simplified + traditional)
+        if simplified >= MIN_SIMPLIFIED_CHARS and metrics["simplified_ratio"] > MAX_SIMPLIFIED_RATIO:
+            failed.append("simplified")
+        elif simplified:
+            warnings.append("mixed_script")
+
+    # 長度比：以估計的 token 數量比較，中文與英文的字元數量差異不會影響比例
+    source_tokens = estimate_tokens(source)
+    if source_tokens:
+        metrics["length_ratio"] = estimate_tokens(output) / source_tokens
+        low, high = LENGTH_RATIO_BOUNDS.get(task_type, (0.0, float("inf")))
+        if not low <= metrics["length_ratio"] <= high:
+            warnings.append("length_ratio")
+
+    # 與原文重疊：輸出 (排除程式碼片段) 的字元 n-gram 中也出現在原文的比例
+    normalized = _normalize(output)
+    output_grams = set(_ngrams(_normalize(prose), COPY_NGRAM))
+    if output_grams:
+        source_grams = set(_ngrams(_normalize(source), COPY_NGRAM))
+        metrics["source_overlap"] = len(output_grams & source_grams) / len(output_grams)
+        max_overlap, min_length_ratio = SOURCE_COPY_LIMITS.get(task_type, (0.9, 0.8))
+        if metrics["source_overlap"] >= max_overlap and (metrics["length_ratio"] or 0.0) >= min_length_ratio:
+            failed.append("source_copy")
+
+    # 重複迴圈：長輸出中不重複 n-gram 的比例過低，表示模型陷入重複
+    grams = _ngrams(normalized, REPETITION_NGRAM)
+    if len(grams) >= MIN_REPETITION_NGRAMS:
+        metrics["unique_ngram_ratio"] = len(set(grams)) / len(grams)
+        if metrics["unique_ngram_ratio"] < MIN_UNIQUE_NGRAM_RATIO:
+            failed.append("repetitive")
+
+    if (generation_metrics or {}).get("done_reason") == "length":
+        failed.append("truncated")
+
+    if reference:
+        metrics["chrf"] = chrf(output, reference)
+        metrics["bleu"] = bleu(output, reference)
+    return metrics
+
+
+def describe_checks(names) -> str:
+    """
+    Args:
+        names (list): 檢查項目名稱列表。
+
+    Returns:
+        str: 以頓號分隔的檢查項目中文名稱。
+    """
+    return "、".join(CHECK_LABELS.get(name, name) for name in names)
+
+
+class LocalGate:
+    """
+    本地檢查閘門。
+    在評審工作執行緒中對每份生成結果執行 check_output，並依模式決定要略過哪些評審；
+    被攔截的輸出對每個評審記錄一則最低評分的本地評審結果，報告與統計仍會反映這份輸出的品質。
+    """
+
+    def __init__(self, mode: str = DEFAULT_GATE_MODE, tier_chrf: float = DEFAULT_TIER_CHRF):
+        """
+        初始化本地檢查閘門。
+
+        Args:
+            mode (str, optional): GATE_MODES 中的閘門模式。
+            tier_chrf (float, optional): 分層模式下，chrF 低於此值的輸出只交給第一個評審。
+
+        Raises:
+            ValueError: 模式不在 GATE_MODES 中時。
+        """
+        if mode not in GATE_MODES:
+            raise ValueError(f"invalid local gate mode {mode!r} (choose from {', '.join(GATE_MODES)})")
+        self.mode = mode
+        self.tier_chrf = tier_chrf
+        self._lock = threading.Lock()
+        # 統計：檢查的輸出數量、被攔截與分層的輸出數量、因此略過的評審呼叫次數
+        self.checked = 0
+        self.rejected = 0
+        self.tiered = 0
+        self.skipped_calls = 0
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Returns:
+            bool: 是否執行本地檢查。
+        """
+        return self.mode != "off"
+
+    def check(self, job: dict, model_result) -> dict:
+        """
+        對生成結果執行本地檢查，結果存入 model_result.local_metrics。
+
+        Args:
+            job (dict): 工作字典；可選的 'reference' 鍵為參考答案 (字串、字串列表，或任務類型對應參考答案的字典)。
+            model_result (ModelResult): 已包含 Ollama 輸出與生成指標的模型處理結果。
+
+        Returns:
+            dict: check_output 的結果。
+        """
+        reference = job.get("reference")
+        if isinstance(reference, dict):
+            reference = reference.get(job["task"])
+        metrics = check_output(
+            model_result.ollama_output,
+            job["input_text"],
+            job["task"],
+            reference=reference or None,
+            generation_metrics=model_result.generation_metrics,
+        )
+        if (
+            metrics["chrf"] is not None
+            and metrics["chrf"] < self.tier_chrf
+            and "low_reference_score" not in metrics["warnings"]
+        ):
+            metrics["warnings"].append("low_reference_score")
+        model_result.local_metrics = metrics
+        return metrics
+
+    def plan(self, metrics: dict, reviewers: list) -> tuple:
+        """
+        依檢查結果決定要略過的評審。
+
+        Args:
+            metrics (dict): check 的結果。
+            reviewers (list): 評審客戶端列表 (依設定檔順序，第一個為分層模式下保留的評審)。
+
+        Returns:
+            tuple: (是否攔截, 要略過的評審模型名稱集合)。攔截時略過所有評審。
+        """
+        names = [reviewer.model_name for reviewer in reviewers]
+        rejected = self.mode in ("gate", "tiered") and bool(metrics["failed"])
+        if rejected:
+            skipped = set(names)
+        elif self.mode == "tiered" and metrics["warnings"]:
+            skipped = set(names[1:])
+        else:
+            skipped = set()
+        with self._lock:
+            self.checked += 1
+            self.rejected += rejected
+            self.tiered += bool(skipped) and not rejected
+            self.skipped_calls += len(skipped)
+        return rejected, skipped
+
+    def gated_review(self, reviewer_model: str, metrics: dict) -> Review:
+        """
+        建立被攔截輸出的本地評審結果。
+
+        Args:
+            reviewer_model (str): 被略過的評審模型名稱。
+            metrics (dict): check 的結果。
+
+        Returns:
+            Review: local_gate 為 True 的評審結果。
+        """
+        return Review(
+            reviewer_model,
+            {
+                "overall_score": GATED_SCORE,
+                "comment": f"本地檢查未通過 ({describe_checks(metrics['failed'])})，未送交雲端評審。",
+            },
+            latency_s=0.0,
+            local_gate=True,
+        )
+
+    def log_stats(self):
+        """
+        記錄本地檢查的攔截統計。
+        """
+        if not self.enabled:
+            return
+        logging.info(
+            f"Local gate ({self.mode}): {self.checked} outputs checked, {self.rejected} rejected, "
+            f"{self.tiered} sent to the first reviewer only, {self.skipped_calls} reviewer calls skipped"
+        )
@@ -3,37 +3,100 @@
 
 # 匯入必要的模組
 import argparse  # 用於解析命令列參數
+import itertools  # 用於切出提前停止每一輪的記錄範圍
 import logging  # 用於記錄程式運行訊息
 import json  # 用於處理 JSON 格式的資料
+import os  # 用於檢查輸入檔案是否存在
 import sys  # 用於存取系統相關的參數和函數
 
-# 嘗試從 config 模組匯入設定，以及從其他自訂模組匯入類別
+# 從其他自訂模組匯入類別與預設值；這些模組只依賴標準函式庫，匯入成本低。
+# config.py 與評審客戶端在實際執行比較時才載入 (見 load_config 與 providers.build_reviewers)，
+# 因此 --help 不需要 config.py，也不會匯入未啟用的評審提供者所需的 SDK
 try:
-    from config import (
-        OLLAMA_API_BASE_URL,  # Ollama API 的基礎 URL
-        OLLAMA_MODELS_TO_COMPARE,  # 要比較的 Ollama 模型列表
-        OPENAI_API_KEY,  # OpenAI API 金鑰
-        GOOGLE_API_KEY,  # Google API 金鑰
-        DEEPSEEK_API_KEY,  # DeepSeek API 金鑰
-        REVIEWER_MODELS,  # 評審模型的設定
-        SUPPORTED_TASKS,  # 支援的任務類型
-    )
-    from ollama_client import OllamaClient  # Ollama 客戶端，用於與 Ollama 模型互動
-    from reviewer_client import (  # 評審客戶端，用於不同模型的評審
-        OpenAIReviewerClient,
-        GeminiReviewerClient,
-        DeepSeekReviewerClient,
-    )
-    from reporter import generate_report  # 報告產生器，用於產生比較報告
+    from ollama_client import (  # Ollama 客戶端，用於與 Ollama 模型互動
+        OllamaClient,
+        MockOllamaClient,
+        CachedOllamaClient,
+        DEFAULT_KEEP_ALIVE,
+    )
+    from chunking import (  # 長輸入的分段生成
+        ChunkedOllamaClient,
+        DEFAULT_CHUNK_TOKENS,
+        DEFAULT_CHUNK_CONCURRENCY,
+    )
+    from ollama_pool import parse_ollama_hosts  # 解析多台 Ollama 主機位址
+    from cache_store import SQLiteCache  # 持久化快取，用於重複使用生成結果
+    from providers import build_reviewers  # 評審提供者註冊表，只匯入啟用的評審客戶端
+    from reviewer_client import ReviewCache  # 所有評審共用的評審快取
+    from rate_limit import ProviderLimiter, RetryBudget  # 評審提供者的速率限制與重試
+    from reporter import StreamingReportWriter  # 串流式報告寫入器，用於產生比較報告
+    from aggregation import DEFAULT_BOOTSTRAP_SAMPLES  # 統計分析的預設 bootstrap 抽樣次數
+    from dataset import iter_dataset_records  # 資料集 (JSONL) 串流讀取
+    from journal import RunJournal  # 可續跑執行的檢查點日誌
+    from results import RunWriter  # 執行結果檔案 (精簡的二進位格式，可重新產生報告)
+    from local_metrics import LocalGate, GATE_MODES, DEFAULT_GATE_MODE, DEFAULT_TIER_CHRF  # 送交雲端評審前的本地檢查
+    from early_stop import (  # 資料集模式的提前停止 (逐輪淘汰)
+        SequentialElimination,
+        DEFAULT_MIN_RECORDS,
+        DEFAULT_CONFIDENCE,
+        DEFAULT_MIN_MODELS,
+    )
+    from tracing import Tracer, run_profiled, set_tracer, setup_logging, span  # 日誌、追蹤與剖析
+    from http_session import close_session  # 所有客戶端共用的 HTTP 工作階段
+    from pipeline import (  # 並行評審階段與生成→評審管線
+        ReviewStage,
+        run_pipeline,
+        DEFAULT_PROVIDER_CONCURRENCY,
+        DEFAULT_QUEUE_SIZE,
+        DEFAULT_REVIEW_WORKERS,
+        DEFAULT_BATCH_WINDOW,
+    )
 except ImportError as e:
     # 如果匯入失敗，則印出錯誤訊息並結束程式
     print(f"Import error in main.py: {e}.")
     sys.exit(1)
 
-# 設定日誌記錄的基本配置
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+# config.py 必須提供的設定名稱
+REQUIRED_CONFIG = (
+    "OLLAMA_API_BASE_URL",  # Ollama API 的基礎 URL
+    "OLLAMA_MODELS_TO_COMPARE",  # 要比較的 Ollama 模型列表
+    "REVIEWER_MODELS",  # 評審模型的設定
+    "SUPPORTED_TASKS",  # 支援的任務類型
 )
+# 可選的設定名稱與未設定時的預設值:
+# - REVIEWER_CONCURRENCY: 每個評審提供者的並行上限，例如 {"gpt": 2, "gemini": 4}
+# - REVIEWER_RATE_LIMITS: 每個評審提供者的速率限制，例如 {"gpt": {"rpm": 500, "tpm": 200000}}
+# - OLLAMA_OPTIONS: Ollama 生成選項 (例如 {"temperature": 0})，未設定時使用模型預設值
+# API 金鑰 (OPENAI_API_KEY 等)、REVIEWER_API_BASE_URLS 與 REVIEWER_PROVIDERS 由 providers 模組讀取
+OPTIONAL_CONFIG = {
+    "REVIEWER_CONCURRENCY": {},
+    "REVIEWER_RATE_LIMITS": {},
+    "OLLAMA_OPTIONS": {},
+}
+
+
+def load_config():
+    """
+    匯入 config.py，並補上未設定的可選設定。
+    只在第一次需要設定時匯入 (匯入後由 sys.modules 快取)，缺少 config.py 或必要設定時結束程式。
+
+    Returns:
+        module: 設定模組。
+    """
+    try:
+        import config
+    except ImportError as e:
+        # 如果匯入失敗，則印出錯誤訊息並結束程式
+        print(f"Import error in main.py: {e}.")
+        sys.exit(1)
+    missing = [name for name in REQUIRED_CONFIG if not hasattr(config, name)]
+    if missing:
+        print(f"Import error in main.py: config.py does not define {', '.join(missing)}.")
+        sys.exit(1)
+    for name, default in OPTIONAL_CONFIG.items():
+        if not hasattr(config, name):
+            setattr(config, name, default)
+    return config
 
 
 def load_input_text(file_path: str) -> str:
@@ -59,26 +122,121 @@ def load_input_text(file_path: str) -> str:
         raise
 
 
-def main():
+def parse_tasks(value: str) -> list:
     """
-    主要的執行函數。
-    解析命令列參數，載入輸入，初始化客戶端，處理模型，並產生報告。
+    解析 --task 參數：單一任務、以逗號分隔的多個任務，或代表所有任務的 "all"。
+
+    Args:
+        value (str): 命令列參數值，例如 "translate"、"translate,summarize" 或 "all"。
+
+    Returns:
+        list: 不重複的任務類型列表，保持指定的順序。
+
+    Raises:
+        argparse.ArgumentTypeError: 包含不在 SUPPORTED_TASKS 中的任務時。
+    """
+    supported_tasks = load_config().SUPPORTED_TASKS
+    if value.strip() == "all":
+        return list(supported_tasks)
+    tasks = []
+    for task in value.split(","):
+        task = task.strip()
+        if not task:
+            continue
+        if task not in supported_tasks:
+            raise argparse.ArgumentTypeError(
+                f"invalid task {task!r} (choose from {', '.join(supported_tasks)} or 'all')"
+            )
+        if task not in tasks:
+            tasks.append(task)
+    if not tasks:
+        raise argparse.ArgumentTypeError("no task given")
+    return tasks
+
+
+def build_job_groups(records, ollama_models, tasks) -> list:
+    """
+    將輸入記錄、任務與 Ollama 模型組合成依模型分組的管線工作。
+    同一個模型的所有任務與記錄屬於同一組，讓模型在每台主機上只需載入一次。
+
+    Args:
+        records (callable): 不帶參數、每次呼叫都回傳一個新的輸入記錄序列的函數，
+                            每筆記錄為包含 'record_id'、'input_text' 與可選 'reference' 鍵的字典。
+                            每個模型都會重新迭代一次，因此資料集不需要整份載入記憶體。
+        ollama_models (list): 要比較的 Ollama 模型名稱列表。
+        tasks (list): 任務類型列表；每個模型依序處理每個任務的所有記錄。
+
+    Returns:
+        list: (模型名稱, 工作產生器) 列表；每個工作為包含 'ollama_model', 'task',
+              'record_id', 'input_text' 和 'reference' 鍵的字典。
+    """
+    def jobs_for(ollama_model_name):
+        for task in tasks:
+            for record in records():
+                yield {
+                    "ollama_model": ollama_model_name,  # Ollama 模型名稱
+                    "task": task,  # 任務類型
+                    "record_id": record["record_id"],  # 記錄識別碼
+                    "input_text": record["input_text"],  # 完整輸入文字
+                    "reference": record.get("reference"),  # 參考答案 (沒有時為 None)
+                }
+
+    return [(name, jobs_for(name)) for name in ollama_models]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    建立命令列參數解析器。
+
+    Returns:
+        argparse.ArgumentParser: 包含所有命令列參數的解析器。
     """
     # 建立命令列參數解析器
     parser = argparse.ArgumentParser(
-        description="Compare local Ollama LLMs with mock components."
+        description="Compare local Ollama LLMs against cloud reviewer models."
     )
+    # --input_file 與 --dataset 二擇一：單一輸入檔案或 JSONL 資料集
+    input_group = parser.add_mutually_exclusive_group(required=True)
     # 新增 --input_file 參數，用於指定輸入文字檔案的路徑
+    input_group.add_argument("--input_file", type=str, help="Input text file path.")
+    # 新增 --dataset 參數，用於指定 JSONL 資料集的路徑 (批次模式)
+    input_group.add_argument(
+        "--dataset",
+        type=str,
+        help="JSONL dataset path; every record runs through all models and reviewers.",
+    )
+    # 新增 --text_field 參數，用於指定資料集中包含輸入文字的欄位
+    parser.add_argument(
+        "--text_field",
+        type=str,
+        default=None,
+        help="Dataset field holding the input text (default: auto-detect).",
+    )
+    # 新增 --id_field 參數，用於指定資料集中包含記錄識別碼的欄位
     parser.add_argument(
-        "--input_file", type=str, required=True, help="Input text file path."
+        "--id_field",
+        type=str,
+        default=None,
+        help="Dataset field holding the record id (default: auto-detect, then line number).",
     )
-    # 新增 --task 參數，用於指定任務類型
+    # 新增 --reference_field 參數，用於指定資料集中包含參考答案的欄位
     parser.add_argument(
-        "--task",
+        "--reference_field",
         type=str,
+        default=None,
+        help="Dataset field holding reference output(s) for chrF/BLEU: a string, a list, or a "
+        "task -> reference object (default: auto-detect).",
+    )
+    # 新增 --task 參數，用於指定任務類型；可用逗號分隔多個任務或以 all 指定所有任務，
+    # 任務類型的選項來自 config.py 的 SUPPORTED_TASKS，在解析參數時才載入設定
+    parser.add_argument(
+        "--task",
+        dest="tasks",
+        type=parse_tasks,
         required=True,
-        choices=SUPPORTED_TASKS.keys(),  # 任務類型的選項來自 SUPPORTED_TASKS
-        help="Task type.",
+        metavar="TASK[,TASK...]|all",
+        help="Task type(s): one of SUPPORTED_TASKS in config.py, a comma-separated list, "
+        "or 'all'. Each model is loaded once and runs every task.",
     )
     # 新增 --output_report 參數，用於指定輸出報告的路徑
     parser.add_argument(
@@ -87,46 +245,346 @@ def main():
         default="comparison_report.md",  # 預設報告名稱
         help="Path to save the markdown report.",
     )
-    # 解析命令列參數
-    args = parser.parse_args()
-
-    # 記錄開始執行的任務資訊
-    logging.info(
-        f"Starting task: {SUPPORTED_TASKS.get(args.task, args.task)}, File: {args.input_file}, Report: {args.output_report}"
+    # 新增 --reviewer_concurrency 參數，用於指定每個評審提供者的預設並行上限
+    parser.add_argument(
+        "--reviewer_concurrency",
+        type=int,
+        default=DEFAULT_PROVIDER_CONCURRENCY,
+        help="Max in-flight evaluate calls per reviewer provider "
+        "(overridden per provider by REVIEWER_CONCURRENCY in config).",
+    )
+    # 新增 --pipeline_queue_size 參數，用於指定生成階段可領先評審階段的輸出數量
+    parser.add_argument(
+        "--pipeline_queue_size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="Max generated outputs waiting for review before Ollama generation pauses.",
+    )
+    # 新增 --review_workers 參數，用於指定同時評審不同輸出的工作執行緒數量
+    parser.add_argument(
+        "--review_workers",
+        type=int,
+        default=DEFAULT_REVIEW_WORKERS,
+        help="Number of review workers consuming generated outputs.",
+    )
+    # 新增 --mock_ollama 參數，用於改用模擬的 Ollama 客戶端 (離線測試)
+    parser.add_argument(
+        "--mock_ollama",
+        action="store_true",
+        help="Use the mock Ollama client instead of calling the Ollama HTTP API.",
+    )
+    # 新增 --keep_alive 參數，用於指定模型在最後一次請求後保持常駐的時間
+    parser.add_argument(
+        "--keep_alive",
+        type=str,
+        default=DEFAULT_KEEP_ALIVE,
+        help="How long Ollama keeps a model resident after a request (e.g. 30m).",
+    )
+    # 新增 --no_warmup 參數，用於停用模型暖機與明確卸載
+    parser.add_argument(
+        "--no_warmup",
+        action="store_true",
+        help="Do not preload/unload models; load time is then included in the first generation.",
+    )
+    # 新增 --cache_dir 參數，用於指定持久化快取的目錄
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=".cache",
+        help="Directory for the on-disk generation cache.",
+    )
+    # 新增 --cache_max_mb 參數，用於指定生成快取的大小上限
+    parser.add_argument(
+        "--cache_max_mb",
+        type=float,
+        default=512,
+        help="Size limit of each on-disk cache in MB (least recently used entries are evicted).",
+    )
+    # 新增 --review_cache_ttl_hours 參數，用於指定評審快取項目的存活時間
+    parser.add_argument(
+        "--review_cache_ttl_hours",
+        type=float,
+        default=168,
+        help="Hours a cached review stays valid before the reviewer is called again.",
+    )
+    # 新增 --no_cache 參數，用於停用持久化的生成與評審快取
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help="Disable the on-disk generation and review caches "
+        "(identical reviews are still deduplicated within the run).",
+    )
+    # 新增 --refresh 參數，用於忽略既有快取並以新的生成結果覆寫
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached generations and overwrite them with fresh output.",
+    )
+    # 新增 --refresh_reviews 參數，用於忽略既有的評審快取並以新的評審結果覆寫
+    parser.add_argument(
+        "--refresh_reviews",
+        action="store_true",
+        help="Ignore cached reviews and overwrite them with fresh evaluations.",
+    )
+    # 新增 --journal 參數，用於指定檢查點日誌的路徑
+    parser.add_argument(
+        "--journal",
+        type=str,
+        default=None,
+        help="Checkpoint journal (JSONL) path (default: <output_report>.journal.jsonl).",
+    )
+    # 新增 --resume 參數，用於從檢查點日誌接續先前中斷的執行
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the checkpoint journal, skipping generations and reviews already recorded.",
+    )
+    # 新增 --max_review_retries 參數，用於指定單一評審請求遇到速率限制或暫時性錯誤時的最大重試次數
+    parser.add_argument(
+        "--max_review_retries",
+        type=int,
+        default=5,
+        help="Max retries per review request on HTTP 429/5xx (jittered exponential backoff).",
+    )
+    # 新增 --retry_budget 參數，用於指定所有評審共用的重試預算比例
+    parser.add_argument(
+        "--retry_budget",
+        type=float,
+        default=0.2,
+        help="Global retry budget as a fraction of review requests (plus 10 free retries).",
+    )
+    # 新增 --batch_reviews 參數，同一筆記錄的所有模型輸出一起交給每個評審
+    parser.add_argument(
+        "--batch_reviews",
+        action="store_true",
+        help="Review each record once all models have generated it, packing every model's output "
+        "into one request per reviewer where the provider supports it. Models take turns in "
+        "windows of --batch_pending records, so each record's outputs are complete within its "
+        "window.",
+    )
+    # 新增 --batch_pending 參數，批次評審時每個記錄視窗的記錄數量
+    parser.add_argument(
+        "--batch_pending",
+        type=int,
+        default=DEFAULT_BATCH_WINDOW,
+        help="With --batch_reviews, the number of records each model generates before the next "
+        "model takes the same records. Roughly this many records wait for a batch at once; "
+        "smaller windows switch (reload) models more often.",
     )
+    # 新增 --save_run 參數，將所有結果另存為可重新產生報告的二進位執行結果檔案
+    parser.add_argument(
+        "--save_run",
+        type=str,
+        help="Also save every result to this compact binary run file; re-render the report "
+        "later with 'python reporter.py --run FILE' or aggregate it with 'python aggregation.py --run FILE'.",
+    )
+    # 新增 --local_gate 參數，用於指定本地檢查如何決定送交雲端評審的輸出
+    parser.add_argument(
+        "--local_gate",
+        choices=GATE_MODES,
+        default=DEFAULT_GATE_MODE,
+        help="Local checks before cloud review: 'off'; 'report' (metrics only, default); 'gate' (outputs "
+        "failing a hard check are not sent to any reviewer and score 1); 'tiered' (also send "
+        "outputs with warnings or low chrF to the first reviewer only).",
+    )
+    # 新增 --local_tier_chrf 參數，分層模式下 chrF 低於此值的輸出只交給第一個評審
+    parser.add_argument(
+        "--local_tier_chrf",
+        type=float,
+        default=DEFAULT_TIER_CHRF,
+        help="With --local_gate tiered, outputs whose chrF against the reference is below this "
+        "go to the first reviewer only.",
+    )
+    # 新增 --chunk_tokens 參數，用於指定長輸入分段時每個區段的估計 token 上限
+    parser.add_argument(
+        "--chunk_tokens",
+        type=int,
+        default=DEFAULT_CHUNK_TOKENS,
+        help="Split inputs longer than this many estimated tokens into chunks "
+        "(summarize: map-reduce, translate: sentence-aligned); 0 disables chunking.",
+    )
+    # 新增 --chunk_concurrency 參數，用於指定同時生成的區段數量
+    parser.add_argument(
+        "--chunk_concurrency",
+        type=int,
+        default=DEFAULT_CHUNK_CONCURRENCY,
+        help="Chunks generated concurrently per Ollama host (match OLLAMA_NUM_PARALLEL).",
+    )
+    # 新增 --bootstrap_samples 參數，用於指定統計分析中信賴區間的重新抽樣次數
+    parser.add_argument(
+        "--bootstrap_samples",
+        type=int,
+        default=DEFAULT_BOOTSTRAP_SAMPLES,
+        help="Bootstrap resamples for the confidence intervals in the dataset report's "
+        "statistical summary (0 disables).",
+    )
+    # 新增 --early_stop 參數，資料集模式下分輪處理並淘汰統計上明顯落後的模型
+    parser.add_argument(
+        "--early_stop",
+        action="store_true",
+        help="Dataset mode: process records in doubling rounds and stop generating/reviewing "
+        "models that are statistically dominated by another model.",
+    )
+    # 新增 --early_stop_min_records 參數，用於指定第一輪的記錄數量
+    parser.add_argument(
+        "--early_stop_min_records",
+        type=int,
+        default=DEFAULT_MIN_RECORDS,
+        help="Records in the first early-stopping round (rounds double in size); also the "
+        "minimum shared inputs before a model can be eliminated.",
+    )
+    # 新增 --early_stop_confidence 參數，用於指定淘汰檢定的信賴水準
+    parser.add_argument(
+        "--early_stop_confidence",
+        type=float,
+        default=DEFAULT_CONFIDENCE,
+        help="Confidence level of the elimination test across all rounds.",
+    )
+    # 新增 --early_stop_min_models 參數，剩餘模型降到此數量時停止比較
+    parser.add_argument(
+        "--early_stop_min_models",
+        type=int,
+        default=DEFAULT_MIN_MODELS,
+        help="Stop the comparison once this many models remain.",
+    )
+    # 新增 --trace 參數，將各階段的 span 以 JSONL 格式寫入追蹤檔案
+    parser.add_argument(
+        "--trace",
+        type=str,
+        help="Write per-stage spans (generate, evaluate, report render/write) as JSONL to this path.",
+    )
+    # 新增 --trace_chrome 參數，將 span 以 Chrome trace 格式寫入 (可用 Perfetto 開啟)
+    parser.add_argument(
+        "--trace_chrome",
+        type=str,
+        help="Write the spans as a Chrome trace (open in chrome://tracing or ui.perfetto.dev).",
+    )
+    # 新增 --profile 參數，以 cProfile 剖析整個執行
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Profile the whole run with cProfile and save the pstats file to this path.",
+    )
+    return parser
+
+
+def run(args, on_result=None):
+    """
+    執行一次完整的比較：載入輸入，初始化客戶端，處理模型，並產生報告。
+    可由其他程式 (例如 bench.py) 以解析好的參數直接呼叫。
+    指定 --trace/--trace_chrome 時，執行期間各階段的 span 會寫入追蹤檔案。
 
-    # 載入輸入文字
+    Args:
+        args (argparse.Namespace): build_parser() 解析後的參數。
+        on_result (callable, optional): 每筆結果依序寫入報告後，以該結果呼叫的回呼函數。
+    """
+    tracer = None
+    if args.trace or args.trace_chrome:
+        tracer = Tracer(jsonl_path=args.trace, chrome_path=args.trace_chrome)
+        set_tracer(tracer)
     try:
-        input_text = load_input_text(args.input_file)  # 從指定檔案載入文字
-    except:
-        # 如果載入失敗，記錄錯誤訊息並結束程式
-        logging.error("Failed to load input file, exiting.")
-        sys.exit(1)
+        with span("run", tasks=",".join(args.tasks)):
+            _run_comparison(args, on_result)
+    finally:
+        # 關閉所有客戶端共用的 HTTP 工作階段 (連線與事件迴圈執行緒)
+        close_session()
+        if tracer is not None:
+            set_tracer(None)
+            tracer.close()
 
-    # 初始化 Ollama 客戶端
-    ollama_client = OllamaClient(host=OLLAMA_API_BASE_URL)
 
-    # 初始化評審客戶端列表
-    reviewers = []  # 儲存所有評審客戶端實例的列表
-    # 根據設定檔中的 REVIEWER_MODELS 初始化不同的評審客戶端
-    if REVIEWER_MODELS.get("gpt"):
-        reviewers.append(
-            OpenAIReviewerClient(
-                api_key=OPENAI_API_KEY, model_name=REVIEWER_MODELS["gpt"]
-            )
-        )
-    if REVIEWER_MODELS.get("gemini"):
-        reviewers.append(
-            GeminiReviewerClient(
-                api_key=GOOGLE_API_KEY, model_name=REVIEWER_MODELS["gemini"]
+def _run_comparison(args, on_result=None):
+    """
+    run 的主體：載入輸入，初始化客戶端，處理模型，並產生報告。
+
+    Args:
+        args (argparse.Namespace): build_parser() 解析後的參數。
+        on_result (callable, optional): 每筆結果依序寫入報告後，以該結果呼叫的回呼函數。
+    """
+
+    config = load_config()
+    # 記錄開始執行的任務資訊
+    logging.info(
+        f"Starting task: {', '.join(config.SUPPORTED_TASKS.get(task, task) for task in args.tasks)}, File: {args.input_file or args.dataset}, Report: {args.output_report}"
+    )
+
+    if args.dataset:
+        # 資料集模式：記錄在管線執行時才逐筆讀取，這裡只先確認檔案存在
+        if not os.path.isfile(args.dataset):
+            logging.error(f"Dataset file not found: {args.dataset}, exiting.")
+            sys.exit(1)
+        def records():
+            return iter_dataset_records(
+                args.dataset,
+                text_field=args.text_field,
+                id_field=args.id_field,
+                reference_field=args.reference_field,
             )
+    else:
+        # 載入輸入文字
+        try:
+            input_text = load_input_text(args.input_file)  # 從指定檔案載入文字
+        except:
+            # 如果載入失敗，記錄錯誤訊息並結束程式
+            logging.error("Failed to load input file, exiting.")
+            sys.exit(1)
+        # 單一輸入模式只有一筆記錄，識別碼為 None
+        def records():
+            return [{"record_id": None, "input_text": input_text}]
+
+    # OLLAMA_API_BASE_URL 可以是單一位址、以逗號分隔的多個位址或位址列表
+    ollama_hosts = parse_ollama_hosts(config.OLLAMA_API_BASE_URL) or [None]
+    # 初始化每台主機的 Ollama 客戶端 (實際 HTTP 客戶端，或離線測試用的模擬客戶端)
+    if args.mock_ollama:
+        base_ollama_clients = [
+            MockOllamaClient(host=host, options=config.OLLAMA_OPTIONS) for host in ollama_hosts
+        ]
+    else:
+        base_ollama_clients = [
+            OllamaClient(host=host, options=config.OLLAMA_OPTIONS, keep_alive=args.keep_alive)
+            for host in ollama_hosts
+        ]
+    ollama_clients = base_ollama_clients
+    # generation_cache: 生成結果的持久化快取，停用時為 None；所有主機共用同一個快取
+    generation_cache = None
+    if not args.no_cache:
+        generation_cache = SQLiteCache(
+            os.path.join(args.cache_dir, "generations.sqlite"),
+            max_bytes=int(args.cache_max_mb * 1024 * 1024),
+            name="Generation cache",
         )
-    if REVIEWER_MODELS.get("deepseek"):
-        reviewers.append(
-            DeepSeekReviewerClient(
-                api_key=DEEPSEEK_API_KEY, model_name=REVIEWER_MODELS["deepseek"]
+        ollama_clients = [
+            CachedOllamaClient(client, generation_cache, refresh=args.refresh)
+            for client in base_ollama_clients
+        ]
+    if args.chunk_tokens > 0:
+        # 長輸入分段包裝在快取之外，每個區段各自快取
+        ollama_clients = [
+            ChunkedOllamaClient(
+                client, max_tokens=args.chunk_tokens, concurrency=args.chunk_concurrency
             )
+            for client in ollama_clients
+        ]
+
+    # 依設定檔中的 REVIEWER_MODELS 初始化評審客戶端：只匯入啟用的提供者的客戶端模組，並行建立；
+    # 在 REVIEWER_API_BASE_URLS 中設定 API 位址的提供者改用 OpenAI 相容的 HTTP 客戶端
+    with span("init.reviewers"):
+        reviewers = build_reviewers(config)
+
+    # review_store: 評審結果的持久化儲存，停用快取時為 None
+    review_store = None
+    if not args.no_cache:
+        review_store = SQLiteCache(
+            os.path.join(args.cache_dir, "reviews.sqlite"),
+            max_bytes=int(args.cache_max_mb * 1024 * 1024),
+            ttl_seconds=args.review_cache_ttl_hours * 3600,
+            name="Review cache store",
         )
+    # 所有評審共用同一個評審快取，相同的評審請求在本次執行內只會呼叫一次
+    review_cache = ReviewCache(review_store, refresh=args.refresh_reviews)
+    for reviewer in reviewers:
+        reviewer.attach_cache(review_cache)
 
     # 篩選出成功初始化的評審客戶端
     active_reviewers = [r for r in reviewers if r.initialized_successfully]
@@ -142,67 +600,226 @@ def main():
             f"Inactive reviewers (due to placeholder keys, etc.): {inactive_reviewers}"
         )
 
-    # 儲存所有模型處理結果的列表
-    all_results = []
-    # 迭代處理設定檔中指定的每個 Ollama 模型
-    for ollama_model_name in OLLAMA_MODELS_TO_COMPARE:
-        logging.info(f"--- Processing Ollama model: {ollama_model_name} ---")
-        # 準備用於報告的輸入文字片段
-        input_snippet_for_report = (
-            input_text[:200] + "..." if len(input_text) > 200 else input_text
+    # 建立並行評審階段，同一份輸出的所有評審呼叫會同時派送
+    review_stage = ReviewStage(
+        active_reviewers,
+        default_limit=args.reviewer_concurrency,
+        provider_limits=config.REVIEWER_CONCURRENCY,
+    )
+    logging.info(
+        f"Reviewer concurrency per provider: {review_stage.provider_concurrency}"
+    )
+    # 本地檢查閘門：生成結果先經過本地檢查，未通過的輸出不送交雲端評審
+    local_gate = LocalGate(args.local_gate, tier_chrf=args.local_tier_chrf)
+    # 每個評審提供者一個速率限制器 (RPM/TPM 權杖桶與 AIMD 並行上限)，所有提供者共用重試預算
+    retry_budget = RetryBudget(ratio=args.retry_budget)
+    rate_limiters = {}
+    for provider, limit in review_stage.provider_concurrency.items():
+        provider_limits = config.REVIEWER_RATE_LIMITS.get(provider, {})
+        rate_limiters[provider] = ProviderLimiter(
+            provider,
+            rpm=provider_limits.get("rpm"),
+            tpm=provider_limits.get("tpm"),
+            concurrency=limit,
+            max_retries=args.max_review_retries,
+            budget=retry_budget,
         )
-        # 初始化該模型的結果字典
-        model_result = {
-            "ollama_model": ollama_model_name,  # Ollama 模型名稱
-            "task": args.task,  # 任務類型
-            "input_text_snippet": input_snippet_for_report,  # 輸入文字片段
-            "ollama_output": "<not_run>",  # Ollama 模型輸出，預設為未執行
-            "reviews": [],  # 評審結果列表
-        }
-        try:
-            # 使用 Ollama 客戶端產生輸出
-            ollama_output = ollama_client.generate(
-                ollama_model_name, input_text, args.task
-            )
-            model_result["ollama_output"] = ollama_output  # 更新模型輸出
-            logging.info(f"Ollama model ({ollama_model_name}) mock output generated.")
+    for reviewer in active_reviewers:
+        reviewer.attach_limiter(rate_limiters[reviewer.provider])
 
-            # 對於每個活躍的評審客戶端，進行評估
-            for reviewer in active_reviewers:
-                logging.info(f"Evaluating with mock reviewer {reviewer.model_name}...")
-                try:
-                    # 呼叫評審客戶端的 evaluate 方法
-                    review_data = reviewer.evaluate(
-                        input_text, ollama_output, args.task
-                    )
-                    # 將評審結果加入到模型結果中
-                    model_result["reviews"].append(
-                        {
-                            "reviewer_model": reviewer.model_name,  # 評審模型名稱
-                            "evaluation": review_data,  # 評估資料
-                        }
-                    )
-                except Exception as e:
-                    # 如果評審過程中發生錯誤，記錄錯誤訊息
-                    logging.error(f"Mock reviewer {reviewer.model_name} error: {e}")
-        except Exception as e:
-            # 如果 Ollama 模型處理過程中發生錯誤，記錄錯誤訊息
-            model_result["ollama_output"] = {"error": str(e)}  # 更新模型輸出為錯誤訊息
-            logging.error(f"Mock Ollama model {ollama_model_name} error: {e}")
-        # 將該模型的處理結果加入到總結果列表中
-        all_results.append(model_result)
-
-    logging.info("--- All models processed (mock) ---")
-    # 嘗試產生並儲存報告
+    # 檢查點日誌：每個完成的生成、評審與結果都會立即寫入，中斷後可用 --resume 接續
+    journal_path = args.journal or os.path.splitext(args.output_report)[0] + ".journal.jsonl"
+    journal = RunJournal(journal_path, resume=args.resume)
+
+    # 報告以串流方式寫入：每筆結果依序完成時立即寫出，記憶體中只保留彙總統計
     try:
-        generate_report(all_results, args.output_report)  # 呼叫報告產生函數
-        logging.info(
-            f"Comparison report (from mock data) saved to: {args.output_report}"
+        report_writer = StreamingReportWriter(
+            args.output_report, bootstrap_samples=args.bootstrap_samples, tasks=args.tasks
         )
     except Exception as e:
-        # 如果產生報告失敗，記錄錯誤訊息並印出 JSON 格式的結果
-        logging.error(f"Failed to generate report from mock data: {e}")
-        print(json.dumps(all_results, indent=4, ensure_ascii=False))
+        logging.error(f"Failed to open report {args.output_report}: {e}")
+        report_writer = None
+
+    # 執行結果檔案：與報告同時寫入，之後可不重新執行就重新產生報告與統計分析
+    run_writer = None
+    if args.save_run:
+        try:
+            run_writer = RunWriter(args.save_run, tasks=args.tasks)
+        except Exception as e:
+            logging.error(f"Failed to open run file {args.save_run}: {e}")
+
+    def write_result(result):
+        """
+        將依序完成的結果寫入報告 (與執行結果檔案)；報告無法寫入時改為印出 JSON 格式的結果。
+
+        Args:
+            result (ModelResult): 完成的模型處理結果。
+        """
+        nonlocal report_writer, run_writer
+        if run_writer is not None:
+            try:
+                run_writer.add(result)
+            except Exception as e:
+                # 如果寫入執行結果檔案失敗 (例如磁碟已滿)，記錄錯誤訊息並停止寫入，報告仍繼續產生
+                logging.error(f"Failed to write run file {args.save_run}: {e}")
+                try:
+                    run_writer.close()
+                except Exception:
+                    pass
+                run_writer = None
+        if report_writer is not None:
+            try:
+                report_writer.add(result)
+                return
+            except Exception as e:
+                # 如果寫入報告失敗，記錄錯誤訊息，之後的結果改為印出 JSON
+                logging.error(f"Failed to write report: {e}")
+                report_writer = None
+        print(json.dumps(result.to_dict(), indent=4, ensure_ascii=False))
+
+    def handle_result(result):
+        """
+        寫入報告後再交給呼叫端的回呼函數。
+        """
+        write_result(result)
+        if on_result is not None:
+            on_result(result)
+
+    def run_jobs(ollama_models, job_records, result_handler):
+        """
+        以管線處理指定模型與記錄的所有組合。
+
+        Args:
+            ollama_models (list): 要處理的 Ollama 模型名稱列表。
+            job_records (callable): 每次呼叫都回傳一個新的輸入記錄序列的函數。
+            result_handler (callable): 每筆結果依序完成時呼叫的回呼函數。
+        """
+        # 每筆記錄與每個 Ollama 模型的組合對應一個工作，依模型分組，
+        # 由管線分派給各台主機生成並同時評審先前的輸出；所有工作共用同一組客戶端
+        job_groups = build_job_groups(job_records, ollama_models, args.tasks)
+        # 結果依設定檔中的模型順序交給報告寫入器，不在記憶體中保留完整的結果列表
+        run_pipeline(
+            job_groups,
+            ollama_clients,
+            review_stage,
+            queue_size=args.pipeline_queue_size,
+            review_workers=args.review_workers,
+            manage_residency=not args.no_warmup,
+            journal=journal,
+            on_result=result_handler,
+            keep_results=False,
+            batch_reviews=args.batch_reviews,
+            batch_window=args.batch_pending,
+            local_gate=local_gate,
+        )
+
+    def close_run(completed):
+        """
+        關閉評審階段、檢查點日誌、快取與客戶端，並寫出執行結果檔案與報告。
+        執行中斷時也會呼叫，已完成的結果仍會寫入報告。
+
+        Args:
+            completed (bool): 所有工作是否正常完成。
+        """
+        # 所有模型處理完畢後關閉評審階段的執行緒池與檢查點日誌
+        review_stage.close()
+        if args.resume:
+            journal.log_stats()
+        journal.close()
+        if generation_cache is not None:
+            # 記錄快取命中/未命中統計並關閉快取
+            generation_cache.log_stats()
+            generation_cache.close()
+        review_cache.log_stats()
+        local_gate.log_stats()
+        for limiter in rate_limiters.values():
+            limiter.log_stats()
+        if review_store is not None:
+            review_store.close()
+        # 釋放每台主機的 Ollama 客戶端 (連線屬於共用的 HTTP 工作階段，於 run 結束時關閉)
+        for client in base_ollama_clients:
+            client.close()
+
+        if completed:
+            logging.info("--- All models processed ---")
+        else:
+            logging.warning("--- Run interrupted, saving the results completed so far ---")
+        if run_writer is not None:
+            try:
+                run_writer.close()
+                logging.info(
+                    f"Run saved to: {args.save_run} ({run_writer.count} results, "
+                    f"{run_writer.bytes_written / 1024:.1f} KB)"
+                )
+            except Exception as e:
+                logging.error(f"Failed to write run file {args.save_run}: {e}")
+        # 寫出彙總表格與排行榜並關閉報告
+        if report_writer is not None:
+            try:
+                report_writer.close()
+                logging.info(
+                    f"Comparison report saved to: {args.output_report}"
+                )
+            except Exception as e:
+                logging.error(f"Failed to generate report: {e}")
+
+    # 執行期間發生錯誤或被中斷 (Ctrl-C) 時，仍在 finally 中關閉日誌、執行結果檔案與報告，
+    # 已完成的結果與緩衝中的資料不會遺失
+    completed = False
+    try:
+        if args.early_stop and not args.dataset:
+            logging.warning("--early_stop only applies to --dataset runs, ignoring it.")
+        if args.early_stop and args.dataset:
+            # 提前停止：分輪處理記錄，每輪結束後淘汰明顯落後的模型
+            elimination = SequentialElimination(
+                config.OLLAMA_MODELS_TO_COMPARE,
+                min_records=args.early_stop_min_records,
+                confidence=args.early_stop_confidence,
+                min_models=args.early_stop_min_models,
+                task_count=len(args.tasks),
+            )
+
+            def handle_round_result(result):
+                elimination.observe(result)
+                handle_result(result)
+
+            for round_index, start, stop in elimination.schedule():
+                def round_records(start=start, stop=stop):
+                    return itertools.islice(records(), start, stop)
+
+                size = sum(1 for _ in round_records())
+                if size == 0:
+                    break
+                elimination.start_round(round_index, start, size)
+                run_jobs(elimination.active, round_records, handle_round_result)
+                elimination.eliminate(round_index)
+                if size < stop - start or elimination.finished():
+                    break
+            total_records = sum(1 for _ in records())
+            elimination.log_summary(total_records)
+            if report_writer is not None:
+                report_writer.add_section(elimination.render(total_records))
+        else:
+            run_jobs(config.OLLAMA_MODELS_TO_COMPARE, records, handle_result)
+        completed = True
+    finally:
+        close_run(completed)
+
+
+def main(argv=None):
+    """
+    主要的執行函數：解析命令列參數後執行比較。
+
+    Args:
+        argv (list, optional): 命令列參數列表，預設使用 sys.argv。
+    """
+    setup_logging()
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        # 以 cProfile 剖析整個執行 (含所有工作執行緒)，結果寫入 pstats 檔案
+        run_profiled(lambda: run(args), args.profile)
+    else:
+        run(args)
 
 
 # 如果此腳本是作為主程式執行
@@ -1,32 +1,611 @@
 # ollama_client.py
 # 此檔案包含用於與 Ollama 大型語言模型互動的客戶端。
-# 注意：目前這是一個模擬 (Mock) 的客戶端，用於測試和開發目的。
+# - OllamaClient: 透過 HTTP 串流呼叫 Ollama /api/generate，提供同步與非同步 (agenerate) 介面，
+#   並使用所有客戶端共用的 keep-alive HTTP 工作階段 (見 http_session)。
+# - MockOllamaClient: 模擬 (Mock) 的客戶端，用於離線測試和開發目的。
+# - CachedOllamaClient: 為上述任一客戶端加上持久化生成快取。
 
+import json # 用於處理 Ollama API 的 JSON 資料
 import logging # 用於記錄程式運行訊息
+import threading # 用於保護模型摘要值的快取
+import time # 用於量測首個 token 時間與總耗時
+from urllib.parse import urlsplit # 用於解析 Ollama 主機位址
 
-# 設定日誌記錄的基本配置
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+from cache_store import content_key, text_hash # 用於組合生成快取鍵
+from http_session import HTTPStatusError, get_session, to_thread # 共用的非同步 HTTP 工作階段與工作執行緒呼叫
 
+# 未指定主機位址時使用的 Ollama 預設位址
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
 
-class OllamaClient:
+# 模型在最後一次請求後保持常駐的預設時間 (Ollama keep_alive 格式)
+DEFAULT_KEEP_ALIVE = "30m"
+# 暖機時送出的預設提示詞，只會產生一個 token
+DEFAULT_WARMUP_PROMPT = "Hello"
+
+# 各任務類型的提示詞範本，{text} 會被替換為輸入文字
+PROMPT_TEMPLATES = {
+    "translate": (
+        "請將以下英文內容翻譯成自然流暢的繁體中文 (台灣用語)，只輸出翻譯結果：\n\n{text}"
+    ),
+    "summarize": (
+        "請以繁體中文 (台灣用語) 簡潔地總結以下內容的重點，只輸出總結：\n\n{text}"
+    ),
+    # 長輸入分段總結後，整合各段總結的提示詞 (見 chunking.ChunkedOllamaClient)
+    "summarize_reduce": (
+        "以下是同一篇文章各段落的重點總結，請以繁體中文 (台灣用語) 將它們整合成一份"
+        "連貫、不重複的簡潔總結，只輸出總結：\n\n{text}"
+    ),
+}
+
+
+def build_prompt(task_type: str, input_text: str) -> str:
+    """
+    依任務類型組合送給 Ollama 模型的提示詞。
+
+    Args:
+        task_type (str): 任務的類型 (例如 "summarize", "translate")。
+        input_text (str): 輸入文字。
+
+    Returns:
+        str: 完整的提示詞；未知的任務類型會直接使用輸入文字。
+    """
+    template = PROMPT_TEMPLATES.get(task_type)
+    if template is None:
+        return input_text
+    return template.format(text=input_text)
+
+
+def _nanoseconds_to_seconds(value):
+    """
+    將 Ollama 回應中以奈秒為單位的時間轉換為秒。
+
+    Args:
+        value (int or None): 奈秒數值。
+
+    Returns:
+        float or None: 秒數；輸入為 None 時回傳 None。
+    """
+    return value / 1e9 if isinstance(value, (int, float)) else None
+
+
+def metrics_from_response(final_chunk: dict, wall_time: float, ttft) -> dict:
+    """
+    從 Ollama 串流回應的最後一個區塊整理生成指標。
+
+    Args:
+        final_chunk (dict): 'done' 為 True 的最後一個回應區塊，包含耗時與 token 數量。
+        wall_time (float): 客戶端量測的總耗時 (秒)。
+        ttft (float or None): 客戶端量測的首個 token 時間 (秒)。
+
+    Returns:
+        dict: 生成指標，包含 'wall_time_s', 'ttft_s', 'total_duration_s', 'load_duration_s',
+              'prompt_eval_count', 'prompt_eval_duration_s', 'eval_count',
+              'eval_duration_s', 'tokens_per_sec' 和 'done_reason' 等鍵。
+    """
+    eval_count = final_chunk.get("eval_count")
+    eval_duration = _nanoseconds_to_seconds(final_chunk.get("eval_duration"))
+    tokens_per_sec = None
+    if eval_count and eval_duration:
+        tokens_per_sec = eval_count / eval_duration
+    return {
+        "wall_time_s": wall_time, # 客戶端量測的總耗時
+        "ttft_s": ttft, # 首個 token 時間
+        "total_duration_s": _nanoseconds_to_seconds(final_chunk.get("total_duration")),
+        "load_duration_s": _nanoseconds_to_seconds(final_chunk.get("load_duration")),
+        "prompt_eval_count": final_chunk.get("prompt_eval_count"), # 提示詞 token 數量
+        "prompt_eval_duration_s": _nanoseconds_to_seconds(
+            final_chunk.get("prompt_eval_duration")
+        ),
+        "eval_count": eval_count, # 產生的 token 數量
+        "eval_duration_s": eval_duration,
+        "tokens_per_sec": tokens_per_sec, # 生成速度
+        "done_reason": final_chunk.get("done_reason"), # 結束原因 ("stop"，達到長度上限時為 "length")
+    }
+
+
+class _ModelResidencyMixin:
+    """
+    模型常駐排程的共用邏輯。
+    同一時間只讓一個模型常駐：切換模型時先明確卸載前一個模型，再預先載入 (暖機) 下一個模型，
+    讓同一個模型的所有輸入都在已載入的狀態下執行，載入時間也不會混入推論時間。
+    子類別需實作 load_model 與 unload_model。
+    """
+    def _init_residency(self):
+        self.resident_model = None # 目前常駐的模型名稱
+        self.load_times = {} # 模型名稱對應暖機載入耗時 (秒)
+
+    def activate_model(self, model_name: str):
+        """
+        確保指定模型已常駐；若目前常駐的是其他模型，先卸載它。
+
+        Args:
+            model_name (str): 要常駐的 Ollama 模型名稱。
+
+        Returns:
+            float or None: 本次暖機載入耗時 (秒)；模型原本就已常駐時回傳 None。
+        """
+        if self.resident_model == model_name:
+            return None
+        self.release_models()
+        load_time = self.load_model(model_name)
+        self.resident_model = model_name
+        self.load_times[model_name] = load_time
+        return load_time
+
+    def release_models(self):
+        """
+        卸載目前常駐的模型 (如果有)。
+        """
+        if self.resident_model is None:
+            return
+        model_name = self.resident_model
+        self.resident_model = None
+        try:
+            self.unload_model(model_name)
+        except Exception as e:
+            logging.warning(f"Failed to unload Ollama model {model_name}: {e}")
+
+
+class OllamaClient(_ModelResidencyMixin):
     """
     Ollama 客戶端類別。
-    用於與 Ollama 服務互動，以產生文字或執行其他相關任務。
-    這是一個模擬客戶端，其行為是預先定義的，而不是實際呼叫 Ollama API。
+    透過 Ollama HTTP API 產生文字；/api/generate 以串流方式讀取，
+    並記錄首個 token 時間、生成速度與 Ollama 回報的耗時與 token 數量。
+    所有請求都經過共用的非同步 HTTP 工作階段 (見 http_session)：agenerate 系列方法可在事件迴圈中
+    直接 await，同步方法則提交到工作階段的事件迴圈並等待結果，兩者共用同一組 keep-alive 連線。
     """
-    def __init__(self, host=None):
+    def __init__(
+        self,
+        host=None,
+        options=None,
+        timeout: float = 600,
+        keep_alive=DEFAULT_KEEP_ALIVE,
+        warmup_prompt: str = DEFAULT_WARMUP_PROMPT,
+        session=None,
+    ):
         """
         初始化 OllamaClient。
 
+        Args:
+            host (str, optional): Ollama 服務的主機位址。預設為 DEFAULT_OLLAMA_HOST。
+            options (dict, optional): 傳給 Ollama 的生成選項 (例如 temperature)。
+            timeout (float, optional): 連線與每次讀取的逾時 (秒)。
+            keep_alive (str or int, optional): 模型在最後一次請求後保持常駐的時間，
+                                               例如 "30m"；會隨每個生成請求送出。
+            warmup_prompt (str, optional): 暖機時送出的提示詞；空字串表示只載入模型。
+            session (AsyncHTTPSession, optional): 使用的 HTTP 工作階段，預設為行程內共用的工作階段。
+        """
+        self.host = host or DEFAULT_OLLAMA_HOST # Ollama 服務的主機位址
+        self.options = dict(options or {}) # 生成選項，也是生成快取鍵的一部分
+        self.keep_alive = keep_alive # 模型常駐時間
+        self.warmup_prompt = warmup_prompt # 暖機提示詞
+        self.timeout = timeout # 連線與讀取逾時
+        self._init_residency()
+        parts = urlsplit(self.host if "://" in self.host else f"http://{self.host}")
+        # _base_url: 正規化後的服務位址 (含可能的路徑前綴)，API 路徑直接接在後面
+        self._base_url = f"{parts.scheme or 'http'}://{parts.netloc}{parts.path.rstrip('/')}"
+        self._session = session
+        self._digests = None # 模型名稱對應摘要值，第一次查詢時從 /api/tags 載入
+        self._digest_lock = threading.Lock()
+        logging.info(f"OllamaClient initialized for host: {self.host}")
+
+    @property
+    def session(self):
+        """
+        Returns:
+            AsyncHTTPSession: 此客戶端使用的 HTTP 工作階段。
+        """
+        return self._session if self._session is not None else get_session()
+
+    async def _arequest_json(self, method: str, path: str, payload=None, timeout=None) -> dict:
+        """
+        送出請求並解析單一 JSON 回應。
+
+        Args:
+            method (str): HTTP 方法。
+            path (str): API 路徑，例如 "/api/tags"。
+            payload (dict, optional): 以 JSON 送出的請求內容。
+            timeout (float, optional): 逾時秒數，預設使用客戶端的逾時。
+
+        Returns:
+            dict: 解析後的 JSON 回應。
+
+        Raises:
+            RuntimeError: 當 Ollama 回傳非 200 狀態碼時。
+        """
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        response = await self.session.request(
+            method, self._base_url + path, body, headers, timeout or self.timeout
+        )
+        if response.status != 200:
+            raise RuntimeError(
+                f"Ollama {method} {path} failed with HTTP {response.status}: {response.text()[:200]}"
+            )
+        text = response.body.decode("utf-8").strip()
+        # 若伺服器仍以串流格式 (多行 JSON) 回應，取最後一行作為最終結果
+        return json.loads(text.splitlines()[-1]) if text else {}
+
+    def _request_json(self, method: str, path: str, payload=None) -> dict:
+        """
+        _arequest_json 的同步版本。
+
+        Args:
+            method (str): HTTP 方法。
+            path (str): API 路徑。
+            payload (dict, optional): 以 JSON 送出的請求內容。
+
+        Returns:
+            dict: 解析後的 JSON 回應。
+        """
+        return self.session.run(self._arequest_json(method, path, payload))
+
+    def get_model_digest(self, model_name: str) -> str:
+        """
+        取得模型的摘要值 (digest)，用於辨識同名但內容不同的模型版本。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+
+        Returns:
+            str: 模型摘要值；Ollama 中找不到該模型時回傳空字串。
+        """
+        with self._digest_lock:
+            # 找不到的模型可能是之後才下載的，重新查詢模型列表
+            if self._digests is None or model_name not in self._digests:
+                tags = self._request_json("GET", "/api/tags")
+                self._digests = {
+                    model.get("name"): model.get("digest", "")
+                    for model in tags.get("models", [])
+                }
+            return self._digests.get(model_name, "")
+
+    def load_model(self, model_name: str) -> float:
+        """
+        預先載入 (暖機) 模型，並設定 keep_alive 讓它在整批輸入期間保持常駐。
+        暖機請求的耗時不會計入任何生成指標。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+
+        Returns:
+            float: 暖機請求的總耗時 (秒)，主要為模型載入時間。
+        """
+        payload = {"model": model_name, "prompt": self.warmup_prompt, "stream": False}
+        if self.warmup_prompt:
+            # 只產生一個 token，足以完成載入與第一次推論的初始化
+            payload["options"] = dict(self.options, num_predict=1)
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        start = time.perf_counter()
+        self._request_json("POST", "/api/generate", payload)
+        load_time = time.perf_counter() - start
+        logging.info(f"Ollama model {model_name} loaded and warmed up in {load_time:.3f}s")
+        return load_time
+
+    def unload_model(self, model_name: str):
+        """
+        明確地從記憶體卸載模型 (keep_alive 設為 0)。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+        """
+        self._request_json(
+            "POST", "/api/generate", {"model": model_name, "keep_alive": 0, "stream": False}
+        )
+        logging.info(f"Ollama model {model_name} unloaded")
+
+    def health_check(self, timeout: float = 5) -> bool:
+        """
+        以 /api/version 檢查 Ollama 服務是否可用，使用較短的逾時。
+
+        Args:
+            timeout (float, optional): 健康檢查的逾時 (秒)。
+
+        Returns:
+            bool: 服務回應 HTTP 200 時為 True。
+        """
+        try:
+            response = self.session.run(
+                self.session.request("GET", self._base_url + "/api/version", timeout=timeout)
+            )
+            return response.status == 200
+        except OSError as e:
+            logging.warning(f"Ollama host {self.host} health check failed: {e}")
+            return False
+
+    def list_loaded_models(self) -> list:
+        """
+        以 /api/ps 查詢目前已載入記憶體的模型。
+
+        Returns:
+            list: 已載入的模型名稱列表。
+        """
+        running = self._request_json("GET", "/api/ps")
+        return [model.get("name") for model in running.get("models", [])]
+
+    async def agenerate_stream(
+        self, model_name: str, input_text: str, task_type: str, metrics=None
+    ):
+        """
+        以串流方式非同步產生輸出，每收到一段文字就立即產出，讓後續階段可以提早開始。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱 (例如 "llama2:7b")。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型 (例如 "summarize", "translate")。
+            metrics (dict, optional): 若提供，串流結束時會填入生成指標
+                                      (見 metrics_from_response)。
+
+        Yields:
+            str: 模型逐段產生的文字。
+
+        Raises:
+            RuntimeError: 當 Ollama 回傳錯誤或串流在完成前中斷時。
+        """
+        logging.info(f"OllamaClient.generate called for model: {model_name}, task: {task_type}")
+        payload = {
+            "model": model_name,
+            "prompt": build_prompt(task_type, input_text),
+            "stream": True,
+        }
+        if self.options:
+            payload["options"] = self.options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        start = time.perf_counter()
+        ttft = None # 首個 token 時間 (秒)
+        final_chunk = None # 'done' 為 True 的最後一個區塊
+        lines = self.session.stream_lines(
+            "POST",
+            self._base_url + "/api/generate",
+            json.dumps(payload).encode("utf-8"),
+            {"Content-Type": "application/json"},
+            self.timeout,
+        )
+        try:
+            # Ollama 以換行分隔的 JSON (NDJSON) 逐段回傳結果
+            async for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama error for model {model_name}: {chunk['error']}")
+                text = chunk.get("response", "")
+                if text:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    yield text
+                if chunk.get("done"):
+                    final_chunk = chunk
+        except HTTPStatusError as e:
+            raise RuntimeError(
+                f"Ollama POST /api/generate failed with HTTP {e.result.status}: "
+                f"{e.result.text()[:200]}"
+            ) from None
+        finally:
+            await lines.aclose()
+        if final_chunk is None:
+            raise RuntimeError(f"Ollama stream for model {model_name} ended before completion")
+        if metrics is not None:
+            metrics.update(
+                metrics_from_response(final_chunk, time.perf_counter() - start, ttft)
+            )
+
+    def generate_stream(
+        self, model_name: str, input_text: str, task_type: str, metrics=None
+    ):
+        """
+        agenerate_stream 的同步版本：串流在共用事件迴圈中執行，每段文字一產生就交給呼叫端。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+            metrics (dict, optional): 若提供，串流結束時會填入生成指標。
+
+        Yields:
+            str: 模型逐段產生的文字。
+        """
+        return self.session.iterate(
+            self.agenerate_stream(model_name, input_text, task_type, metrics)
+        )
+
+    async def agenerate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        非同步產生完整輸出並回傳生成指標。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (輸出文字, 生成指標字典)。
+        """
+        metrics = {}
+        parts = [
+            text async for text in self.agenerate_stream(model_name, input_text, task_type, metrics)
+        ]
+        return "".join(parts), metrics
+
+    def generate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        產生完整輸出並回傳生成指標。
+        整個串流在共用事件迴圈中讀取完畢後才回到呼叫端，只需一次跨執行緒交接。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (輸出文字, 生成指標字典)。
+        """
+        return self.session.run(self.agenerate_with_metrics(model_name, input_text, task_type))
+
+    async def agenerate(self, model_name: str, input_text: str, task_type: str) -> str:
+        """
+        generate 的非同步版本。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            str: 模型產生的輸出文字。
+        """
+        return (await self.agenerate_with_metrics(model_name, input_text, task_type))[0]
+
+    def generate(self, model_name: str, input_text: str, task_type: str) -> str:
+        """
+        使用指定的 Ollama 模型根據輸入文字和任務類型產生輸出。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱 (例如 "llama2:7b")。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型 (例如 "summarize", "translate")。
+
+        Returns:
+            str: 模型產生的輸出文字。
+        """
+        return self.generate_with_metrics(model_name, input_text, task_type)[0]
+
+    def close(self):
+        """
+        連線屬於共用的 HTTP 工作階段，由建立工作階段的一方關閉 (見 http_session.close_session)；
+        保留此方法讓所有 Ollama 客戶端有一致的生命週期介面。
+        """
+
+
+class MockOllamaClient(_ModelResidencyMixin):
+    """
+    模擬的 Ollama 客戶端類別。
+    其行為是預先定義的，而不是實際呼叫 Ollama API，用於離線測試和開發目的。
+    """
+    def __init__(self, host=None, options=None):
+        """
+        初始化 MockOllamaClient。
+
         Args:
             host (str, optional): Ollama 服務的主機位址。預設為 None。
                                   在模擬客戶端中，此參數主要用於記錄。
+            options (dict, optional): 傳給 Ollama 的生成選項 (例如 temperature)。
         """
+        self.host = host # Ollama 服務的主機位址
+        self.options = dict(options or {}) # 生成選項，也是生成快取鍵的一部分
+        self._init_residency()
         # 記錄客戶端初始化，並註明主機資訊
         logging.info(f"MockOllamaClient initialized for host: {host}")
 
+    def load_model(self, model_name: str) -> float:
+        """
+        模擬模型載入。這是一個模擬方法。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+
+        Returns:
+            float: 模擬的載入耗時，固定為 0.0。
+        """
+        return 0.0
+
+    def unload_model(self, model_name: str):
+        """
+        模擬模型卸載。這是一個模擬方法。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+        """
+
+    def health_check(self, timeout: float = 5) -> bool:
+        """
+        模擬健康檢查。這是一個模擬方法。
+
+        Args:
+            timeout (float, optional): 健康檢查的逾時 (秒)，模擬客戶端不使用。
+
+        Returns:
+            bool: 模擬客戶端固定回傳 True。
+        """
+        return True
+
+    def list_loaded_models(self) -> list:
+        """
+        模擬查詢已載入的模型。這是一個模擬方法。
+
+        Returns:
+            list: 目前常駐的模型名稱列表。
+        """
+        return [self.resident_model] if self.resident_model else []
+
+    def get_model_digest(self, model_name: str) -> str:
+        """
+        取得模型的摘要值 (digest)，用於辨識同名但內容不同的模型版本。
+        這是一個模擬方法。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+
+        Returns:
+            str: 模型摘要值；模擬客戶端固定回傳 "mock"。
+        """
+        return "mock"
+
+    def generate_stream(
+        self, model_name: str, input_text: str, task_type: str, metrics=None
+    ):
+        """
+        以串流方式產生模擬輸出，逐字詞產出。
+        這是一個模擬方法。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+            metrics (dict, optional): 若提供，串流結束時會填入模擬的生成指標。
+
+        Yields:
+            str: 模擬輸出的文字片段。
+        """
+        output, generated_metrics = self.generate_with_metrics(model_name, input_text, task_type)
+        words = output.split(" ")
+        for index, word in enumerate(words):
+            yield word if index == 0 else " " + word
+        if metrics is not None:
+            metrics.update(generated_metrics)
+
+    def generate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        產生模擬輸出並回傳模擬的生成指標。
+        這是一個模擬方法。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (模擬輸出文字, 生成指標字典)。
+        """
+        start = time.perf_counter()
+        output = self.generate(model_name, input_text, task_type)
+        wall_time = time.perf_counter() - start
+        eval_count = len(output.split())
+        return output, {
+            "wall_time_s": wall_time,
+            "ttft_s": wall_time,
+            "total_duration_s": wall_time,
+            "load_duration_s": 0.0,
+            "prompt_eval_count": len(input_text.split()),
+            "prompt_eval_duration_s": 0.0,
+            "eval_count": eval_count,
+            "eval_duration_s": wall_time,
+            "tokens_per_sec": eval_count / wall_time if wall_time else None,
+        }
+
     def generate(self, model_name: str, input_text: str, task_type: str) -> str:
         """
         使用指定的 Ollama 模型根據輸入文字和任務類型產生輸出。
@@ -51,4 +630,232 @@ class OllamaClient:
         if model_name == "another-mock-model:13b":
             raise RuntimeError(f"Simulated error for Ollama model {model_name}")
         # 回傳一個模擬的成功輸出
-        return f"Simulated successful output from {model_name} for task {task_type} on input: '{input_text[:30]}...'"
+        # (以繁體中文輸出，與真實模型一樣能通過送交評審前的本地檢查)
+        return f"這是模型 {model_name} 針對「{task_type}」任務產生的模擬輸出，輸入開頭為：「{input_text[:30]}」……"
+
+    async def agenerate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        generate_with_metrics 的非同步版本。模擬客戶端沒有 I/O，直接回傳同步結果。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (模擬輸出文字, 生成指標字典)。
+        """
+        return self.generate_with_metrics(model_name, input_text, task_type)
+
+    async def agenerate(self, model_name: str, input_text: str, task_type: str) -> str:
+        """
+        generate 的非同步版本。這是一個模擬方法。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            str: 模型產生的模擬輸出文字。
+        """
+        return self.generate(model_name, input_text, task_type)
+
+    def close(self):
+        """
+        模擬客戶端沒有需要釋放的資源。
+        """
+
+
+class CachedOllamaClient:
+    """
+    具有持久化生成快取的 Ollama 客戶端包裝類別。
+    快取鍵由模型名稱與摘要值、任務類型、提示詞範本、輸入文字雜湊以及生成選項組成，
+    因此只更換評審或報告格式時不需要重新執行推論；無法取得模型摘要值時不使用快取。
+    """
+    def __init__(self, client, cache, refresh=False):
+        """
+        初始化快取包裝客戶端。
+
+        Args:
+            client (OllamaClient or MockOllamaClient): 實際執行生成的 Ollama 客戶端。
+            cache (SQLiteCache): 用於儲存生成結果的快取。
+            refresh (bool, optional): 為 True 時略過讀取快取、一律重新生成並覆寫快取。
+        """
+        self.client = client # 被包裝的 Ollama 客戶端
+        self.cache = cache # 生成結果快取
+        self.refresh = refresh # 是否強制重新生成
+        self._digests = {} # 模型名稱對應摘要值，每個模型只查詢一次
+        self._digest_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # 其餘屬性與方法直接轉交給被包裝的客戶端
+        return getattr(self.client, name)
+
+    def _model_digest(self, model_name: str):
+        """
+        取得並記住模型的摘要值。
+        查詢失敗或找不到模型時不記住結果，下一次生成會重新查詢。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+
+        Returns:
+            str or None: 模型摘要值；查詢失敗或找不到模型時回傳 None。
+        """
+        with self._digest_lock:
+            digest = self._digests.get(model_name)
+        if digest:
+            return digest
+        try:
+            digest = self.client.get_model_digest(model_name)
+        except Exception as e:
+            logging.warning(
+                f"Could not resolve digest for {model_name}, bypassing the generation cache: {e}"
+            )
+            return None
+        if not digest:
+            logging.warning(f"No digest for {model_name}, bypassing the generation cache")
+            return None
+        with self._digest_lock:
+            self._digests[model_name] = digest
+        return digest
+
+    def cache_key(self, model_name: str, input_text: str, task_type: str):
+        """
+        計算生成請求的快取鍵。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+            input_text (str): 輸入文字。
+            task_type (str): 任務類型。
+
+        Returns:
+            str or None: 快取鍵；模型摘要值未知時回傳 None (不讀取也不寫入快取，
+                         避免模型更新後沿用舊版本的生成結果)。
+        """
+        digest = self._model_digest(model_name)
+        if digest is None:
+            return None
+        return content_key(
+            "generate",
+            model_name,
+            digest,
+            task_type,
+            # 提示詞範本的雜湊：修改 PROMPT_TEMPLATES 後舊的生成結果不再沿用
+            text_hash(build_prompt(task_type, "")),
+            text_hash(input_text),
+            self.client.options,
+        )
+
+    def has_cached(self, model_name: str, input_text: str, task_type: str) -> bool:
+        """
+        檢查生成請求是否已有快取 (不影響命中統計)，用於決定是否需要暖機載入模型。
+
+        Args:
+            model_name (str): Ollama 模型名稱。
+            input_text (str): 輸入文字。
+            task_type (str): 任務類型。
+
+        Returns:
+            bool: 有可用的快取且未要求重新生成時為 True。
+        """
+        if self.refresh:
+            return False
+        key = self.cache_key(model_name, input_text, task_type)
+        return key is not None and self.cache.contains(key)
+
+    def generate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        產生輸出與生成指標；快取命中時直接回傳快取內容與原始的生成指標
+        (並標記 'cached' 為 True)，否則呼叫實際客戶端並寫入快取。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (輸出文字, 生成指標字典)。
+        """
+        key = self.cache_key(model_name, input_text, task_type)
+        cached = self._lookup(key, model_name, task_type)
+        if cached is not None:
+            return cached
+        output, metrics = self.client.generate_with_metrics(model_name, input_text, task_type)
+        # 只快取成功的輸出；例外會直接往外拋出，不會寫入快取
+        if key is not None:
+            self.cache.put(key, {"output": output, "metrics": metrics})
+        return output, metrics
+
+    def _lookup(self, key: str, model_name: str, task_type: str):
+        """
+        讀取生成快取。
+
+        Args:
+            key (str or None): 快取鍵；模型摘要值未知時為 None。
+            model_name (str): Ollama 模型名稱，用於日誌訊息。
+            task_type (str): 任務類型，用於日誌訊息。
+
+        Returns:
+            tuple or None: 命中時為 (輸出文字, 生成指標字典)；未命中、快取鍵未知或要求重新生成時為 None。
+        """
+        if self.refresh or key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        logging.info(f"Generation cache hit for model: {model_name}, task: {task_type}")
+        metrics = dict(cached.get("metrics") or {})
+        metrics["cached"] = True
+        return cached["output"], metrics
+
+    async def agenerate_with_metrics(self, model_name: str, input_text: str, task_type: str):
+        """
+        generate_with_metrics 的非同步版本。
+        查詢摘要值與讀寫 SQLite 快取都是同步操作，在工作執行緒中執行，不會阻塞事件迴圈。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            tuple: (輸出文字, 生成指標字典)。
+        """
+        key = await to_thread(self.cache_key, model_name, input_text, task_type)
+        cached = await to_thread(self._lookup, key, model_name, task_type)
+        if cached is not None:
+            return cached
+        output, metrics = await self.client.agenerate_with_metrics(model_name, input_text, task_type)
+        if key is not None:
+            await to_thread(self.cache.put, key, {"output": output, "metrics": metrics})
+        return output, metrics
+
+    async def agenerate(self, model_name: str, input_text: str, task_type: str) -> str:
+        """
+        generate 的非同步版本。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            str: 模型產生的輸出文字。
+        """
+        return (await self.agenerate_with_metrics(model_name, input_text, task_type))[0]
+
+    def generate(self, model_name: str, input_text: str, task_type: str) -> str:
+        """
+        產生輸出；快取命中時直接回傳快取內容，否則呼叫實際客戶端並寫入快取。
+
+        Args:
+            model_name (str): 要使用的 Ollama 模型名稱。
+            input_text (str): 提供給模型的輸入文字。
+            task_type (str): 任務的類型。
+
+        Returns:
+            str: 模型產生的輸出文字。
+        """
+        return self.generate_with_metrics(model_name, input_text, task_type)[0]
@@ -0,0 +1,288 @@
+# ollama_pool.py
+# 此檔案包含多台 Ollama 主機的主機池與工作分派邏輯。
+# - OllamaHostPool: 管理每台主機的客戶端、健康檢查與已載入模型資訊。
+# - JobDispatcher: 以「每個模型一組工作」為單位分派給主機，優先讓模型留在已載入它的主機上；
+#   沒有新的模型組時，閒置主機會加入仍有剩餘工作的模型組，失效主機未完成的工作會重新排入。
+#   指定視窗時改為分段分派：每個模型先處理視窗內的記錄，所有模型都取完後才進入下一個視窗。
+
+import collections  # 用於保存需要重試的工作
+import http.client  # 用於辨識連線層級的錯誤
+import logging  # 用於記錄程式運行訊息
+import socket  # 用於辨識逾時錯誤
+import threading  # 用於保護分派狀態
+
+# 代表主機本身無法連線或回應中斷的例外類型 (與模型錯誤區分，用於觸發容錯移轉)
+HOST_ERRORS = (OSError, http.client.HTTPException)
+# 逾時錯誤：雖然是 OSError 的子類別，但代表單一請求執行過久 (例如生成不會結束)，
+# 主機本身仍可回應健康檢查，因此視為工作錯誤，避免同一個工作在同一台主機上無限重試
+TIMEOUT_ERRORS = (TimeoutError, socket.timeout)
+
+
+def is_host_error(error) -> bool:
+    """
+    判斷例外是否代表主機本身失效 (需要容錯移轉)，而非單一工作的錯誤。
+
+    Args:
+        error (BaseException): 要判斷的例外。
+
+    Returns:
+        bool: 屬於 HOST_ERRORS 且不是逾時錯誤時為 True。
+    """
+    return isinstance(error, HOST_ERRORS) and not isinstance(error, TIMEOUT_ERRORS)
+
+
+def parse_ollama_hosts(value) -> list:
+    """
+    將 OLLAMA_API_BASE_URL 設定值解析為主機位址列表。
+
+    Args:
+        value (str or list): 單一位址、以逗號分隔的多個位址，或位址列表。
+
+    Returns:
+        list: 去除空白與重複項目後的主機位址列表。
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    hosts = []
+    for host in value:
+        host = str(host).strip()
+        if host and host not in hosts:
+            hosts.append(host)
+    return hosts
+
+
+class OllamaHostPool:
+    """
+    Ollama 主機池類別。
+    每台主機各有一個客戶端 (各自維護連線池與模型常駐狀態)。
+    """
+
+    def __init__(self, clients):
+        """
+        初始化主機池。
+
+        Args:
+            clients (list): 每台主機一個 Ollama 客戶端 (OllamaClient、MockOllamaClient
+                            或其 CachedOllamaClient 包裝)。
+        """
+        self.clients = list(clients)  # 所有主機的客戶端
+
+    def healthy_clients(self) -> list:
+        """
+        對所有主機執行健康檢查，回傳可用主機的客戶端。
+
+        Returns:
+            list: 通過健康檢查的客戶端列表，順序與設定相同。
+        """
+        healthy = []
+        for client in self.clients:
+            if client.health_check():
+                healthy.append(client)
+            else:
+                logging.warning(f"Ollama host {client.host} failed health check, skipping")
+        return healthy
+
+    @staticmethod
+    def loaded_models(client) -> set:
+        """
+        查詢主機目前已載入的模型，用於模型親和性。
+
+        Args:
+            client: 主機的 Ollama 客戶端。
+
+        Returns:
+            set: 已載入的模型名稱集合；查詢失敗時回傳空集合。
+        """
+        try:
+            return set(client.list_loaded_models())
+        except Exception as e:
+            logging.warning(f"Could not list loaded models on {client.host}: {e}")
+            return set()
+
+    def close(self):
+        """
+        關閉所有主機客戶端。
+        """
+        for client in self.clients:
+            client.close()
+
+
+class JobGroup:
+    """
+    單一模型的工作組。
+    工作序列以惰性方式逐一取出，多台主機可同時從同一組取得工作；
+    因主機失效而未完成的工作會放入重試佇列並保留原本的工作索引，
+    同時記錄每個工作已嘗試的次數，用於限制重試上限。
+    設定 limit 時只取出工作索引小於 limit 的工作 (分段分派的視窗)，重試佇列不受限制。
+    """
+
+    def __init__(self, index: int, model_name: str, jobs, on_exhausted=None):
+        """
+        初始化工作組。
+
+        Args:
+            index (int): 工作組在所有工作組中的順序。
+            model_name (str): 此工作組使用的 Ollama 模型名稱。
+            jobs (iterable): 此模型的工作序列。
+            on_exhausted (callable, optional): 工作序列取完時呼叫，參數為 (組索引, 工作總數)。
+        """
+        self.index = index  # 工作組順序
+        self.model_name = model_name  # Ollama 模型名稱
+        self._iterator = iter(jobs)
+        self._retry = collections.deque()  # 需要由其他主機重試的 (工作索引, 工作)
+        self._attempts = {}  # 重試佇列中的工作索引對應其已失敗的次數
+        self._next_index = 0  # 下一個工作的組內索引
+        self.limit = None  # 目前視窗的工作索引上限 (不含)；None 表示不分段
+        self._exhausted = False  # 工作序列是否已取完
+        self._on_exhausted = on_exhausted
+        self._lock = threading.Lock()
+
+    def next_job(self):
+        """
+        取出下一個工作，優先處理重試佇列。
+
+        Returns:
+            tuple or None: (組內工作索引, 工作字典)；沒有剩餘工作時回傳 None。
+        """
+        with self._lock:
+            if self._retry:
+                return self._retry.popleft()
+            if self._exhausted:
+                return None
+            if self.limit is not None and self._next_index >= self.limit:
+                return None
+            try:
+                job = next(self._iterator)
+            except StopIteration:
+                self._exhausted = True
+                if self._on_exhausted is not None:
+                    self._on_exhausted(self.index, self._next_index)
+                return None
+            item = (self._next_index, job)
+            self._next_index += 1
+            return item
+
+    def requeue(self, item, max_attempts: int = None) -> bool:
+        """
+        將因主機失效而未完成的工作放回重試佇列。
+
+        Args:
+            item (tuple): next_job 回傳的 (組內工作索引, 工作字典)。
+            max_attempts (int, optional): 每個工作最多嘗試的次數；None 表示不限制。
+
+        Returns:
+            bool: 已放回重試佇列時為 True；已達嘗試上限時為 False (由呼叫端記錄錯誤)。
+        """
+        index = item[0]
+        with self._lock:
+            attempts = self._attempts.get(index, 0) + 1
+            if max_attempts is not None and attempts >= max_attempts:
+                self._attempts.pop(index, None)
+                return False
+            self._attempts[index] = attempts
+            self._retry.append(item)
+            return True
+
+    def has_work(self) -> bool:
+        """
+        檢查工作組是否可能還有剩餘工作。
+
+        Returns:
+            bool: 重試佇列非空或工作序列尚未取完時為 True。
+        """
+        with self._lock:
+            return bool(self._retry) or not self._exhausted
+
+    def has_window_work(self) -> bool:
+        """
+        檢查工作組在目前視窗內是否可能還有剩餘工作。
+
+        Returns:
+            bool: 重試佇列非空，或工作序列尚未取完且尚未達到視窗上限時為 True。
+        """
+        with self._lock:
+            if self._retry:
+                return True
+            return not self._exhausted and (self.limit is None or self._next_index < self.limit)
+
+
+class JobDispatcher:
+    """
+    工作分派器類別。
+    主機向分派器索取工作組：優先取得模型已載入在該主機上的未開始工作組，
+    其次依順序取得下一個未開始的工作組；全部開始後，閒置主機會加入仍有剩餘工作的工作組。
+    指定視窗時以記錄為單位分段：每個工作組在每個視窗只取出 window 個工作，
+    所有工作組都取完目前視窗後才一起進入下一個視窗，同一筆記錄在各模型的輸出因此會在相近的時間產生。
+    工作組在每個視窗第一次被取得時是一個「工作段」，on_segment 依取得順序收到每個工作段。
+    """
+
+    def __init__(self, groups, window: int = None, on_segment=None):
+        """
+        初始化分派器。
+
+        Args:
+            groups (list): JobGroup 列表，順序即預設的執行順序。
+            window (int, optional): 每個視窗的記錄數量；None 表示每個工作組一次取完。
+            on_segment (callable, optional): 工作段開始時呼叫，參數為 (組索引, 起始工作索引, 結束工作索引)；
+                                             不分段時結束工作索引為 None。
+        """
+        self.groups = list(groups)  # 所有工作組
+        self.window = window
+        self._window_start = 0  # 目前視窗的起始工作索引
+        self._on_segment = on_segment
+        self._pending = list(self.groups)  # 目前視窗中尚未開始的工作組
+        self._lock = threading.Lock()
+        if window is not None:
+            for group in self.groups:
+                group.limit = window
+
+    def _start(self, group) -> JobGroup:
+        # 在持有鎖的情況下開始工作組在目前視窗的工作段
+        self._pending.remove(group)
+        if self._on_segment is not None:
+            end = None if self.window is None else self._window_start + self.window
+            self._on_segment(group.index, self._window_start, end)
+        return group
+
+    def _advance(self) -> bool:
+        # 在持有鎖的情況下進入下一個視窗；沒有剩餘工作或不分段時回傳 False
+        if self.window is None:
+            return False
+        groups = [group for group in self.groups if group.has_work()]
+        if not groups:
+            return False
+        self._window_start += self.window
+        for group in groups:
+            group.limit = self._window_start + self.window
+        self._pending = groups
+        return True
+
+    def acquire(self, loaded_models) -> JobGroup:
+        """
+        為主機挑選下一個工作組。
+
+        Args:
+            loaded_models (set): 該主機目前已載入的模型名稱。
+
+        Returns:
+            JobGroup or None: 要處理的工作組；沒有剩餘工作時回傳 None。
+        """
+        with self._lock:
+            while True:
+                # 模型親和性：優先處理已載入在此主機上的模型
+                for group in self._pending:
+                    if group.model_name in loaded_models:
+                        return self._start(group)
+                if self._pending:
+                    return self._start(self._pending[0])
+                # 目前視窗的工作組都已開始：加入仍有剩餘工作 (包含重試) 的工作組，同樣優先選擇已載入的模型
+                remaining = [group for group in self.groups if group.has_window_work()]
+                for group in remaining:
+                    if group.model_name in loaded_models:
+                        return group
+                if remaining:
+                    return remaining[0]
+                if not self._advance():
+                    return None
@@ -0,0 +1,1085 @@
+# pipeline.py
+# 此檔案包含比較流程中各階段的排程邏輯。
+# - 評審階段：將同一份 Ollama 輸出同時派送給所有評審客戶端並行評估；
+#   評審呼叫是共用事件迴圈 (見 http_session) 上的協程，進行中的請求不各自佔用執行緒。
+# - 生成→評審管線：Ollama 生成結果放入有上限的佇列，由評審工作執行緒消費，
+#   使本地推論與雲端評審完全重疊；多台 Ollama 主機時每台主機各有一個生成執行緒。
+# - 批次評審：同一筆記錄在所有模型都產生輸出後，一次交給每個評審 (evaluate_many)，
+#   支援打包評審的提供者只需一個請求即可評審所有模型的輸出；
+#   生成改為以記錄視窗分段分派，同一筆記錄在各模型的輸出會在同一個視窗內湊齊。
+
+import asyncio  # 用於提供者並行上限的號誌
+import logging  # 用於記錄程式運行訊息
+import queue  # 用於生成與評審階段之間的有界佇列
+import threading  # 用於建立號誌、鎖與工作執行緒
+import time  # 用於量測各階段耗時
+from collections import deque  # 用於保存依序釋出的工作段
+from concurrent.futures import as_completed, wait  # 用於收集評審協程的結果
+
+from cache_store import text_hash  # 用於辨識同一份原文的批次評審
+from http_session import get_session  # 執行評審協程的共用事件迴圈
+from ollama_pool import (  # 多主機分派
+    HOST_ERRORS,
+    JobDispatcher,
+    JobGroup,
+    OllamaHostPool,
+    is_host_error,
+)
+from results import ModelResult, Review  # 模型處理結果與評審結果的記錄類型
+from tracing import span  # 各階段的追蹤 span
+
+# 每個評審提供者預設允許的同時進行中請求數量
+DEFAULT_PROVIDER_CONCURRENCY = 4
+# 生成階段最多可領先評審階段的輸出數量 (佇列容量)，超過時生成會暫停等待
+DEFAULT_QUEUE_SIZE = 2
+# 同時消費生成結果的評審工作執行緒數量
+DEFAULT_REVIEW_WORKERS = 2
+# 主機連線失敗後重新檢查健康狀態的次數
+DEFAULT_HOST_RETRIES = 2
+# 單一工作因主機失效而重新排入的次數上限，達到上限時以錯誤結果完成
+DEFAULT_JOB_ATTEMPTS = 3
+# 批次評審時每個記錄視窗的記錄數量：每個模型處理完視窗內的記錄後才換下一個模型
+DEFAULT_BATCH_WINDOW = 64
+# 已完成但尚未依序釋出的結果數量上限，達到上限時生成執行緒暫停 (背壓)
+DEFAULT_MAX_BUFFERED_RESULTS = 256
+# 通知評審工作執行緒結束的哨兵物件
+_STOP = object()
+
+
+class ReviewStage:
+    """
+    評審階段類別。
+    將同一份輸出的所有評審呼叫以協程 (aevaluate) 提交到共用事件迴圈並行執行，
+    並以號誌限制每個評審提供者 (例如 "gpt"、"gemini") 同時進行中的請求數量。
+    同時進行中的評審數量只受提供者上限約束，不需要對應數量的執行緒。
+    """
+
+    def __init__(
+        self,
+        reviewers,
+        default_limit: int = DEFAULT_PROVIDER_CONCURRENCY,
+        provider_limits=None,
+        session=None,
+    ):
+        """
+        初始化評審階段。
+
+        Args:
+            reviewers (list): 活躍的評審客戶端列表 (BaseReviewerClient 子類別實例)。
+            default_limit (int, optional): 未在 provider_limits 中指定的提供者所使用的並行上限。
+            provider_limits (dict, optional): 提供者名稱對應並行上限的字典，
+                                              例如 {"gpt": 2, "gemini": 4}。
+            session (AsyncHTTPSession, optional): 執行評審協程的工作階段，預設為行程內共用的工作階段。
+        """
+        self.reviewers = list(reviewers)  # 參與評估的評審客戶端
+        self._session = session if session is not None else get_session()
+        provider_limits = provider_limits or {}
+        # provider_concurrency: 提供者名稱對應實際採用的並行上限
+        self.provider_concurrency = {}
+        for reviewer in self.reviewers:
+            provider = reviewer.provider
+            if provider not in self.provider_concurrency:
+                self.provider_concurrency[provider] = max(
+                    1, int(provider_limits.get(provider, default_limit))
+                )
+        # _semaphores: 提供者名稱對應其號誌，同一提供者的多個評審共用同一個上限；
+        # asyncio 號誌只在事件迴圈中使用，因此在第一次評審時才建立
+        self._semaphores = {}
+        self._pending = set()  # 尚未完成的評審 Future，close 時等待它們完成
+        self._pending_lock = threading.Lock()
+
+    def _semaphore(self, provider: str):
+        # 只在共用事件迴圈的執行緒中呼叫，不需要加鎖
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = self._semaphores[provider] = asyncio.Semaphore(
+                self.provider_concurrency[provider]
+            )
+        return semaphore
+
+    def _submit(self, coroutine):
+        """
+        將評審協程提交到共用事件迴圈，並記錄為進行中。
+
+        Returns:
+            concurrent.futures.Future: 協程的結果。
+        """
+        future = self._session.submit(coroutine)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    async def _evaluate_one(self, reviewer, original_text, ollama_output, task_type):
+        """
+        在提供者的並行上限內執行單一評審呼叫。
+
+        Args:
+            reviewer (BaseReviewerClient): 要呼叫的評審客戶端。
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            tuple: (評審客戶端回傳的評估資料, 評審呼叫耗時秒數)。
+                   耗時只計算取得號誌之後的呼叫時間，不含等待並行名額的時間。
+        """
+        async with self._semaphore(reviewer.provider):
+            with span(
+                "evaluate",
+                reviewer=reviewer.model_name,
+                provider=reviewer.provider,
+                task=task_type,
+                output_bytes=len(ollama_output.encode("utf-8")),
+            ):
+                start = time.perf_counter()
+                review_data = await reviewer.aevaluate(original_text, ollama_output, task_type)
+                return review_data, time.perf_counter() - start
+
+    def review(
+        self, original_text, ollama_output, task_type, skip=None, on_review=None
+    ) -> list:
+        """
+        並行地讓所有評審客戶端評估同一份輸出。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+            skip (set, optional): 不需要再評審的評審模型名稱 (例如續跑時已完成的評審)。
+            on_review (callable, optional): 每則評審一完成就以評審結果呼叫的回呼函數。
+
+        Returns:
+            list: Review 列表，順序與評審客戶端列表一致；
+                  發生例外的評審只記錄錯誤，不會加入列表。
+        """
+        skip = skip or set()
+        # 先一次派送所有評審呼叫，再依完成順序收集結果
+        futures = {}
+        for position, reviewer in enumerate(self.reviewers):
+            if reviewer.model_name in skip:
+                continue
+            logging.info(f"Evaluating with reviewer {reviewer.model_name}...")
+            future = self._submit(
+                self._evaluate_one(reviewer, original_text, ollama_output, task_type)
+            )
+            futures[future] = (position, reviewer)
+
+        completed = {}  # 評審客戶端順序對應成功的評審結果
+        for future in as_completed(futures):
+            position, reviewer = futures[future]
+            try:
+                review_data, latency = future.result()
+            except Exception as e:
+                # 單一評審的錯誤不影響其他評審
+                logging.error(f"Reviewer {reviewer.model_name} error: {e}")
+                continue
+            completed[position] = Review(reviewer.model_name, review_data, latency_s=latency)
+            if on_review is not None:
+                on_review(completed[position])
+        return [completed[position] for position in sorted(completed)]
+
+    async def _evaluate_batch(self, reviewer, original_text, ollama_outputs, task_type):
+        """
+        在提供者的並行上限內執行一次批次評審呼叫。
+
+        Args:
+            reviewer (BaseReviewerClient): 要呼叫的評審客戶端。
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): 同一份原文的 Ollama 輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            tuple: (評估資料列表, 批次評審呼叫耗時秒數)。
+        """
+        async with self._semaphore(reviewer.provider):
+            with span(
+                "evaluate_batch",
+                reviewer=reviewer.model_name,
+                provider=reviewer.provider,
+                task=task_type,
+                batch_size=len(ollama_outputs),
+                output_bytes=sum(len(output.encode("utf-8")) for output in ollama_outputs),
+            ):
+                start = time.perf_counter()
+                review_data = await reviewer.aevaluate_many(original_text, ollama_outputs, task_type)
+                return review_data, time.perf_counter() - start
+
+    def review_many(
+        self, original_text, ollama_outputs, task_type, skips=None, on_review=None
+    ) -> list:
+        """
+        並行地讓所有評審客戶端評估同一份原文的多個輸出，每個評審各呼叫一次 evaluate_many。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): 同一份原文的 Ollama 輸出文字列表 (例如各模型的輸出)。
+            task_type (str): 執行的任務類型。
+            skips (list, optional): 與 ollama_outputs 對應的集合列表，
+                                    包含該輸出不需要再評審的評審模型名稱。
+            on_review (callable, optional): 每則評審完成時以 (輸出位置, 評審結果) 呼叫的回呼函數。
+
+        Returns:
+            list: 與 ollama_outputs 對應的評審結果列表，每個元素的格式與 review 的回傳值相同；
+                  Review 的 latency_s 為批次耗時平均分攤到每個輸出的秒數，
+                  batch_size 為同一次呼叫評審的輸出數量。
+        """
+        skips = skips or [set() for _ in ollama_outputs]
+        futures = {}
+        for position, reviewer in enumerate(self.reviewers):
+            indices = [
+                i for i, skip in enumerate(skips) if reviewer.model_name not in skip
+            ]
+            if not indices:
+                continue
+            logging.info(
+                f"Evaluating {len(indices)} outputs with reviewer {reviewer.model_name}..."
+            )
+            future = self._submit(
+                self._evaluate_batch(
+                    reviewer, original_text, [ollama_outputs[i] for i in indices], task_type
+                )
+            )
+            futures[future] = (position, reviewer, indices)
+
+        # completed: 每個輸出各有一個字典，評審客戶端順序對應成功的評審結果
+        completed = [{} for _ in ollama_outputs]
+        for future in as_completed(futures):
+            position, reviewer, indices = futures[future]
+            try:
+                evaluations, latency = future.result()
+            except Exception as e:
+                logging.error(f"Reviewer {reviewer.model_name} batch error: {e}")
+                continue
+            for i, review_data in zip(indices, evaluations):
+                completed[i][position] = Review(
+                    reviewer.model_name,
+                    review_data,
+                    latency_s=latency / len(indices),  # 分攤到此輸出的評審耗時 (秒)
+                    batch_size=len(indices),  # 同一次呼叫評審的輸出數量
+                )
+                if on_review is not None:
+                    on_review(i, completed[i][position])
+        return [
+            [reviews[position] for position in sorted(reviews)] for reviews in completed
+        ]
+
+    def close(self):
+        """
+        等待所有進行中的評審完成。共用事件迴圈與連線由工作階段的擁有者關閉。
+        """
+        with self._pending_lock:
+            pending = list(self._pending)
+        wait(pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def _format_seconds(value) -> str:
+    """
+    將秒數格式化為日誌用字串。
+
+    Args:
+        value (float or None): 秒數。
+
+    Returns:
+        str: 例如 "0.512s"；無資料時回傳 "N/A"。
+    """
+    return f"{value:.3f}s" if isinstance(value, (int, float)) else "N/A"
+
+
+def _format_rate(value) -> str:
+    """
+    將生成速度格式化為日誌用字串。
+
+    Args:
+        value (float or None): 每秒 token 數量。
+
+    Returns:
+        str: 例如 "42.1"；無資料時回傳 "N/A"。
+    """
+    return f"{value:.1f}" if isinstance(value, (int, float)) else "N/A"
+
+
+class _OrderedCollector:
+    """
+    依工作段順序組裝結果：工作段 (一個工作組在一個視窗中的工作) 依分派器開始它們的順序釋出，
+    同一工作段內依工作索引釋出。
+    評審工作執行緒與多台主機可能以任意順序完成，此類別會暫存提早完成的結果，
+    只有在前面的結果都完成後才依序釋出；工作組的總數在其工作序列取完時才會得知。
+    設定暫存上限時，生成執行緒在開始新工作前以 wait_for_room 等待暫存的結果低於上限 (背壓)。
+    """
+
+    def __init__(self, on_result=None, keep_results=True, max_pending=None):
+        """
+        初始化結果組裝器。
+
+        Args:
+            on_result (callable, optional): 每當一筆結果依序可用時呼叫的回呼函數。
+            keep_results (bool, optional): 是否保留已釋出的結果；
+                                           結果已由 on_result 串流處理時可設為 False 以節省記憶體。
+            max_pending (int, optional): 暫存 (已完成但尚未釋出) 結果的數量上限；None 表示不限制。
+        """
+        self.results = []  # 已依序釋出的結果 (keep_results 為 False 時保持為空)
+        self.peak_pending = 0  # 暫存結果數量的最大值
+        self._keep_results = keep_results
+        self._max_pending = max_pending
+        self._pending = {}  # (組索引, 工作索引) 對應提早完成的結果
+        self._group_sizes = {}  # 已取完的工作組對應其工作總數
+        self._segments = deque()  # 尚未開始釋出的工作段 (組索引, 起始工作索引, 結束工作索引或 None)
+        self._current = None  # 正在釋出的工作段 [組索引, 下一個工作索引, 結束工作索引或 None]
+        self._released = {}  # 組索引對應已釋出的工作數量 (工作依索引順序釋出)
+        self._producers = 0  # 執行中的生成執行緒數量
+        self._waiting = 0  # 在 wait_for_room 中等待的生成執行緒數量
+        self._on_result = on_result
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+
+    def add_segment(self, group_index: int, start: int, end=None):
+        """
+        記錄分派器開始的工作段，工作段依加入的順序釋出。
+
+        Args:
+            group_index (int): 工作組索引。
+            start (int): 工作段的起始工作索引。
+            end (int, optional): 工作段的結束工作索引 (不含)；None 表示直到工作組結束。
+        """
+        with self._room:
+            self._segments.append((group_index, start, end))
+            self._release_locked()
+
+    def add(self, group_index: int, index: int, result: dict):
+        """
+        加入一筆完成的結果，並釋出所有已連續完成的結果。
+        已釋出的結果再次加入時 (例如評審工作執行緒發生錯誤後補交) 直接忽略。
+
+        Args:
+            group_index (int): 結果所屬的工作組索引。
+            index (int): 結果在工作組內的工作索引。
+            result (ModelResult): 完成的模型處理結果。
+        """
+        with self._room:
+            if index < self._released.get(group_index, 0):
+                return
+            self._pending[(group_index, index)] = result
+            self.peak_pending = max(self.peak_pending, len(self._pending))
+            self._release_locked()
+
+    def finish_group(self, group_index: int, size: int):
+        """
+        記錄工作組的工作總數，讓組裝器可以接著釋出下一個工作段的結果。
+
+        Args:
+            group_index (int): 工作組索引。
+            size (int): 工作組的工作總數。
+        """
+        with self._room:
+            self._group_sizes[group_index] = size
+            self._release_locked()
+
+    def start_producer(self):
+        """
+        登記一個開始執行的生成執行緒。
+        """
+        with self._room:
+            self._producers += 1
+
+    def stop_producer(self):
+        """
+        登記一個結束的生成執行緒，並喚醒等待中的執行緒重新判斷是否仍需等待。
+        """
+        with self._room:
+            self._producers -= 1
+            self._room.notify_all()
+
+    def _in_current(self, group_index: int, index: int) -> bool:
+        # 工作是否屬於正在釋出的工作段 (這些結果釋出後才能繼續，因此永遠不需要等待)
+        if self._current is None:
+            return True
+        current_group, _, end = self._current
+        return current_group == group_index and (end is None or index < end)
+
+    def wait_for_room(self, group_index: int, index: int):
+        """
+        生成執行緒開始工作前呼叫：暫存的結果已達上限時等待，直到有結果釋出。
+        屬於正在釋出的工作段的工作不等待；其他生成執行緒都已在等待時也不等待，
+        避免正在釋出的工作段沒有任何執行緒處理而造成死結 (此時暫存數量可能暫時超過上限)。
+
+        Args:
+            group_index (int): 即將執行的工作所屬的工作組索引。
+            index (int): 即將執行的工作索引。
+        """
+        if self._max_pending is None:
+            return
+        with self._room:
+            self._waiting += 1
+            # 等待中的數量改變時，其他等待中的執行緒需要重新判斷
+            self._room.notify_all()
+            try:
+                while (
+                    len(self._pending) >= self._max_pending
+                    and not self._in_current(group_index, index)
+                    and self._waiting < self._producers
+                ):
+                    self._room.wait()
+            finally:
+                self._waiting -= 1
+
+    def _release_locked(self):
+        """
+        在持有鎖的情況下釋出所有已連續完成的結果。
+        """
+        while True:
+            if self._current is None:
+                if not self._segments:
+                    break
+                group_index, start, end = self._segments.popleft()
+                self._current = [group_index, start, end]
+            group_index, index, end = self._current
+            size = self._group_sizes.get(group_index)
+            if (group_index, index) in self._pending:
+                ready = self._pending.pop((group_index, index))
+                if self._keep_results:
+                    self.results.append(ready)
+                self._current[1] = index + 1
+                self._released[group_index] = index + 1
+                if self._on_result is not None:
+                    try:
+                        self._on_result(ready)
+                    except Exception as e:
+                        # 回呼函數 (例如寫入報告) 的錯誤不能中斷結果釋出，否則後續結果會永遠卡住
+                        logging.error(f"Result handler error for {ready.ollama_model}: {e}")
+            elif (end is not None and index >= end) or (size is not None and index >= size):
+                # 工作段已結束，接著釋出下一個工作段
+                self._current = None
+            else:
+                break
+        # 釋出結果或切換工作段後，等待中的生成執行緒重新判斷是否可以繼續
+        self._room.notify_all()
+
+
+def run_pipeline(
+    job_groups,
+    ollama_clients,
+    review_stage,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    review_workers: int = DEFAULT_REVIEW_WORKERS,
+    on_result=None,
+    manage_residency: bool = True,
+    host_retries: int = DEFAULT_HOST_RETRIES,
+    job_attempts: int = DEFAULT_JOB_ATTEMPTS,
+    journal=None,
+    keep_results: bool = True,
+    batch_reviews: bool = False,
+    batch_window: int = DEFAULT_BATCH_WINDOW,
+    max_buffered_results: int = DEFAULT_MAX_BUFFERED_RESULTS,
+    local_gate=None,
+) -> list:
+    """
+    以生成者/消費者管線執行所有工作：每台 Ollama 主機各有一個生成執行緒，
+    評審工作執行緒同時評審先前的輸出。
+
+    Args:
+        job_groups (iterable): 依模型分組的工作，每個元素為 (模型名稱, 工作序列)。
+                               工作序列的每個元素為包含 'ollama_model', 'task'、
+                               'input_text' 以及可選 'record_id' 鍵的字典，會被逐一取用，
+                               因此可以是產生器。
+        ollama_clients (OllamaClient or list): 用於產生輸出的 Ollama 客戶端；
+                                               多台主機時為每台主機一個客戶端的列表。
+        review_stage (ReviewStage): 用於並行評審的評審階段。
+        queue_size (int, optional): 生成階段可領先評審階段的輸出數量，
+                                    佇列已滿時生成會等待 (背壓)。
+        review_workers (int, optional): 評審工作執行緒數量。
+        on_result (callable, optional): 每筆結果依工作順序完成時呼叫的回呼函數。
+        manage_residency (bool, optional): 為 True 時，生成執行緒在切換模型前卸載上一個模型，
+                                           並在第一次實際生成前暖機載入新模型；
+                                           暖機耗時記錄為 'model_load_s'，不計入推論時間。
+        host_retries (int, optional): 主機連線失敗後重新檢查健康狀態的次數，
+                                      仍失敗時該主機退出，未完成的工作交由其他主機執行。
+        job_attempts (int, optional): 單一工作遇到主機錯誤的次數上限，達到上限時不再重新排入，
+                                      改以錯誤結果完成，避免同一個工作無限重試。
+        journal (RunJournal, optional): 檢查點日誌。每個成功的生成結果、評審與完成的結果
+                                        都會寫入；日誌中已完成的工作直接沿用，
+                                        已生成但評審未完成的工作只補跑缺少的評審。
+        keep_results (bool, optional): 為 False 時不保留結果列表 (回傳空列表)，
+                                       結果只透過 on_result 依序交出，記憶體用量與工作數量無關。
+        batch_reviews (bool, optional): 為 True 時，同一筆記錄 (相同記錄識別碼、輸入與任務)
+                                        等到所有模型都產生輸出後才一起評審，
+                                        每個評審以一次 evaluate_many 評估所有模型的輸出。
+                                        等待期間的輸出會暫存在記憶體中，
+                                        且結果要等到最後一個模型完成該記錄後才會交出。
+        batch_window (int, optional): 批次評審時的記錄視窗大小。每個模型先生成視窗內的記錄，
+                                      所有模型都完成後才進入下一個視窗，因此等待湊齊的記錄
+                                      約不超過一到兩個視窗；視窗越小，模型切換 (重新載入) 越頻繁。
+        max_buffered_results (int, optional): 已完成但尚未依序釋出的結果數量上限。
+                                              結果依工作段順序釋出，其他工作段 (例如多台主機上
+                                              的其他模型) 的結果會暫存，達到上限時這些工作段的生成會暫停；
+                                              批次評審時上限至少為兩個視窗的輸出數量。None 表示不限制。
+        local_gate (LocalGate, optional): 本地檢查閘門。生成結果在評審前先經過本地檢查，
+                                          結果存入 local_metrics；未通過硬性檢查的輸出
+                                          不呼叫任何評審，改為每個評審記錄一則最低評分的本地評審，
+                                          分層模式下只有警告的輸出只交給第一個評審。
+
+    Returns:
+        list: 依工作順序 (模型順序，再依記錄順序；批次評審時依視窗分段) 排列的 ModelResult 列表；
+              keep_results 為 False 時為空列表。
+    """
+    if not isinstance(ollama_clients, (list, tuple)):
+        ollama_clients = [ollama_clients]
+    review_workers = max(1, review_workers)
+    # work_queue: 生成階段與評審階段之間的有界佇列
+    work_queue = queue.Queue(maxsize=max(1, queue_size))
+    job_groups = list(job_groups)
+    window = max(1, batch_window) if batch_reviews else None
+    if max_buffered_results is not None and window is not None:
+        # 批次評審時一個視窗的結果要等到最後一個模型完成才會釋出，上限太小會讓生成不必要地暫停
+        max_buffered_results = max(max_buffered_results, 2 * window * len(job_groups))
+    collector = _OrderedCollector(
+        on_result, keep_results=keep_results, max_pending=max_buffered_results
+    )
+    dispatcher = JobDispatcher(
+        (
+            JobGroup(group_index, model_name, jobs, on_exhausted=collector.finish_group)
+            for group_index, (model_name, jobs) in enumerate(job_groups)
+        ),
+        window=window,
+        on_segment=collector.add_segment,
+    )
+    # stage_seconds: 各階段累計的忙碌時間 (多台主機時為所有主機的總和)，用於判斷重疊程度
+    stage_seconds = {"generate": 0.0, "review": 0.0}
+    # reviewer_order: 評審模型名稱對應其在評審客戶端列表中的順序
+    reviewer_order = {
+        reviewer.model_name: position
+        for position, reviewer in enumerate(review_stage.reviewers)
+    }
+    # host_jobs: 主機位址對應其完成的生成工作數量
+    host_jobs = {}
+    stage_lock = threading.Lock()
+    # pending_batches: 批次評審時，(記錄識別碼, 輸入雜湊, 任務) 對應尚未湊齊所有模型的佇列項目
+    pending_batches = {}
+    batch_lock = threading.Lock()
+
+    def journal_write(method, *args):
+        """
+        寫入檢查點日誌；寫入失敗 (例如磁碟已滿) 只記錄錯誤，不中斷生成或評審。
+
+        Args:
+            method (callable): RunJournal 的寫入方法。
+            *args: 傳給寫入方法的參數。
+        """
+        try:
+            method(*args)
+        except Exception as e:
+            logging.error(f"Failed to write journal {journal.path}: {e}")
+
+    def ensure_resident(client, failed_loads, job):
+        """
+        在實際生成前確保模型已在此主機上常駐，並回傳本次暖機耗時。
+
+        Args:
+            client: 執行此工作的主機客戶端。
+            failed_loads (set): 此主機上載入失敗的模型，之後不再重試暖機。
+            job (dict): 即將執行的工作。
+
+        Returns:
+            float or None: 暖機耗時 (秒)；不需要載入或載入失敗時回傳 None。
+
+        Raises:
+            HOST_ERRORS: 主機無法連線時，交由呼叫端進行容錯移轉。
+        """
+        model_name = job["ollama_model"]
+        if not manage_residency or model_name in failed_loads:
+            return None
+        has_cached = getattr(client, "has_cached", None)
+        if has_cached is not None and has_cached(model_name, job["input_text"], job["task"]):
+            # 快取命中不需要推論，延後到第一次真正生成時才載入模型
+            return None
+        start = time.perf_counter()
+        try:
+            with span("load", model=model_name, host=client.host) as trace:
+                load_time = client.activate_model(model_name)
+                # 模型已常駐時不會實際載入
+                trace.set("loaded", load_time is not None)
+        except Exception as e:
+            if is_host_error(e):
+                raise
+            failed_loads.add(model_name)
+            logging.error(f"Failed to load Ollama model {model_name} on {client.host}: {e}")
+            return None
+        if load_time is not None:
+            with stage_lock:
+                stage_seconds["load"] = stage_seconds.get("load", 0.0) + (
+                    time.perf_counter() - start
+                )
+            logging.info(f"[stage:load] {model_name} on {client.host} took {load_time:.3f}s")
+        return load_time
+
+    def resume_job(group, item) -> bool:
+        """
+        若檢查點日誌中已有此工作的進度，直接沿用並放入佇列。
+
+        Args:
+            group (JobGroup): 工作所屬的工作組。
+            item (tuple): (組內工作索引, 工作字典)。
+
+        Returns:
+            bool: 已沿用日誌中的進度時為 True；需要重新生成時為 False。
+        """
+        if journal is None:
+            return False
+        index, job = item
+        model_result, finished = journal.resume_state(job)
+        if model_result is None:
+            return False
+        logging.info(
+            f"[stage:resume] {job['ollama_model']} record {job.get('record_id')} "
+            f"{'finished' if finished else 'generated'} in journal"
+        )
+        # 已完成的結果直接交給結果組裝器；只完成生成的結果交給評審工作執行緒補跑評審
+        work_queue.put((group.index, index, job, model_result, not finished))
+        return True
+
+    def run_job(client, failed_loads, group, item):
+        """
+        在指定主機上執行單一生成工作，並將結果放入佇列。
+
+        Args:
+            client: 執行此工作的主機客戶端。
+            failed_loads (set): 此主機上載入失敗的模型。
+            group (JobGroup): 工作所屬的工作組。
+            item (tuple): (組內工作索引, 工作字典)。
+
+        Raises:
+            HOST_ERRORS: 主機無法連線時，工作不會放入佇列，由呼叫端重新排入。
+                         逾時不屬於主機錯誤，會記錄為此工作的錯誤結果。
+        """
+        if resume_job(group, item):
+            return
+        index, job = item
+        model_name = job["ollama_model"]
+        logging.info(f"--- Processing Ollama model: {model_name} ---")
+        model_result = ModelResult.new(
+            model_name, job["task"], job["input_text"], job.get("record_id")
+        )
+        generated = False  # 標記是否成功產生輸出
+        # 暖機載入在計時開始前完成，載入時間不會混入生成指標
+        load_time = ensure_resident(client, failed_loads, job)
+        with span(
+            "generate",
+            model=model_name,
+            task=job["task"],
+            record_id=job.get("record_id"),
+            host=client.host,
+            input_bytes=len(job["input_text"].encode("utf-8")),
+        ) as trace:
+            start = time.perf_counter()
+            try:
+                # 使用 Ollama 客戶端產生輸出，並保留首個 token 時間、生成速度等指標
+                output, metrics = client.generate_with_metrics(
+                    model_name, job["input_text"], job["task"]
+                )
+                model_result.ollama_output = output
+                model_result.generation_metrics = metrics
+                if load_time is not None:
+                    metrics["model_load_s"] = load_time
+                generated = True
+                trace.set("output_bytes", len(output.encode("utf-8")))
+                trace.set("eval_count", metrics.get("eval_count"))
+                if journal is not None:
+                    journal_write(journal.record_generation, job, model_result)
+                logging.info(
+                    f"Ollama model ({model_name}) output generated "
+                    f"(ttft {_format_seconds(metrics.get('ttft_s'))}, "
+                    f"{_format_rate(metrics.get('tokens_per_sec'))} tokens/s)."
+                )
+            except Exception as e:
+                if is_host_error(e):
+                    raise
+                # 如果 Ollama 模型處理過程中發生錯誤 (包含逾時)，記錄錯誤訊息
+                model_result.ollama_output = {"error": str(e)}
+                trace.set("error", str(e))
+                logging.error(f"Ollama model {model_name} error: {e}")
+        elapsed = time.perf_counter() - start
+        with stage_lock:
+            stage_seconds["generate"] += elapsed
+            host_jobs[client.host] = host_jobs.get(client.host, 0) + 1
+        logging.info(
+            f"[stage:generate] {model_name} on {client.host} took {elapsed:.3f}s "
+            f"(queue depth {work_queue.qsize()})"
+        )
+        # 佇列已滿時在此等待，避免生成結果無限堆積
+        work_queue.put((group.index, index, job, model_result, generated))
+
+    def fail_job(group, item, message):
+        """
+        以錯誤結果完成無法執行的工作 (日誌中已有進度的除外)。
+
+        Args:
+            group (JobGroup): 工作所屬的工作組。
+            item (tuple): (組內工作索引, 工作字典)。
+            message (str): 記錄在結果中的錯誤訊息。
+        """
+        if resume_job(group, item):
+            return
+        index, job = item
+        model_result = ModelResult.new(
+            job["ollama_model"], job["task"], job["input_text"], job.get("record_id")
+        )
+        model_result.ollama_output = {"error": message}
+        logging.error(f"Ollama model {job['ollama_model']} error: {message}")
+        work_queue.put((group.index, index, job, model_result, False))
+
+    def recover(client, error) -> bool:
+        """
+        主機連線失敗後以遞增間隔重新檢查健康狀態。
+
+        Args:
+            client: 發生錯誤的主機客戶端。
+            error (Exception): 連線錯誤。
+
+        Returns:
+            bool: 主機恢復時為 True；仍無法使用時為 False。
+        """
+        logging.warning(f"Ollama host {client.host} failed: {error}")
+        for attempt in range(host_retries):
+            time.sleep(2 ** attempt)
+            if client.health_check():
+                logging.info(f"Ollama host {client.host} recovered")
+                # 主機可能已重新啟動，之前常駐的模型不再可靠
+                client.release_models()
+                return True
+        logging.error(
+            f"Ollama host {client.host} is unavailable, handing its work to other hosts"
+        )
+        return False
+
+    def host_worker(client):
+        """
+        主機生成執行緒：向分派器索取工作組並依序生成，直到沒有剩餘工作或主機失效。
+
+        Args:
+            client: 此執行緒負責的主機客戶端。
+
+        Returns:
+            bool: 主機正常完成時為 True；主機失效退出時為 False。
+        """
+        failed_loads = set()  # 此主機上載入失敗的模型
+        loaded = OllamaHostPool.loaded_models(client)
+        collector.start_producer()
+        try:
+            while True:
+                group = dispatcher.acquire(loaded)
+                if group is None:
+                    return True
+                while True:
+                    item = group.next_job()
+                    if item is None:
+                        break
+                    # 暫存的結果已達上限時先等待前面的結果釋出
+                    collector.wait_for_room(group.index, item[0])
+                    try:
+                        run_job(client, failed_loads, group, item)
+                    except HOST_ERRORS as e:
+                        # 未完成的工作保留原本的索引，交由此主機恢復後或其他主機重試；
+                        # 已達嘗試上限的工作不再重試，直接以錯誤結果完成
+                        if not group.requeue(item, max_attempts=job_attempts):
+                            fail_job(
+                                group, item, f"Ollama host failed {job_attempts} times: {e}"
+                            )
+                        if not recover(client, e):
+                            return False
+                loaded = {group.model_name}
+        finally:
+            collector.stop_producer()
+            if manage_residency:
+                # 所有工作完成後卸載此主機上最後一個常駐的模型
+                client.release_models()
+
+    def run_hosts(clients) -> list:
+        """
+        為每台主機啟動生成執行緒並等待全部結束。
+
+        Args:
+            clients (list): 要參與生成的主機客戶端。
+
+        Returns:
+            list: 正常完成 (未失效) 的主機客戶端。
+        """
+        if len(clients) == 1:
+            return clients if host_worker(clients[0]) else []
+        finished = []
+        finished_lock = threading.Lock()
+
+        def run(client):
+            if host_worker(client):
+                with finished_lock:
+                    finished.append(client)
+
+        workers = [
+            threading.Thread(target=run, args=(client,), name=f"ollama-generate-{i}")
+            for i, client in enumerate(clients)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return finished
+
+    def produce():
+        """
+        生成協調執行緒：為每台健康的主機啟動生成執行緒，
+        所有主機都退出後將剩餘工作標記為錯誤，最後通知評審工作執行緒結束。
+        """
+        try:
+            hosts = OllamaHostPool(ollama_clients).healthy_clients()
+            if len(hosts) > 1:
+                logging.info(f"Dispatching Ollama jobs across {len(hosts)} hosts")
+            # 健康的主機可能在另一台主機失效並重新排入工作之前就已結束，
+            # 因此只要仍有剩餘工作，就讓仍可用的主機再處理一輪
+            while hosts and any(group.has_work() for group in dispatcher.groups):
+                hosts = run_hosts(hosts)
+            # 沒有可用主機時，剩餘的工作直接以錯誤結果完成 (日誌中已有進度的除外)；
+            # 同樣經由分派器取得工作組，結果組裝器才會依序收到每個工作段
+            while True:
+                group = dispatcher.acquire(set())
+                if group is None:
+                    break
+                while True:
+                    item = group.next_job()
+                    if item is None:
+                        break
+                    fail_job(group, item, "No healthy Ollama host available")
+        finally:
+            # 無論生成是否中斷，都通知每個評審工作執行緒結束
+            for _ in range(review_workers):
+                work_queue.put(_STOP)
+
+    def finish(group_index, index, job, model_result, generated):
+        """
+        將完成評審的結果寫入檢查點日誌並交給結果組裝器。
+        """
+        if generated and journal is not None:
+            journal_write(journal.record_result, job, model_result)
+        collector.add(group_index, index, model_result)
+
+    def settle(items, error):
+        """
+        評審工作發生未預期的錯誤時，仍將結果 (含已完成的評審) 交給結果組裝器，
+        避免依序釋出的結果卡住、生成階段在已滿的佇列上永遠等待。
+
+        Args:
+            items (list): 處理失敗的佇列項目。
+            error (Exception): 發生的錯誤。
+        """
+        job = items[0][2]
+        logging.error(
+            f"Review worker error for {job['ollama_model']} record {job.get('record_id')}: {error}"
+        )
+        for group_index, index, _, model_result, _ in items:
+            collector.add(group_index, index, model_result)
+
+    def apply_local_gate(job, model_result) -> set:
+        """
+        對生成結果執行本地檢查，並回傳不需要呼叫的評審。
+        未通過硬性檢查時，尚未完成的評審各記錄一則本地評審結果 (並寫入檢查點日誌)。
+
+        Returns:
+            set: 依本地檢查結果略過的評審模型名稱。
+        """
+        if local_gate is None or not local_gate.enabled:
+            return set()
+        if not isinstance(model_result.ollama_output, str):
+            return set()
+        try:
+            metrics = local_gate.check(job, model_result)
+            rejected, skipped = local_gate.plan(metrics, review_stage.reviewers)
+        except Exception as e:
+            # 本地檢查失敗時視為未檢查，輸出照常交給所有評審
+            logging.error(f"Local gate error for {job['ollama_model']}: {e}")
+            return set()
+        if rejected:
+            done = model_result.reviewer_names()
+            for reviewer in review_stage.reviewers:
+                if reviewer.model_name in done:
+                    continue
+                review = local_gate.gated_review(reviewer.model_name, metrics)
+                model_result.reviews.append(review)
+                if journal is not None:
+                    journal_write(journal.record_review, job, review)
+            logging.info(
+                f"[local-gate] {job['ollama_model']} output rejected "
+                f"({', '.join(metrics['failed'])}), skipping cloud reviewers"
+            )
+        return skipped
+
+    def review_single(job, model_result):
+        """
+        讓所有評審並行評估單一生成結果，續跑時已成功完成的評審不再重新呼叫
+        (失敗的評審會重新執行)；本地檢查未通過或分層略過的評審也不會呼叫。
+        """
+        start = time.perf_counter()
+        model_result.drop_failed_reviews()
+        gate_skip = apply_local_gate(job, model_result)
+        done = model_result.reviewer_names() | gate_skip
+        with span(
+            "review", model=job["ollama_model"], task=job["task"], record_id=job.get("record_id")
+        ):
+            try:
+                # 所有活躍評審並行評估此輸出，個別評審的錯誤由評審階段隔離處理
+                model_result.reviews.extend(
+                    review_stage.review(
+                        job["input_text"],
+                        model_result.ollama_output,
+                        job["task"],
+                        skip=done,
+                        on_review=(
+                            (lambda review: journal_write(journal.record_review, job, review))
+                            if journal is not None
+                            else None
+                        ),
+                    )
+                )
+                # 沿用的評審與新的評審合併後依評審客戶端順序排列
+                model_result.reviews.sort(
+                    key=lambda review: reviewer_order.get(review.reviewer_model, 0)
+                )
+            except Exception as e:
+                logging.error(
+                    f"Review stage error for {job['ollama_model']}: {e}"
+                )
+        elapsed = time.perf_counter() - start
+        with stage_lock:
+            stage_seconds["review"] += elapsed
+        logging.info(
+            f"[stage:review] {job['ollama_model']} took {elapsed:.3f}s"
+        )
+
+    def review_batch(items):
+        """
+        讓所有評審一次評估同一筆記錄在各模型的生成結果，完成後依序交給結果組裝器。
+
+        Args:
+            items (list): 同一筆記錄的佇列項目 (組索引, 工作索引, 工作, 模型處理結果, 是否已生成)。
+        """
+        generated_items = [item for item in items if item[4]]
+        if generated_items:
+            job = generated_items[0][2]
+            start = time.perf_counter()
+            for item in generated_items:
+                # 續跑時失敗的評審會重新執行
+                item[3].drop_failed_reviews()
+            gate_skips = [apply_local_gate(item[2], item[3]) for item in generated_items]
+            with span(
+                "review_batch",
+                task=job["task"],
+                record_id=job.get("record_id"),
+                batch_size=len(generated_items),
+            ):
+                try:
+                    reviews = review_stage.review_many(
+                        job["input_text"],
+                        [item[3].ollama_output for item in generated_items],
+                        job["task"],
+                        skips=[
+                            item[3].reviewer_names() | gate_skip
+                            for item, gate_skip in zip(generated_items, gate_skips)
+                        ],
+                        on_review=(
+                            (lambda i, review: journal_write(
+                                journal.record_review, generated_items[i][2], review
+                            ))
+                            if journal is not None
+                            else None
+                        ),
+                    )
+                    for item, new_reviews in zip(generated_items, reviews):
+                        model_result = item[3]
+                        model_result.reviews.extend(new_reviews)
+                        model_result.reviews.sort(
+                            key=lambda review: reviewer_order.get(review.reviewer_model, 0)
+                        )
+                except Exception as e:
+                    logging.error(
+                        f"Review stage error for record {job.get('record_id')}: {e}"
+                    )
+            elapsed = time.perf_counter() - start
+            with stage_lock:
+                stage_seconds["review"] += elapsed
+            logging.info(
+                f"[stage:review] record {job.get('record_id')} "
+                f"({len(generated_items)} outputs) took {elapsed:.3f}s"
+            )
+        for item in items:
+            finish(*item)
+
+    def consume():
+        """
+        評審工作執行緒：從佇列取出生成結果，執行評審後交給結果組裝器。
+        批次評審時先暫存結果，湊齊同一筆記錄在所有模型的結果後再一起評審
+        (生成以記錄視窗分段分派，暫存的記錄數量受視窗大小限制)。
+        """
+        while True:
+            item = work_queue.get()
+            if item is _STOP:
+                return
+            group_index, index, job, model_result, generated = item
+            # 每個項目都有例外邊界：任何錯誤都不能讓評審工作執行緒結束，否則生成階段會在佇列上永遠等待
+            batch = [item]
+            try:
+                if batch_reviews:
+                    batch_key = (job.get("record_id"), text_hash(job["input_text"]), job["task"])
+                    with batch_lock:
+                        items = pending_batches.setdefault(batch_key, [])
+                        items.append(item)
+                        if len(items) < len(dispatcher.groups):
+                            continue
+                        del pending_batches[batch_key]
+                    batch = items
+                    review_batch(items)
+                    continue
+                if generated:
+                    review_single(job, model_result)
+                finish(group_index, index, job, model_result, generated)
+            except Exception as e:
+                settle(batch, e)
+
+    run_start = time.perf_counter()
+    producer = threading.Thread(target=produce, name="ollama-generate")
+    consumers = [
+        threading.Thread(target=consume, name=f"review-worker-{i}")
+        for i in range(review_workers)
+    ]
+    producer.start()
+    for consumer in consumers:
+        consumer.start()
+    producer.join()
+    for consumer in consumers:
+        consumer.join()
+    # 未湊齊所有模型的記錄 (例如記錄識別碼重複) 在所有生成結束後直接評審
+    for items in pending_batches.values():
+        try:
+            review_batch(items)
+        except Exception as e:
+            settle(items, e)
+    wall = time.perf_counter() - run_start
+
+    # 記錄各階段耗時；重疊時間越長，代表本地推論與雲端評審並行得越充分
+    overlap = max(0.0, stage_seconds["generate"] + stage_seconds["review"] - wall)
+    logging.info(
+        f"[stage:summary] wall {wall:.3f}s, load {stage_seconds.get('load', 0.0):.3f}s, "
+        f"generate {stage_seconds['generate']:.3f}s, "
+        f"review {stage_seconds['review']:.3f}s, overlap {overlap:.3f}s"
+    )
+    logging.info(f"[stage:summary] peak buffered results {collector.peak_pending}")
+    if len(ollama_clients) > 1:
+        logging.info(f"[stage:summary] generations per host: {host_jobs}")
+    return collector.results
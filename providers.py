@@ -0,0 +1,151 @@
+# providers.py
+# 此檔案包含評審提供者的註冊表與評審客戶端的建立。
+# 註冊表以字串記錄每個提供者的客戶端類別 ("模組:類別名稱") 與 API 金鑰的設定名稱，
+# 只有 REVIEWER_MODELS 中啟用的提供者才會匯入其客戶端模組；接上官方 SDK 的客戶端
+# 放在各自的模組中 (或在 __init__ 中匯入 SDK)，未啟用的評審就不會拖慢啟動。
+# 設定檔可以用 REVIEWER_PROVIDERS 新增提供者或覆寫內建的對應，例如:
+#   REVIEWER_PROVIDERS = {"claude": {"client": "my_reviewers:ClaudeReviewerClient", "api_key": "ANTHROPIC_API_KEY"}}
+
+import importlib  # 用於在需要時才匯入客戶端模組
+import logging  # 用於記錄程式運行訊息
+import time  # 用於量測建立評審客戶端的耗時
+from concurrent.futures import ThreadPoolExecutor  # 用於並行建立評審客戶端
+
+# 內建的評審提供者：鍵與 config 中 REVIEWER_MODELS 的鍵一致。
+# 'client' 為客戶端類別的 "模組:類別名稱"，'api_key' 為 config 中 API 金鑰的變數名稱
+BUILTIN_PROVIDERS = {
+    "gpt": {"client": "reviewer_client:OpenAIReviewerClient", "api_key": "OPENAI_API_KEY"},
+    "gemini": {"client": "reviewer_client:GeminiReviewerClient", "api_key": "GOOGLE_API_KEY"},
+    "deepseek": {"client": "reviewer_client:DeepSeekReviewerClient", "api_key": "DEEPSEEK_API_KEY"},
+}
+# 在 REVIEWER_API_BASE_URLS 中設定 API 位址的提供者改用的 OpenAI 相容 HTTP 客戶端
+COMPATIBLE_CLIENT = "reviewer_client:OpenAICompatibleReviewerClient"
+
+
+def load_object(path: str):
+    """
+    匯入 "模組:名稱" 格式路徑指向的物件；模組已匯入時直接使用 sys.modules 中的模組。
+
+    Args:
+        path (str): 例如 "reviewer_client:OpenAIReviewerClient"。
+
+    Returns:
+        object: 模組中的物件 (通常為客戶端類別)。
+
+    Raises:
+        ValueError: 路徑格式不正確時。
+        ImportError: 模組無法匯入或模組中沒有該名稱時。
+    """
+    module_name, _, attribute = path.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"invalid client path {path!r} (expected 'module:ClassName')")
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, attribute)
+    except AttributeError:
+        raise ImportError(f"module {module_name!r} has no attribute {attribute!r}") from None
+
+
+def provider_registry(config) -> dict:
+    """
+    合併內建的評審提供者與設定檔中的 REVIEWER_PROVIDERS。
+
+    Args:
+        config (module): 設定模組 (config.py)。
+
+    Returns:
+        dict: 提供者名稱對應 {'client', 'api_key'} 的註冊表。
+    """
+    registry = {name: dict(entry) for name, entry in BUILTIN_PROVIDERS.items()}
+    for name, entry in getattr(config, "REVIEWER_PROVIDERS", {}).items():
+        registry[name] = dict(registry.get(name, {}), **entry)
+    return registry
+
+
+def reviewer_specs(config) -> list:
+    """
+    依 REVIEWER_MODELS 列出要建立的評審客戶端，不匯入任何客戶端模組。
+
+    Args:
+        config (module): 設定模組 (config.py)。
+
+    Returns:
+        list: 依 REVIEWER_MODELS 順序排列的字典列表，每個字典包含 'provider'、'client'
+              (類別路徑)、'kwargs' (建構參數)；未註冊的提供者會記錄警告並略過。
+    """
+    registry = provider_registry(config)
+    base_urls = getattr(config, "REVIEWER_API_BASE_URLS", {})
+    specs = []
+    for provider, model_name in config.REVIEWER_MODELS.items():
+        if not model_name:
+            continue
+        entry = registry.get(provider, {})
+        if not entry.get("client") and not base_urls.get(provider):
+            logging.warning(
+                f"No reviewer client registered for provider {provider!r} "
+                "(add it to REVIEWER_PROVIDERS or REVIEWER_API_BASE_URLS), skipping it."
+            )
+            continue
+        api_key = getattr(config, entry["api_key"], None) if entry.get("api_key") else None
+        kwargs = {"api_key": api_key, "model_name": model_name}
+        if base_urls.get(provider):
+            # 設定 API 位址的提供者實際呼叫 OpenAI 相容的 Chat Completions API
+            specs.append(
+                {
+                    "provider": provider,
+                    "client": COMPATIBLE_CLIENT,
+                    "kwargs": dict(kwargs, base_url=base_urls[provider], provider=provider),
+                }
+            )
+        else:
+            specs.append({"provider": provider, "client": entry["client"], "kwargs": kwargs})
+    return specs
+
+
+def _build_one(spec: dict):
+    """
+    匯入單一評審客戶端的類別並建立實例。
+
+    Args:
+        spec (dict): reviewer_specs 回傳的項目。
+
+    Returns:
+        BaseReviewerClient: 評審客戶端；無法匯入或建立時為 None (已記錄錯誤)。
+    """
+    start = time.perf_counter()
+    try:
+        client = load_object(spec["client"])(**spec["kwargs"])
+    except Exception as e:
+        logging.error(f"Failed to create reviewer {spec['provider']!r} ({spec['client']}): {e}")
+        return None
+    logging.debug(
+        f"Reviewer {spec['provider']!r} ({spec['client']}) created in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return client
+
+
+def build_reviewers(config) -> list:
+    """
+    建立 REVIEWER_MODELS 中所有啟用的評審客戶端。
+    客戶端模組只在需要時才匯入，且各客戶端並行建立，讓 SDK 匯入與初始化 (例如讀取憑證)
+    的耗時互相重疊；回傳的順序仍與 REVIEWER_MODELS 相同。
+
+    Args:
+        config (module): 設定模組 (config.py)。
+
+    Returns:
+        list: 成功建立的評審客戶端列表 (包含未通過 API 金鑰檢查、initialized_successfully 為 False 的客戶端)。
+    """
+    start = time.perf_counter()
+    specs = reviewer_specs(config)
+    if len(specs) <= 1:
+        clients = [_build_one(spec) for spec in specs]
+    else:
+        with ThreadPoolExecutor(max_workers=len(specs), thread_name_prefix="reviewer-init") as executor:
+            clients = list(executor.map(_build_one, specs))
+    clients = [client for client in clients if client is not None]
+    logging.info(
+        f"Created {len(clients)} reviewer clients in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return clients
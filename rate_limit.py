@@ -0,0 +1,468 @@
+# rate_limit.py
+# 此檔案包含評審提供者的速率限制與重試邏輯。
+# - TokenBucket: 每分鐘請求數 (RPM) 與每分鐘 token 數 (TPM) 的權杖桶。
+# - AdaptiveConcurrency: 以 AIMD (加法增加、乘法減少) 調整同時進行中的請求數量。
+# - RetryBudget: 所有提供者共用的重試預算，避免大量失敗時重試放大流量。
+# - ProviderLimiter: 組合上述機制，並以帶抖動的指數退避 (遵守 Retry-After) 重試暫時性錯誤。
+# 每個機制都提供同步 (以執行緒等待) 與非同步 (以 asyncio 等待) 兩種介面，兩者共用同一份限制狀態。
+
+import asyncio  # 用於非同步呼叫端的等待
+import logging  # 用於記錄程式運行訊息
+import random  # 用於退避時間的抖動
+import threading  # 用於保護跨執行緒共用的限制狀態
+import time  # 用於計算補充權杖與退避等待
+from collections import deque  # 用於保存等待並行名額的非同步呼叫端
+
+
+class RetryableReviewerError(Exception):
+    """
+    可重試的評審錯誤 (例如連線中斷或 HTTP 5xx)。
+    """
+
+    def __init__(self, message, retry_after=None):
+        """
+        Args:
+            message (str): 錯誤訊息。
+            retry_after (float, optional): 伺服器建議的重試等待秒數 (Retry-After)。
+        """
+        super().__init__(message)
+        self.retry_after = retry_after  # 建議的重試等待秒數
+
+
+class RateLimitError(RetryableReviewerError):
+    """
+    評審提供者回報超過速率限制 (HTTP 429)。
+    除了重試之外，也會讓 AdaptiveConcurrency 降低並行上限。
+    """
+
+
+def _resolve_waiter(waiter):
+    # 在等待者的事件迴圈中執行：Future 尚未完成 (例如未被取消) 時才設定結果
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def is_cjk_char(char: str) -> bool:
+    """
+    判斷字元是否為中日韓文字 (估計 token 數量時每字約一個 token)。
+
+    Args:
+        char (str): 單一字元。
+
+    Returns:
+        bool: 字元位於中日韓文字的 Unicode 範圍時為 True。
+    """
+    return "\u2e80" <= char <= "\u9fff" or "\uf900" <= char <= "\ufaff"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估計文字的 token 數量。
+    中日韓文字大約每字一個 token，其餘文字大約每四個字元一個 token。
+
+    Args:
+        text (str): 要估計的文字。
+
+    Returns:
+        int: 估計的 token 數量。
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for char in text if is_cjk_char(char))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TokenBucket:
+    """
+    以每分鐘補充速率定義的權杖桶。
+    """
+
+    def __init__(self, per_minute: float, capacity=None):
+        """
+        Args:
+            per_minute (float): 每分鐘補充的權杖數量。
+            capacity (float, optional): 權杖桶容量 (允許的突發量)，預設為一分鐘的量。
+        """
+        self.rate = per_minute / 60.0  # 每秒補充的權杖數量
+        self.capacity = float(capacity if capacity is not None else per_minute)  # 權杖桶容量
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, amount: float) -> float:
+        """
+        嘗試取得權杖。
+
+        Args:
+            amount (float): 需要的權杖數量 (不超過容量)。
+
+        Returns:
+            float: 成功取得時為 0；否則為權杖補充足夠前需要等待的秒數。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        取得指定數量的權杖，不足時等待補充。
+
+        Args:
+            amount (float, optional): 需要的權杖數量；超過容量時以容量計算，避免永遠等待。
+
+        Returns:
+            float: 為了取得權杖而等待的秒數。
+        """
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            delay = self._take(amount)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def aacquire(self, amount: float = 1) -> float:
+        """
+        acquire 的非同步版本，等待時不佔用執行緒。
+
+        Args:
+            amount (float, optional): 需要的權杖數量。
+
+        Returns:
+            float: 為了取得權杖而等待的秒數。
+        """
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            delay = self._take(amount)
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 並行上限控制。
+    每次成功讓上限增加 1/上限 (約每輪成功增加 1)，收到速率限制時上限減半；
+    短時間內的多次速率限制只會減半一次。
+    """
+
+    def __init__(self, initial: int, maximum=None, minimum: int = 1, decrease_interval: float = 1.0):
+        """
+        Args:
+            initial (int): 初始並行上限。
+            maximum (int, optional): 並行上限的最大值，預設與初始值相同。
+            minimum (int, optional): 並行上限的最小值。
+            decrease_interval (float, optional): 兩次減半之間的最短間隔 (秒)。
+        """
+        self.minimum = max(1, minimum)  # 並行上限的最小值
+        self.maximum = max(self.minimum, maximum if maximum is not None else initial)  # 並行上限的最大值
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))  # 目前的並行上限
+        self.decrease_interval = decrease_interval  # 兩次減半之間的最短間隔
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+        # _async_waiters: 等待名額的非同步呼叫端 (事件迴圈, Future)，與執行緒共用同一個名額計數
+        self._async_waiters = deque()
+
+    def _wake_async_locked(self):
+        # 喚醒一個仍在等待的非同步呼叫端；它醒來後會重新檢查名額
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            if not waiter.done():
+                loop.call_soon_threadsafe(_resolve_waiter, waiter)
+                return
+
+    def acquire(self):
+        """
+        取得一個並行名額，已達上限時等待。
+        """
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    async def aacquire(self):
+        """
+        acquire 的非同步版本，等待時不佔用執行緒。
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # 取消前可能已被喚醒，把喚醒轉交給下一個等待者，避免名額閒置
+                with self._condition:
+                    if self._in_flight < int(self.limit):
+                        self._wake_async_locked()
+                raise
+
+    def release(self):
+        """
+        歸還一個並行名額。
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+            self._wake_async_locked()
+
+    def on_success(self):
+        """
+        成功時加法增加並行上限。
+        """
+        with self._condition:
+            previous = int(self.limit)
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            if int(self.limit) > previous:
+                self._condition.notify()
+                self._wake_async_locked()
+
+    def on_throttle(self) -> bool:
+        """
+        收到速率限制時乘法減少並行上限。
+
+        Returns:
+            bool: 本次是否實際降低了上限。
+        """
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_interval:
+                return False
+            self._last_decrease = now
+            self.limit = max(float(self.minimum), self.limit / 2.0)
+            return True
+
+
+class RetryBudget:
+    """
+    全域重試預算：重試次數不得超過 min_retries 加上已送出請求數量乘以 ratio。
+    提供者大量失敗時，重試不會讓流量成倍增加。
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        """
+        Args:
+            ratio (float, optional): 每個請求可附帶的重試比例。
+            min_retries (int, optional): 無論請求數量多少都允許的重試次數。
+        """
+        self.ratio = ratio  # 重試比例
+        self.min_retries = min_retries  # 最低重試次數
+        self.requests = 0  # 已送出的請求數量 (不含重試)
+        self.retries = 0  # 已使用的重試次數
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """
+        記錄一個新的請求。
+        """
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        """
+        嘗試使用一次重試。
+
+        Returns:
+            bool: 預算足夠時為 True (並扣除一次)；否則為 False。
+        """
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class ProviderLimiter:
+    """
+    單一評審提供者的速率限制器。
+    同一提供者的所有評審客戶端共用一個限制器；重試預算則由所有提供者共用。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm=None,
+        tpm=None,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        budget=None,
+    ):
+        """
+        Args:
+            name (str): 提供者名稱，用於日誌訊息。
+            rpm (float, optional): 每分鐘請求數上限，None 表示不限制。
+            tpm (float, optional): 每分鐘 token 數上限，None 表示不限制。
+            concurrency (int, optional): 並行上限的初始值與最大值。
+            max_retries (int, optional): 單一請求的最大重試次數。
+            base_delay (float, optional): 指數退避的基礎等待秒數。
+            max_delay (float, optional): 單次退避的最長等待秒數。
+            budget (RetryBudget, optional): 共用的重試預算，None 時只受 max_retries 限制。
+        """
+        self.name = name  # 提供者名稱
+        self.requests = TokenBucket(rpm) if rpm else None  # 每分鐘請求數權杖桶
+        self.tokens = TokenBucket(tpm) if tpm else None  # 每分鐘 token 數權杖桶
+        self.concurrency = AdaptiveConcurrency(concurrency)  # AIMD 並行上限
+        self.max_retries = max_retries  # 最大重試次數
+        self.base_delay = base_delay  # 退避基礎秒數
+        self.max_delay = max_delay  # 退避最長秒數
+        self.budget = budget  # 共用重試預算
+        # stats: 請求、速率限制、重試、放棄重試次數與等待權杖的累計秒數
+        self.stats = {"calls": 0, "throttled": 0, "retried": 0, "gave_up": 0, "wait_s": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def backoff_delay(self, attempt: int, error) -> float:
+        """
+        計算下一次重試前的等待秒數。
+
+        Args:
+            attempt (int): 已重試的次數 (從 0 開始)。
+            error (RetryableReviewerError): 觸發重試的錯誤。
+
+        Returns:
+            float: 有 Retry-After 時使用其值，否則為 0 到指數上限之間的隨機值 (full jitter)。
+        """
+        if error.retry_after is not None:
+            return min(self.max_delay, max(0.0, error.retry_after))
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _record_wait(self, waited: float):
+        if waited:
+            self._count("wait_s", waited)
+
+    def _on_error(self, attempt: int, error) -> float:
+        """
+        處理一次失敗的請求：速率限制時降低並行上限，並決定是否重試。
+
+        Args:
+            attempt (int): 已重試的次數 (從 0 開始)。
+            error (RetryableReviewerError): 本次請求的錯誤。
+
+        Returns:
+            float: 下一次重試前的等待秒數。
+
+        Raises:
+            RetryableReviewerError: 超過最大重試次數或重試預算用盡時引發 error。
+        """
+        if isinstance(error, RateLimitError):
+            self._count("throttled")
+            if self.concurrency.on_throttle():
+                logging.warning(
+                    f"{self.name} rate limited, concurrency lowered to {int(self.concurrency.limit)}"
+                )
+        if attempt >= self.max_retries or (
+            self.budget is not None and not self.budget.try_spend()
+        ):
+            self._count("gave_up")
+            raise error
+        delay = self.backoff_delay(attempt, error)
+        self._count("retried")
+        logging.info(f"{self.name} retry {attempt + 1} in {delay:.2f}s: {error}")
+        return delay
+
+    def _start_call(self):
+        self._count("calls")
+        if self.budget is not None:
+            self.budget.record_request()
+
+    def call(self, fn, tokens: int = 0):
+        """
+        在速率限制內呼叫 fn，並重試暫時性錯誤。
+
+        Args:
+            fn (callable): 不帶參數、執行實際請求的函數；暫時性錯誤應引發 RetryableReviewerError。
+            tokens (int, optional): 此請求估計使用的 token 數量，用於每分鐘 token 數限制。
+
+        Returns:
+            任何型別: fn 的回傳值。
+
+        Raises:
+            RetryableReviewerError: 超過最大重試次數或重試預算用盡時引發最後一次的錯誤。
+        """
+        self._start_call()
+        attempt = 0
+        while True:
+            waited = 0.0
+            if self.requests is not None:
+                waited += self.requests.acquire(1)
+            if self.tokens is not None and tokens:
+                waited += self.tokens.acquire(tokens)
+            self._record_wait(waited)
+            self.concurrency.acquire()
+            try:
+                result = fn()
+            except RetryableReviewerError as e:
+                error = e
+            else:
+                self.concurrency.on_success()
+                return result
+            finally:
+                self.concurrency.release()
+            time.sleep(self._on_error(attempt, error))
+            attempt += 1
+
+    async def acall(self, fn, tokens: int = 0):
+        """
+        call 的非同步版本：等待權杖、並行名額與退避時都不佔用執行緒。
+        與 call 共用同一組權杖桶、並行上限與重試預算。
+
+        Args:
+            fn (callable): 不帶參數、回傳協程 (執行實際請求) 的函數；每次重試都會重新呼叫。
+            tokens (int, optional): 此請求估計使用的 token 數量。
+
+        Returns:
+            任何型別: 協程的回傳值。
+
+        Raises:
+            RetryableReviewerError: 超過最大重試次數或重試預算用盡時引發最後一次的錯誤。
+        """
+        self._start_call()
+        attempt = 0
+        while True:
+            waited = 0.0
+            if self.requests is not None:
+                waited += await self.requests.aacquire(1)
+            if self.tokens is not None and tokens:
+                waited += await self.tokens.aacquire(tokens)
+            self._record_wait(waited)
+            await self.concurrency.aacquire()
+            try:
+                result = await fn()
+            except RetryableReviewerError as e:
+                error = e
+            else:
+                self.concurrency.on_success()
+                return result
+            finally:
+                self.concurrency.release()
+            await asyncio.sleep(self._on_error(attempt, error))
+            attempt += 1
+
+    def log_stats(self):
+        """
+        將速率限制與重試的計數記錄到日誌。
+        """
+        logging.info(
+            f"Rate limiter {self.name}: {self.stats['calls']} calls, "
+            f"{self.stats['throttled']} throttled, {self.stats['retried']} retried, "
+            f"{self.stats['gave_up']} gave up, {self.stats['wait_s']:.2f}s waiting for quota, "
+            f"concurrency limit {int(self.concurrency.limit)}"
+        )
@@ -1,142 +1,858 @@
 # reporter.py
 # 此檔案包含用於產生模型比較報告的函數。
+# 報告以串流方式寫入：每筆模型處理結果完成時立即寫出其段落，
+# 只保留彙總表格與排行榜所需的統計值，記憶體用量與資料集大小無關。
+# 直接執行時可從執行結果檔案 (main.py --save_run) 重新產生報告，不需重新生成與評審，例如:
+#   python reporter.py --run results.cmrun --output_report results.md
 
+import argparse # 用於解析命令列參數
 import logging # 用於記錄程式運行訊息
+import time # 用於控制報告檔案的定期寫出
 
-# 設定日誌記錄的基本配置
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+from aggregation import DEFAULT_BOOTSTRAP_SAMPLES, ScoreTable, render_summary, summarize # 評分的統計分析
+from local_metrics import describe_checks # 本地檢查項目的中文名稱
+from results import ModelResult, read_run, read_run_header # 模型處理結果的記錄類型與執行結果檔案
+from tracing import span # 報告產生與寫入的追蹤 span
 
 
-def generate_report(all_results, output_filepath: str):
+def _format_number(value, digits=2, suffix=""):
     """
-    根據所有模型的處理結果產生 Markdown 格式的比較報告。
+    將數值格式化為報告用字串。
 
     Args:
-        all_results (list): 一個包含每個模型處理結果的字典列表。
-                            每個字典應包含 'ollama_model', 'task', 'input_text_snippet',
-                            'ollama_output', 和 'reviews' 等鍵。
-        output_filepath (str): 要儲存 Markdown 報告的檔案路徑。
+        value (int or float or None): 要格式化的數值。
+        digits (int, optional): 小數位數。
+        suffix (str, optional): 附加在數值後的單位。
+
+    Returns:
+        str: 格式化後的字串；無資料時回傳 "N/A"。
+    """
+    if not isinstance(value, (int, float)):
+        return "N/A"
+    return f"{value:.{digits}f}{suffix}"
+
+
+def _render_generation_metrics(metrics):
+    """
+    將生成指標轉換為單行 Markdown 文字。
+
+    Args:
+        metrics (dict): 模型結果中的 'generation_metrics' 字典。
+
+    Returns:
+        str: 生成指標行；沒有指標時回傳 None。
     """
-    # report_lines: 用於儲存報告的每一行內容的列表
+    if not metrics:
+        return None
+    parts = [
+        f"耗時 {_format_number(metrics.get('wall_time_s'), 2, 's')}",
+        f"首個 token {_format_number(metrics.get('ttft_s'), 2, 's')}",
+        f"{_format_number(metrics.get('tokens_per_sec'), 1)} tokens/s",
+        f"提示詞 {metrics.get('prompt_eval_count', 'N/A')} tokens",
+        f"輸出 {metrics.get('eval_count', 'N/A')} tokens",
+    ]
+    if isinstance(metrics.get("model_load_s"), (int, float)):
+        # 暖機載入耗時另外列出，不包含在生成耗時中
+        parts.append(f"模型載入 {_format_number(metrics['model_load_s'], 2, 's')} (不計入耗時)")
+    chunks = metrics.get("chunks")
+    if chunks:
+        # 長輸入分段生成時列出區段數量與最慢區段的耗時
+        map_chunks = [chunk for chunk in chunks if chunk.get("stage") == "map"]
+        slowest = max((chunk.get("wall_time_s") or 0.0) for chunk in chunks)
+        parts.append(
+            f"分段 {len(map_chunks)} 段 (整合 {len(chunks) - len(map_chunks)} 次，"
+            f"最慢區段 {_format_number(slowest, 2, 's')})"
+        )
+    line = "**生成指標:** " + " · ".join(parts)
+    if metrics.get("cached"):
+        line += " _(來自生成快取，數值為原始生成時的量測)_"
+    return line
+
+
+def _render_local_metrics(metrics):
+    """
+    將送交評審前的本地檢查結果轉換為單行 Markdown 文字。
+
+    Args:
+        metrics (dict): 模型結果中的 'local_metrics' 字典。
+
+    Returns:
+        str: 本地檢查行；沒有執行本地檢查時回傳 None。
+    """
+    if not metrics:
+        return None
+    parts = [
+        f"中文比例 {_format_number(metrics.get('cjk_ratio'))}",
+        f"簡體比例 {_format_number(metrics.get('simplified_ratio'))}",
+        f"長度比 {_format_number(metrics.get('length_ratio'))}",
+        f"原文重疊 {_format_number(metrics.get('source_overlap'))}",
+    ]
+    if metrics.get("unique_ngram_ratio") is not None:
+        parts.append(f"不重複片段 {_format_number(metrics['unique_ngram_ratio'])}")
+    if metrics.get("chrf") is not None:
+        # 有參考答案時列出與參考答案的相似度
+        parts.append(f"chrF {_format_number(metrics['chrf'], 1)}")
+        parts.append(f"BLEU {_format_number(metrics.get('bleu'), 1)}")
+    if metrics.get("failed"):
+        parts.append(f"未通過: {describe_checks(metrics['failed'])}")
+    if metrics.get("warnings"):
+        parts.append(f"警告: {describe_checks(metrics['warnings'])}")
+    return "**本地檢查:** " + " · ".join(parts)
+
+
+def _render_model_result(result, task_type, heading=None, input_heading=None):
+    """
+    將單一模型的處理結果轉換為 Markdown 行。
+
+    Args:
+        result (ModelResult): 單一模型的處理結果。
+        task_type (str): 任務類型，用於決定要顯示的評分項目。
+        heading (str, optional): 區段標題；預設為 "### Ollama 模型: <模型名稱>"。
+        input_heading (str, optional): 指定時在標題下方加入此結果的輸入片段。
+
+    Returns:
+        list: 該模型結果的 Markdown 行列表。
+    """
+    # report_lines: 用於儲存此模型區段的每一行內容的列表
     report_lines = []
-    report_lines.append("# LLM 模型比較報告") # 報告主標題
+    if heading is None:
+        heading = f"### Ollama 模型: {result.ollama_model}"
+    report_lines.append(f"--- --- ---\n{heading}\n") # 加入分隔線和區段標題
+    if input_heading is not None:
+        report_lines.extend(_render_input_snippet(result, input_heading))
+
+    # 處理 Ollama 模型的輸出
+    ollama_output = result.ollama_output # 獲取 Ollama 模型的輸出
+    report_lines.append("**Ollama 模型輸出:**") # 加入輸出標題
+    if result.error is not None:
+        # 生成失敗時輸出為包含 'error' 鍵的字典
+        report_lines.append(f"> _錯誤: {result.error}_ ")
+    elif ollama_output:
+        # 如果有輸出內容，則加入報告，並處理換行
+        # 先處理換行再放入 f-string，f-string 運算式在 Python 3.12 之前不可包含反斜線
+        quoted_output = str(ollama_output).replace("\n", "\n> ")
+        report_lines.append(f"> {quoted_output}")
+    else:
+        # 如果沒有輸出或輸出為空
+        report_lines.append("> _無輸出或輸出為空。_")
     report_lines.append("") # 空行
 
-    # 檢查是否有結果可報告
-    if not all_results:
-        report_lines.append("沒有可報告的結果。") # 如果沒有結果，則加入此訊息
-        # 將空報告寫入檔案
-        with open(output_filepath, "w", encoding="utf-8") as f_err:
-            for line_err in report_lines:
-                f_err.write(line_err + "\n")
-        logging.info(f"已產生空報告到: {output_filepath}") # 記錄已產生空報告
-        return # 結束函數
-
-    # 取得第一個結果，用於提取任務類型和輸入片段等共享資訊
-    first_result = all_results[0]
-    # task_type: 從第一個結果中獲取任務類型，若無則設為 "未知任務"
-    task_type = first_result.get("task", "未知任務")
-    # task_display_name: 用於報告中顯示的任務名稱，預設為 task_type
-    task_display_name = task_type
+    # 加入生成指標 (耗時、首個 token 時間、生成速度與 token 數量)
+    metrics_line = _render_generation_metrics(result.generation_metrics)
+    if metrics_line:
+        report_lines.append(metrics_line)
+        report_lines.append("") # 空行
+
+    # 加入送交評審前的本地檢查結果，與下方的評審評分對照
+    local_line = _render_local_metrics(result.local_metrics)
+    if local_line:
+        report_lines.append(local_line)
+        report_lines.append("") # 空行
+
+    # 處理評審結果
+    reviews = result.reviews # 獲取評審結果列表
+    if reviews:
+        report_lines.append("**評審結果:**") # 加入評審結果標題
+    else:
+        # 如果沒有評審結果
+        report_lines.append("- _此 Ollama 模型沒有來自活躍評審員的評審結果。_")
+
+    # 迭代處理每個評審
+    for review in reviews:
+        # evaluation: 獲取評估資料
+        evaluation = review.evaluation
+        report_lines.append(f"- **評審模型: {review.reviewer_model}**") # 加入評審模型名稱
+        if review.local_gate:
+            # 本地檢查未通過，沒有實際呼叫此評審
+            report_lines.append("  - _本地檢查攔截，未呼叫評審_")
+        elif review.latency_s is not None:
+            # 加入評審呼叫耗時
+            report_lines.append(f"  - 評審耗時: {_format_number(review.latency_s, 2, 's')}")
+
+        if review.error is not None:
+            # 評審失敗時評估資料為包含 'error' 鍵的字典
+            report_lines.append(f"  - _錯誤: {review.error}_ ")
+        elif isinstance(evaluation, dict):
+            # score_keys: 根據任務類型決定要顯示的評分項目
+            score_keys = (
+                [
+                    "accuracy_score", # 準確度評分
+                    "fluency_score", # 流暢度評分
+                    "traditional_chinese_usage_score", # 繁體中文用字評分
+                ]
+                if task_type == "translate" # 如果是翻譯任務
+                else [
+                    "relevance_score", # 相關性評分
+                    "completeness_score", # 完整性評分
+                    "conciseness_score", # 簡潔性評分
+                    "language_expression_score", # 語言表達評分
+                ]
+            )
+            # 加入總體評分
+            report_lines.append(
+                f"  - 總體評分: {evaluation.get('overall_score', 'N/A')}"
+            )
+            # 迭代加入各項子評分
+            for key in score_keys:
+                report_lines.append(
+                    f"    - {key.replace('_score', '').replace('_', ' ').capitalize()}: {evaluation.get(key, 'N/A')}"
+                )
+            # 加入評論文字
+            report_lines.append(f"  - 評論: {evaluation.get('comment', '無評論')}")
+        else:
+            # 如果評估格式無法解析
+            report_lines.append(
+                f"  - _無法解析的評估格式: {str(evaluation)[:100]}..._"
+            )
+        report_lines.append("") # 每個評審後加空行
+    report_lines.append("") # 每個 Ollama 模型結果後加空行
+    return report_lines
+
+
+def _render_input_snippet(result, heading):
+    """
+    將結果中的輸入文字片段轉換為 Markdown 引用區塊。
+
+    Args:
+        result (ModelResult): 處理結果。
+        heading (str): 片段上方的標題行。
+
+    Returns:
+        list: 輸入片段的 Markdown 行列表。
+    """
+    # input_snippet: 結果中的輸入文字片段，若無則設為 "N/A"
+    input_snippet = result.input_text_snippet or "N/A"
+    # 先處理換行再放入 f-string，f-string 運算式在 Python 3.12 之前不可包含反斜線
+    quoted_snippet = input_snippet.replace("\n", "\n> ")
+    return [f"{heading}\n> {quoted_snippet}", ""] # 加入輸入文字片段與空行
+
+
+class _AggregateStats:
+    """
+    跨記錄彙總表格的統計累加器。
+    逐筆加入模型結果，累計每個 Ollama 模型與評審模型組合的評分，以及生成失敗的次數。
+    """
+
+    def __init__(self):
+        # _scores: (Ollama 模型, 評審模型) 對應 [評分總和, 評分數量, 錯誤數量]
+        self._scores = {}
+        # _generation_errors: Ollama 模型對應生成失敗的記錄數量
+        self._generation_errors = {}
+
+    def add(self, result):
+        """
+        加入一筆模型處理結果。
+
+        Args:
+            result (ModelResult): 單一模型的處理結果。
+        """
+        ollama_model = result.ollama_model
+        self._generation_errors.setdefault(ollama_model, 0)
+        if result.error is not None:
+            self._generation_errors[ollama_model] += 1
+        for review in result.reviews:
+            entry = self._scores.setdefault((ollama_model, review.reviewer_model), [0.0, 0, 0])
+            score = review.overall_score
+            if score is not None:
+                entry[0] += score
+                entry[1] += 1
+            else:
+                entry[2] += 1
+
+    def render(self):
+        """
+        產生彙總表格：每個 Ollama 模型與評審模型組合的平均總體評分。
+
+        Returns:
+            list: 彙總表格的 Markdown 行列表。
+        """
+        report_lines = ["## 彙總結果", ""]
+        report_lines.append("| Ollama 模型 | 評審模型 | 平均總體評分 | 評分數 | 評審錯誤數 |")
+        report_lines.append("| --- | --- | --- | --- | --- |")
+        for (ollama_model, reviewer_model), (total, count, errors) in self._scores.items():
+            average = f"{total / count:.2f}" if count else "N/A"
+            report_lines.append(
+                f"| {ollama_model} | {reviewer_model} | {average} | {count} | {errors} |"
+            )
+        report_lines.append("")
+        # 列出生成失敗的模型與次數
+        for ollama_model, errors in self._generation_errors.items():
+            if errors:
+                report_lines.append(f"- {ollama_model}: {errors} 筆記錄生成失敗")
+        report_lines.append("")
+        return report_lines
+
+
+class _LeaderboardStats:
+    """
+    模型排行榜的統計累加器。
+    逐筆加入模型結果，累計每個 Ollama 模型的評分與速度指標，
+    最後依品質、延遲與每秒品質產生排行榜表格。
+    """
+
+    def __init__(self):
+        # _models: Ollama 模型名稱對應各項指標的 [總和, 數量]
+        self._models = {}
+
+    def add(self, result):
+        """
+        加入一筆模型處理結果。
+
+        Args:
+            result (ModelResult): 單一模型的處理結果。
+        """
+        stats = self._models.setdefault(
+            result.ollama_model,
+            {
+                key: [0.0, 0]
+                for key in ("score", "wall", "ttft", "tps", "review_latency", "load", "chrf")
+            },
+        )
+        # 本地檢查：檢查的輸出數量與未通過的數量
+        stats.setdefault("local", [0, 0])
+
+        def accumulate(key, value):
+            if isinstance(value, (int, float)):
+                stats[key][0] += value
+                stats[key][1] += 1
+
+        metrics = result.generation_metrics
+        accumulate("wall", metrics.get("wall_time_s"))
+        accumulate("ttft", metrics.get("ttft_s"))
+        accumulate("tps", metrics.get("tokens_per_sec"))
+        accumulate("load", metrics.get("model_load_s"))
+        local_metrics = result.local_metrics
+        if local_metrics:
+            stats["local"][0] += 1
+            stats["local"][1] += bool(local_metrics.get("failed"))
+            accumulate("chrf", local_metrics.get("chrf"))
+        for review in result.reviews:
+            accumulate("score", review.overall_score)
+            if not review.local_gate:
+                # 本地檢查攔截的評審沒有實際呼叫，不計入評審耗時
+                accumulate("review_latency", review.latency_s)
+
+    @staticmethod
+    def _mean(pair):
+        total, count = pair
+        return total / count if count else None
+
+    def mean_scores(self):
+        """
+        Returns:
+            dict: Ollama 模型名稱對應其平均評分 (沒有評分時為 None)，依模型出現順序。
+        """
+        return {model: self._mean(stats["score"]) for model, stats in self._models.items()}
+
+    def render(self):
+        """
+        產生模型排行榜的 Markdown 行。
+
+        Returns:
+            list: 排行榜表格的 Markdown 行列表；沒有任何模型時回傳空列表。
+        """
+        if not self._models:
+            return []
+        rows = []
+        for ollama_model, stats in self._models.items():
+            score = self._mean(stats["score"])
+            wall = self._mean(stats["wall"])
+            # 每秒品質：平均評分除以平均生成耗時，用於比較「夠好且夠快」的模型
+            score_per_second = score / wall if score is not None and wall else None
+            rows.append(
+                {
+                    "model": ollama_model,
+                    "score": score,
+                    "wall": wall,
+                    "ttft": self._mean(stats["ttft"]),
+                    "tps": self._mean(stats["tps"]),
+                    "review_latency": self._mean(stats["review_latency"]),
+                    # 模型載入耗時為所有暖機耗時的總和 (通常每個模型只載入一次)
+                    "load": stats["load"][0] if stats["load"][1] else None,
+                    "score_per_second": score_per_second,
+                    "local": stats["local"],
+                    "chrf": self._mean(stats["chrf"]),
+                }
+            )
+
+        def ranks(key, reverse):
+            # 依指定欄位排名，沒有資料的模型不給名次
+            ranked = sorted(
+                (row for row in rows if row[key] is not None),
+                key=lambda row: row[key],
+                reverse=reverse,
+            )
+            return {row["model"]: index + 1 for index, row in enumerate(ranked)}
+
+        quality_ranks = ranks("score", True)
+        latency_ranks = ranks("wall", False)
+        efficiency_ranks = ranks("score_per_second", True)
+        # 依品質排名排序，沒有評分的模型排在最後
+        unranked = len(rows) + 1
+        rows.sort(key=lambda row: quality_ranks.get(row["model"], unranked))
+
+        # 有執行本地檢查時，另外列出未通過本地檢查的比例與平均 chrF
+        show_local = any(row["local"][0] for row in rows)
+        header = (
+            "| 品質排名 | Ollama 模型 | 平均評分 | 平均生成耗時 | 平均首個 token | 平均 tokens/s "
+            "| 平均評審耗時 | 評分/秒 | 延遲排名 | 評分/秒排名 | 模型載入 |"
+        )
+        if show_local:
+            header += " 本地檢查未通過 | 平均 chrF |"
+        report_lines = ["## 模型排行榜", ""]
+        report_lines.append(header)
+        report_lines.append("|" + " --- |" * (13 if show_local else 11))
+        for row in rows:
+            line = (
+                f"| {quality_ranks.get(row['model'], '-')} | {row['model']} "
+                f"| {_format_number(row['score'])} | {_format_number(row['wall'], 2, 's')} "
+                f"| {_format_number(row['ttft'], 2, 's')} | {_format_number(row['tps'], 1)} "
+                f"| {_format_number(row['review_latency'], 2, 's')} "
+                f"| {_format_number(row['score_per_second'], 3)} "
+                f"| {latency_ranks.get(row['model'], '-')} | {efficiency_ranks.get(row['model'], '-')} "
+                f"| {_format_number(row['load'], 2, 's')} |"
+            )
+            if show_local:
+                checked, failed = row["local"]
+                line += f" {failed}/{checked} | {_format_number(row['chrf'], 1)} |"
+            report_lines.append(line)
+        report_lines.append("")
+        return report_lines
+
+
+def _task_display_name(task_type):
+    """
+    取得任務類型在報告中顯示的名稱。
+
+    Args:
+        task_type (str): 任務類型。
+
+    Returns:
+        str: config.SUPPORTED_TASKS 中的顯示名稱；無法取得時回傳任務類型本身。
+    """
     try:
         # 嘗試從 config 模組導入 SUPPORTED_TASKS 以獲取更友好的任務顯示名稱
         from config import SUPPORTED_TASKS
-        task_display_name = SUPPORTED_TASKS.get(task_type, task_type)
+        return SUPPORTED_TASKS.get(task_type, task_type)
     except ImportError:
         # 如果導入失敗，記錄警告
         logging.warning("reporter.py: Could not import SUPPORTED_TASKS from config.")
+        return task_type
 
-    report_lines.append(f"## 任務: {task_display_name}") # 加入任務標題
-    # input_snippet: 從第一個結果中獲取輸入文字片段，若無則設為 "N/A"
-    input_snippet = first_result.get("input_text_snippet", "N/A")
+
+def _demote_headings(lines):
+    """
+    將 Markdown 標題降一級，用於把彙總段落放在任務標題之下。
+
+    Args:
+        lines (list): Markdown 行列表。
+
+    Returns:
+        list: 標題降級後的 Markdown 行列表。
+    """
+    return ["#" + line if line.startswith("#") else line for line in lines]
+
+
+def _render_combined_ranking(leaderboards):
+    """
+    產生跨任務的綜合排行榜：每個模型在各任務的平均評分與排名，
+    綜合評分為各任務平均評分的平均 (每個任務等權重)。
+
+    Args:
+        leaderboards (dict): 任務類型對應其 _LeaderboardStats 的字典 (依任務順序)。
+
+    Returns:
+        list: 綜合排行榜的 Markdown 行列表。
+    """
+    tasks = list(leaderboards)
+    scores = {task: leaderboards[task].mean_scores() for task in tasks}
+    task_ranks = {}
+    for task in tasks:
+        ranked = sorted(
+            (model for model, score in scores[task].items() if score is not None),
+            key=lambda model: scores[task][model],
+            reverse=True,
+        )
+        task_ranks[task] = {model: index + 1 for index, model in enumerate(ranked)}
+    models = []
+    for task in tasks:
+        for model in scores[task]:
+            if model not in models:
+                models.append(model)
+    rows = []
+    for model in models:
+        values = [scores[task].get(model) for task in tasks]
+        values = [value for value in values if value is not None]
+        ranks = [task_ranks[task][model] for task in tasks if model in task_ranks[task]]
+        rows.append(
+            {
+                "model": model,
+                # 只有完成所有任務評分的模型才計算綜合評分，避免缺少較難任務的模型佔便宜
+                "score": sum(values) / len(values) if len(values) == len(tasks) else None,
+                "mean_rank": sum(ranks) / len(ranks) if ranks else None,
+            }
+        )
+    rows.sort(key=lambda row: (row["score"] is None, -(row["score"] or 0.0)))
+
+    report_lines = ["## 綜合排行榜", ""]
     report_lines.append(
-        f"### 輸入文本 (片段):\n> {input_snippet.replace('\n', '\n> ')}" # 加入輸入文字片段，並處理換行
+        "_綜合評分為各任務平均評分的平均 (每個任務等權重)；缺少任一任務評分的模型不列入綜合排名。_"
     )
-    report_lines.append("") # 空行
+    report_lines.append("")
+    report_lines.append(
+        "| 綜合排名 | Ollama 模型 | 綜合評分 | "
+        + " | ".join(f"{_task_display_name(task)} 評分 (排名)" for task in tasks)
+        + " | 平均名次 |"
+    )
+    report_lines.append("| --- " * (len(tasks) + 4) + "|")
+    for index, row in enumerate(rows):
+        cells = []
+        for task in tasks:
+            score = scores[task].get(row["model"])
+            rank = task_ranks[task].get(row["model"], "-")
+            cells.append(f"{_format_number(score)} ({rank})")
+        report_lines.append(
+            f"| {index + 1 if row['score'] is not None else '-'} | {row['model']} "
+            f"| {_format_number(row['score'])} | " + " | ".join(cells)
+            + f" | {_format_number(row['mean_rank'], 1)} |"
+        )
+    report_lines.append("")
+    return report_lines
 
-    # 迭代處理每個模型的結果
-    for result in all_results:
-        # ollama_model: 獲取當前處理的 Ollama 模型名稱
-        ollama_model = result.get("ollama_model", "N/A")
-        report_lines.append(f"--- --- ---\n### Ollama 模型: {ollama_model}\n") # 加入 Ollama 模型的分隔線和標題
-
-        # 處理 Ollama 模型的輸出
-        ollama_output = result.get("ollama_output") # 獲取 Ollama 模型的輸出
-        report_lines.append("**Ollama 模型輸出:**") # 加入輸出標題
-        if isinstance(ollama_output, dict) and "error" in ollama_output:
-            # 如果輸出是字典且包含 'error' 鍵，表示發生錯誤
-            report_lines.append(f"> _錯誤: {ollama_output['error']}_ ")
-        elif ollama_output:
-            # 如果有輸出內容，則加入報告，並處理換行
-            report_lines.append(f"> {str(ollama_output).replace('\n', '\n> ')}")
-        else:
-            # 如果沒有輸出或輸出為空
-            report_lines.append("> _無輸出或輸出為空。_")
-        report_lines.append("") # 空行
 
-        # 處理評審結果
-        reviews = result.get("reviews", []) # 獲取評審結果列表
-        if reviews:
-            report_lines.append("**評審結果:**") # 加入評審結果標題
+class StreamingReportWriter:
+    """
+    串流式 Markdown 報告寫入器。
+    每加入一筆模型處理結果就立即寫出其段落 (經由緩衝區，並定期寫入檔案)，
+    只保留彙總表格與排行榜的統計值，關閉時才寫出這些彙總段落。
+
+    - 單一輸入模式 (record_id 為 None)：輸入片段置於所有模型結果之前。
+    - 資料集模式：依結果到達的順序 (模型順序) 分段，每個 Ollama 模型一個段落，
+      其中每筆記錄一個子段落；關閉時加入跨記錄的彙總表格與統計分析
+      (平均評分的 bootstrap 信賴區間、評審間一致性與模型兩兩勝率)。
+      統計分析所需的評分以欄式資料表保存，每則評分只佔 20 位元組。
+    兩種模式最後都會附上依品質、延遲與每秒品質排名的模型排行榜。
+    多任務報告中每個模型與任務的組合各一個段落，彙總段落依任務分開，
+    最後加入跨任務的綜合排行榜。
+    """
+
+    def __init__(
+        self,
+        output_filepath: str,
+        buffer_size: int = 1 << 16,
+        flush_interval: float = 2.0,
+        bootstrap_samples: int = DEFAULT_BOOTSTRAP_SAMPLES,
+        tasks=None,
+    ):
+        """
+        建立報告檔案並準備寫入。
+
+        Args:
+            output_filepath (str): 要儲存 Markdown 報告的檔案路徑。
+            buffer_size (int, optional): 檔案寫入緩衝區大小 (位元組)。
+            flush_interval (float, optional): 兩次強制寫出之間的最短間隔 (秒)，
+                                              讓長時間執行時報告內容可以即時查看。
+            bootstrap_samples (int, optional): 統計分析中 bootstrap 重新抽樣次數；0 表示不計算信賴區間。
+            tasks (list, optional): 本次執行的任務類型列表；超過一個任務時產生多任務報告。
+                                    未指定時由第一筆結果決定 (單一任務)。
+        """
+        self.output_filepath = output_filepath # 報告檔案路徑
+        self.flush_interval = flush_interval # 強制寫出的間隔
+        self.bootstrap_samples = bootstrap_samples # bootstrap 重新抽樣次數
+        self.count = 0 # 已寫入的結果數量
+        self._file = open(output_filepath, "w", encoding="utf-8", buffering=buffer_size)
+        self._last_flush = time.monotonic()
+        self._tasks = list(tasks) if tasks else [] # 任務類型列表
+        self._multi_task = len(self._tasks) > 1 # 是否為多任務報告
+        self._started = False # 是否已寫出任務標題
+        self._dataset_mode = False # 是否為資料集模式
+        self._current_section = None # 資料集模式下目前段落的 (Ollama 模型, 任務)
+        # 以下統計依任務類型分開保存 (依任務順序)
+        self._aggregates = {} # 任務類型對應跨記錄彙總表格的統計
+        self._leaderboards = {} # 任務類型對應排行榜的統計
+        self._score_tables = {} # 任務類型對應統計分析使用的評分資料表
+        self._seen_sections = set() # 資料集模式下已寫出的 (Ollama 模型, 任務) 段落
+        self._extra_sections = [] # 關閉時寫在排行榜之前的附加段落
+        self._closed = False
+        self.bytes_written = 0 # 已寫入緩衝區的位元組數
+        self._unflushed_bytes = 0 # 上次寫出後累積在緩衝區的位元組數
+        self._write_lines(["# LLM 模型比較報告", ""]) # 報告主標題與空行
+
+    def _write_lines(self, lines):
+        """
+        將多行文字寫入緩衝區。
+
+        Args:
+            lines (list): 要寫入的行 (不含換行字元)。
+        """
+        for line in lines:
+            self._file.write(line + "\n")
+            size = len(line.encode("utf-8")) + 1
+            self.bytes_written += size
+            self._unflushed_bytes += size
+
+    def _flush(self):
+        """
+        將緩衝區內容寫入檔案。
+        """
+        with span("report.write", bytes=self._unflushed_bytes):
+            self._file.flush()
+        self._unflushed_bytes = 0
+
+    def _start(self, result):
+        """
+        依第一筆結果寫出任務標題並決定報告模式。
+
+        Args:
+            result (ModelResult): 第一筆模型處理結果。
+        """
+        self._started = True
+        if not self._tasks:
+            # 未指定任務時，從第一個結果中獲取任務類型，若無則設為 "未知任務"
+            self._tasks = [result.task or "未知任務"]
+        self._dataset_mode = result.record_id is not None
+        # 加入任務標題 (多任務時列出所有任務)
+        self._write_lines(
+            [f"## 任務: {'、'.join(_task_display_name(task) for task in self._tasks)}"]
+        )
+        if not self._dataset_mode:
+            # 單一輸入模式：輸入片段置於所有模型結果之前
+            self._write_lines(_render_input_snippet(result, "### 輸入文本 (片段):"))
         else:
-            # 如果沒有評審結果
-            report_lines.append("- _此 Ollama 模型沒有來自活躍評審員的評審結果。_")
-
-        # 迭代處理每個評審
-        for review in reviews:
-            # reviewer_model: 獲取評審模型的名稱
-            reviewer_model = review.get("reviewer_model", "N/A")
-            # evaluation: 獲取評估資料
-            evaluation = review.get("evaluation", {})
-            report_lines.append(f"- **評審模型: {reviewer_model}**") # 加入評審模型名稱
-
-            if isinstance(evaluation, dict) and "error" in evaluation:
-                # 如果評估資料是字典且包含 'error' 鍵，表示評審時發生錯誤
-                report_lines.append(f"  - _錯誤: {evaluation['error']}_ ")
-            elif isinstance(evaluation, dict):
-                # score_keys: 根據任務類型決定要顯示的評分項目
-                score_keys = (
-                    [
-                        "accuracy_score", # 準確度評分
-                        "fluency_score", # 流暢度評分
-                        "traditional_chinese_usage_score", # 繁體中文用字評分
-                    ]
-                    if task_type == "translate" # 如果是翻譯任務
-                    else [
-                        "relevance_score", # 相關性評分
-                        "completeness_score", # 完整性評分
-                        "conciseness_score", # 簡潔性評分
-                        "language_expression_score", # 語言表達評分
-                    ]
-                )
-                # 加入總體評分
-                report_lines.append(
-                    f"  - 總體評分: {evaluation.get('overall_score', 'N/A')}"
-                )
-                # 迭代加入各項子評分
-                for key in score_keys:
-                    report_lines.append(
-                        f"    - {key.replace('_score', '').replace('_', ' ').capitalize()}: {evaluation.get(key, 'N/A')}"
+            self._write_lines([""])
+
+    def _task_stats(self, task_type):
+        """
+        取得任務的統計累加器，第一次出現時建立。
+
+        Args:
+            task_type (str): 任務類型。
+
+        Returns:
+            tuple: (_AggregateStats, _LeaderboardStats, ScoreTable)。
+        """
+        if task_type not in self._leaderboards:
+            self._aggregates[task_type] = _AggregateStats()
+            self._leaderboards[task_type] = _LeaderboardStats()
+            self._score_tables[task_type] = ScoreTable()
+        return (
+            self._aggregates[task_type],
+            self._leaderboards[task_type],
+            self._score_tables[task_type],
+        )
+
+    def add(self, result):
+        """
+        寫出一筆模型處理結果並更新彙總統計。
+
+        Args:
+            result (ModelResult or dict): 單一模型的處理結果 (也接受 to_dict 格式的字典)；
+                                          資料集模式下 record_id 不為 None。
+        """
+        result = ModelResult.coerce(result)
+        start_bytes = self.bytes_written
+        with span("report.render", model=result.ollama_model, record_id=result.record_id) as trace:
+            if not self._started:
+                self._start(result)
+            task_type = result.task or self._tasks[0]
+            if task_type not in self._tasks:
+                # 未事先指定的任務出現時改為多任務報告
+                self._tasks.append(task_type)
+                self._multi_task = True
+            aggregate, leaderboard, scores = self._task_stats(task_type)
+            ollama_model = result.ollama_model
+            # 多任務報告的段落標題加上任務名稱
+            task_suffix = f" · 任務: {_task_display_name(task_type)}" if self._multi_task else ""
+            if self._dataset_mode:
+                section = (ollama_model, task_type)
+                if section != self._current_section:
+                    # 進入新的模型段落前先寫出前一段，讓已完成的模型可以立即查看
+                    self._current_section = section
+                    self._flush()
+                    # 提前停止模式下同一模型會分輪出現，之後的段落標示為接續
+                    suffix = " (續)" if section in self._seen_sections else ""
+                    self._seen_sections.add(section)
+                    self._write_lines(
+                        [f"## Ollama 模型: {ollama_model}{task_suffix}{suffix}", ""]
                     )
-                # 加入評論文字
-                report_lines.append(f"  - 評論: {evaluation.get('comment', '無評論')}")
+                self._write_lines(
+                    _render_model_result(
+                        result,
+                        task_type,
+                        heading=f"### 記錄: {result.record_id}",
+                        input_heading="**輸入文本 (片段):**",
+                    )
+                )
+                aggregate.add(result)
+                scores.add_result(result)
             else:
-                # 如果評估格式無法解析
-                report_lines.append(
-                    f"  - _無法解析的評估格式: {str(evaluation)[:100]}..._"
+                self._write_lines(
+                    _render_model_result(
+                        result,
+                        task_type,
+                        heading=f"### Ollama 模型: {ollama_model}{task_suffix}",
+                    )
                 )
-            report_lines.append("") # 每個評審後加空行
-        report_lines.append("") # 每個 Ollama 模型結果後加空行
+            trace.set("bytes", self.bytes_written - start_bytes)
+        leaderboard.add(result)
+        self.count += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._flush()
+            self._last_flush = now
+
+    def add_section(self, lines):
+        """
+        加入關閉報告時寫在排行榜之前的附加段落 (例如提前停止的淘汰紀錄)。
 
-    # 嘗試將報告內容寫入指定的輸出檔案
+        Args:
+            lines (list): 段落的 Markdown 行列表。
+        """
+        self._extra_sections.extend(lines)
+
+    def _render_task_summary(self, task_type):
+        """
+        產生單一任務的彙總表格、統計分析與排行榜。
+
+        Args:
+            task_type (str): 任務類型。
+
+        Returns:
+            tuple: (彙總表格與統計分析的 Markdown 行列表, 排行榜的 Markdown 行列表)。
+        """
+        lines = []
+        if self._dataset_mode:
+            lines.extend(self._aggregates[task_type].render())
+            # 加入平均評分的信賴區間、評審間一致性與模型兩兩勝率
+            lines.extend(
+                render_summary(summarize(self._score_tables[task_type], self.bootstrap_samples))
+            )
+        return lines, self._leaderboards[task_type].render()
+
+    def close(self):
+        """
+        寫出彙總表格與排行榜並關閉報告檔案。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            with span("report.render", section="summary"):
+                if self.count == 0:
+                    self._write_lines(["沒有可報告的結果。"]) # 如果沒有結果，則加入此訊息
+                elif not self._multi_task:
+                    summary_lines, leaderboard_lines = self._render_task_summary(self._tasks[0])
+                    self._write_lines(summary_lines)
+                    self._write_lines(self._extra_sections)
+                    # 加入依品質、延遲與每秒品質排名的模型排行榜
+                    self._write_lines(leaderboard_lines)
+                else:
+                    # 多任務：每個任務一個彙總段落 (標題降一級)，最後加入綜合排行榜
+                    for task_type in self._tasks:
+                        if task_type not in self._leaderboards:
+                            continue
+                        summary_lines, leaderboard_lines = self._render_task_summary(task_type)
+                        self._write_lines([f"## 任務彙總: {_task_display_name(task_type)}", ""])
+                        self._write_lines(_demote_headings(summary_lines + leaderboard_lines))
+                    self._write_lines(self._extra_sections)
+                    self._write_lines(_render_combined_ranking(self._leaderboards))
+        finally:
+            with span("report.write", bytes=self._unflushed_bytes, final=True):
+                self._file.close()
+        if self.count == 0:
+            logging.info(f"已產生空報告到: {self.output_filepath}") # 記錄已產生空報告
+        else:
+            logging.info(f"報告已儲存到: {self.output_filepath}") # 記錄報告儲存成功
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def generate_report(
+    all_results,
+    output_filepath: str,
+    bootstrap_samples: int = DEFAULT_BOOTSTRAP_SAMPLES,
+    tasks=None,
+):
+    """
+    根據所有模型的處理結果產生 Markdown 格式的比較報告。
+
+    Args:
+        all_results (iterable): ModelResult (或 to_dict 格式的字典) 的序列，可以是產生器。
+                                資料集模式下 record_id 不為 None，報告會依模型分段並加入彙總表格。
+                                報告最後附上依品質、延遲與每秒品質排名的模型排行榜。
+        output_filepath (str): 要儲存 Markdown 報告的檔案路徑。
+        bootstrap_samples (int, optional): 統計分析中 bootstrap 重新抽樣次數；0 表示不計算信賴區間。
+        tasks (list, optional): 任務類型列表；超過一個任務時產生依任務分開彙總的多任務報告。
+                                未指定時由結果中出現的任務決定。
+    """
     try:
-        with open(output_filepath, "w", encoding="utf-8") as f_main_report:
-            for line_main_report in report_lines:
-                f_main_report.write(line_main_report + "\n")
-        logging.info(f"報告已儲存到: {output_filepath}") # 記錄報告儲存成功
+        with StreamingReportWriter(
+            output_filepath, bootstrap_samples=bootstrap_samples, tasks=tasks
+        ) as writer:
+            for result in all_results:
+                writer.add(result)
     except Exception as e:
         # 如果儲存報告時發生錯誤，記錄錯誤並重新引發例外
         logging.error(f"儲存報告到 {output_filepath} 時發生錯誤: {e}")
         raise
+
+
+def main(argv=None):
+    """
+    命令列進入點：從一或多個執行結果檔案重新產生 Markdown 報告。
+
+    Args:
+        argv (list, optional): 命令列參數；預設為 sys.argv[1:]。
+    """
+    # 延遲匯入，避免 tracing 成為函式庫用途的相依
+    from tracing import setup_logging
+
+    parser = argparse.ArgumentParser(
+        description="Re-render a comparison report from saved runs (main.py --save_run)."
+    )
+    parser.add_argument(
+        "--run",
+        action="append",
+        required=True,
+        help="Saved run file; repeat to combine runs into one report (in the given order).",
+    )
+    parser.add_argument(
+        "--output_report",
+        type=str,
+        default="comparison_report.md",
+        help="Path to save the Markdown report.",
+    )
+    parser.add_argument(
+        "--bootstrap_samples",
+        type=int,
+        default=DEFAULT_BOOTSTRAP_SAMPLES,
+        help="Bootstrap resamples for the confidence intervals (0 disables).",
+    )
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    # 任務順序沿用各執行結果檔案記錄的任務列表
+    tasks = []
+    for path in args.run:
+        for task in read_run_header(path).get("tasks", []):
+            if task not in tasks:
+                tasks.append(task)
+
+    def saved_results():
+        for path in args.run:
+            yield from read_run(path)
+
+    start = time.perf_counter()
+    generate_report(
+        saved_results(), args.output_report, bootstrap_samples=args.bootstrap_samples, tasks=tasks
+    )
+    logging.info(f"Report re-rendered in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,712 @@
+# results.py
+# 此檔案包含模型處理結果的記錄類型與執行結果檔案的二進位格式。
+# - Review / ModelResult: 以 __slots__ 宣告欄位的記錄類別，取代在管線、日誌與報告之間
+#   傳遞的巢狀字典；模型、任務與評審名稱會被 intern，大量結果共用同一個字串物件。
+# - RunWriter / read_run: 將整次執行的結果存成精簡的二進位檔 (.cmrun)，之後不需重新執行
+#   就能重新產生報告與統計分析 (python reporter.py --run ... / python aggregation.py --run ...)。
+#   檔案由檔頭 (格式名稱與格式版本) 與多個區塊組成，每個區塊以欄為單位保存一批結果：
+#   名稱以整數代碼記錄、評分與耗時以固定的小端序數值欄連續存放，其餘欄位以 JSON 保存，
+#   整個區塊再以 zlib 壓縮；格式與平台的位元組順序及 Python 版本無關。
+#   統計彙總只解碼名稱與評分所在的欄位，不需要逐行解析 JSON 也不需要解碼評審內容。
+
+import json  # 用於保存區塊內的非數值欄位
+import math  # 用於判斷缺少評分的 NaN
+import struct  # 用於檔頭與區塊長度前綴
+import sys  # 用於 intern 重複出現的名稱與判斷平台的位元組順序
+import zlib  # 用於壓縮區塊
+from array import array  # 用於以連續記憶體存放數值欄位
+
+# 執行結果檔案的格式名稱
+RUN_FILE_MAGIC = b"CMRUN"
+# 執行結果檔案的格式版本；格式改變時遞增，版本不同時拒絕讀取
+# (版本 1 以 marshal 保存欄位，無法跨 Python 版本讀取，已不再支援)
+RUN_FILE_VERSION = 2
+# 每個區塊保存的結果數量
+DEFAULT_BLOCK_SIZE = 256
+# 檔頭：格式名稱與 2 位元組小端序的格式版本
+_FILE_HEADER = struct.Struct("<5sH")
+# 區塊長度前綴與區塊內各欄位的長度前綴：4 位元組小端序無號整數
+_LENGTH = struct.Struct("<I")
+# 4 位元組整數欄位的 array 型別代碼 (C int 在少數平台上不是 4 位元組)
+_INT32 = "i" if array("i").itemsize == 4 else "l"
+# 數值欄位在檔案中一律以小端序保存，大端序平台讀寫時需要交換位元組順序
+_SWAP_BYTES = sys.byteorder != "little"
+# 尚未執行生成時的輸出
+NOT_RUN = "<not_run>"
+# 報告輸入片段的最大字元數
+SNIPPET_CHARS = 200
+
+
+def _intern(value):
+    """
+    Args:
+        value (str or None): 名稱。
+
+    Returns:
+        str or None: 字串時回傳 intern 後的字串，其他值原樣回傳。
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Review:
+    """
+    單一評審對單一輸出的評審結果。
+    'evaluation' 為評審模型回傳的評估字典 (包含 'overall_score'、各項子評分與 'comment')，
+    評審失敗時為包含 'error' 鍵的字典。
+    """
+
+    __slots__ = ("reviewer_model", "evaluation", "latency_s", "batch_size", "local_gate")
+
+    def __init__(self, reviewer_model, evaluation, latency_s=None, batch_size=None, local_gate=False):
+        """
+        Args:
+            reviewer_model (str): 評審模型名稱。
+            evaluation (dict): 評估資料。
+            latency_s (float, optional): 評審呼叫耗時 (秒)。
+            batch_size (int, optional): 批次評審時同一次呼叫評審的輸出數量。
+            local_gate (bool, optional): 為 True 時表示本地檢查未通過、沒有實際呼叫此評審。
+        """
+        self.reviewer_model = _intern(reviewer_model)  # 評審模型名稱
+        self.evaluation = evaluation  # 評估資料
+        self.latency_s = latency_s  # 評審呼叫耗時 (秒)
+        self.batch_size = batch_size  # 同一次呼叫評審的輸出數量 (非批次評審時為 None)
+        self.local_gate = local_gate  # 是否為本地檢查攔截的評審
+
+    @property
+    def overall_score(self):
+        """
+        Returns:
+            float or None: 總體評分；評審失敗或評分不是有效數值時為 None。
+        """
+        evaluation = self.evaluation
+        score = evaluation.get("overall_score") if isinstance(evaluation, dict) else None
+        # bool 是 int 的子類別，但不是有效的評分；NaN 也不是有效的評分
+        if isinstance(score, (int, float)) and not isinstance(score, bool) and score == score:
+            return float(score)
+        return None
+
+    @property
+    def error(self):
+        """
+        Returns:
+            str or None: 評審失敗時的錯誤訊息。
+        """
+        if isinstance(self.evaluation, dict):
+            return self.evaluation.get("error")
+        return None
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: 可序列化為 JSON 的字典 (檢查點日誌與 JSON 輸出使用的格式)。
+        """
+        data = {
+            "reviewer_model": self.reviewer_model,
+            "evaluation": self.evaluation,
+            "latency_s": self.latency_s,
+        }
+        if self.batch_size is not None:
+            data["batch_size"] = self.batch_size
+        if self.local_gate:
+            data["local_gate"] = True
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Args:
+            data (dict): to_dict 產生的字典 (例如從檢查點日誌讀取)。
+
+        Returns:
+            Review: 評審結果。
+        """
+        return cls(
+            data.get("reviewer_model", "N/A"),
+            data.get("evaluation", {}),
+            latency_s=data.get("latency_s"),
+            batch_size=data.get("batch_size"),
+            local_gate=bool(data.get("local_gate")),
+        )
+
+    def __repr__(self):
+        return f"Review({self.reviewer_model!r}, score={self.overall_score})"
+
+
+class ModelResult:
+    """
+    單一 Ollama 模型對單一輸入與任務的處理結果。
+    'ollama_output' 在生成成功時為輸出文字，失敗時為包含 'error' 鍵的字典。
+    """
+
+    __slots__ = (
+        "ollama_model",
+        "task",
+        "record_id",
+        "input_text_snippet",
+        "ollama_output",
+        "generation_metrics",
+        "local_metrics",
+        "reviews",
+    )
+
+    def __init__(
+        self,
+        ollama_model,
+        task,
+        input_text_snippet,
+        record_id=None,
+        ollama_output=NOT_RUN,
+        generation_metrics=None,
+        local_metrics=None,
+        reviews=None,
+    ):
+        """
+        Args:
+            ollama_model (str): Ollama 模型名稱。
+            task (str): 任務類型。
+            input_text_snippet (str): 報告使用的輸入文字片段。
+            record_id (str, optional): 資料集模式下的記錄識別碼；單一輸入模式為 None。
+            ollama_output (str or dict, optional): 模型輸出，或包含 'error' 鍵的錯誤字典。
+            generation_metrics (dict, optional): 生成指標 (首個 token 時間、生成速度、token 數量等)。
+            local_metrics (dict, optional): 送交評審前的本地檢查結果。
+            reviews (list, optional): Review 列表 (依評審客戶端順序)。
+        """
+        self.ollama_model = _intern(ollama_model)  # Ollama 模型名稱
+        self.task = _intern(task)  # 任務類型
+        self.record_id = record_id  # 記錄識別碼 (單一輸入模式為 None)
+        self.input_text_snippet = input_text_snippet  # 輸入文字片段
+        self.ollama_output = ollama_output  # Ollama 模型輸出，預設為未執行
+        self.generation_metrics = generation_metrics if generation_metrics is not None else {}
+        self.local_metrics = local_metrics if local_metrics is not None else {}
+        self.reviews = reviews if reviews is not None else []  # 評審結果列表
+
+    @classmethod
+    def new(cls, ollama_model: str, task: str, input_text: str, record_id=None):
+        """
+        建立尚未生成的處理結果，只保留輸入文字的前 SNIPPET_CHARS 字元作為報告片段。
+
+        Args:
+            ollama_model (str): Ollama 模型名稱。
+            task (str): 任務類型。
+            input_text (str): 完整的輸入文字。
+            record_id (str, optional): 資料集模式下的記錄識別碼。
+
+        Returns:
+            ModelResult: 處理結果。
+        """
+        snippet = (
+            input_text[:SNIPPET_CHARS] + "..." if len(input_text) > SNIPPET_CHARS else input_text
+        )
+        return cls(ollama_model, task, snippet, record_id=record_id)
+
+    @property
+    def error(self):
+        """
+        Returns:
+            str or None: 生成失敗時的錯誤訊息。
+        """
+        if isinstance(self.ollama_output, dict):
+            return self.ollama_output.get("error")
+        return None
+
+    def reviewer_names(self) -> set:
+        """
+        Returns:
+            set: 已有成功評審結果的評審模型名稱 (評審失敗的不計入，續跑時會重新評審)。
+        """
+        return {review.reviewer_model for review in self.reviews if review.error is None}
+
+    def drop_failed_reviews(self) -> int:
+        """
+        移除評審失敗 (評估結果為錯誤字典) 的評審，讓這些評審重新執行。
+
+        Returns:
+            int: 移除的評審數量。
+        """
+        kept = [review for review in self.reviews if review.error is None]
+        dropped = len(self.reviews) - len(kept)
+        if dropped:
+            self.reviews = kept
+        return dropped
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: 可序列化為 JSON 的字典 (檢查點日誌與 JSON 輸出使用的格式)。
+        """
+        return {
+            "ollama_model": self.ollama_model,
+            "task": self.task,
+            "record_id": self.record_id,
+            "input_text_snippet": self.input_text_snippet,
+            "ollama_output": self.ollama_output,
+            "generation_metrics": self.generation_metrics,
+            "local_metrics": self.local_metrics,
+            "reviews": [review.to_dict() for review in self.reviews],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Args:
+            data (dict): to_dict 產生的字典 (例如從檢查點日誌讀取)。
+
+        Returns:
+            ModelResult: 處理結果。
+        """
+        return cls(
+            data.get("ollama_model", "N/A"),
+            data.get("task"),
+            data.get("input_text_snippet", "N/A"),
+            record_id=data.get("record_id"),
+            ollama_output=data.get("ollama_output", NOT_RUN),
+            generation_metrics=data.get("generation_metrics") or {},
+            local_metrics=data.get("local_metrics") or {},
+            reviews=[Review.from_dict(review) for review in data.get("reviews", [])],
+        )
+
+    @classmethod
+    def coerce(cls, value):
+        """
+        將處理結果統一為 ModelResult；接受 ModelResult 或 to_dict 格式的字典。
+
+        Args:
+            value (ModelResult or dict): 處理結果。
+
+        Returns:
+            ModelResult: 處理結果。
+        """
+        return value if isinstance(value, cls) else cls.from_dict(value)
+
+    def __repr__(self):
+        return (
+            f"ModelResult({self.ollama_model!r}, {self.task!r}, record_id={self.record_id!r}, "
+            f"reviews={len(self.reviews)})"
+        )
+
+
+class RunWriter:
+    """
+    執行結果檔案寫入器。
+    結果依序加入，每累積 block_size 筆就以欄式格式寫出一個壓縮區塊；
+    模型、任務與評審名稱在整個檔案中共用一個字串表，只有第一次出現時才寫入。
+    每個區塊依序包含：名稱與記錄欄位 (JSON)、輸出與評估內容 (JSON)，以及小端序的數值欄位。
+    """
+
+    def __init__(self, path: str, tasks=None, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        建立執行結果檔案並寫入檔頭。
+
+        Args:
+            path (str): 執行結果檔案路徑 (建議使用 .cmrun 副檔名)。
+            tasks (list, optional): 本次執行的任務類型列表，重新產生報告時沿用。
+            block_size (int, optional): 每個區塊的結果數量。
+        """
+        self.path = path  # 執行結果檔案路徑
+        self.block_size = max(1, block_size)
+        self.count = 0  # 已加入的結果數量
+        self.bytes_written = 0  # 已寫入的位元組數
+        self._names = {}  # 名稱對應字串表中的代碼
+        self._new_names = []  # 尚未寫出的新名稱
+        self._pending = []  # 尚未寫出的結果
+        self._file = open(path, "wb")
+        self._write(_FILE_HEADER.pack(RUN_FILE_MAGIC, RUN_FILE_VERSION))
+        self._write_block([_json_bytes({"tasks": list(tasks) if tasks else []})])
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def _write_block(self, sections):
+        """
+        將多個欄位區段組成一個區塊，壓縮後寫出。
+
+        Args:
+            sections (list): 每個欄位區段的位元組內容。
+        """
+        parts = [_LENGTH.pack(len(sections))]
+        for section in sections:
+            parts.append(_LENGTH.pack(len(section)))
+            parts.append(section)
+        data = zlib.compress(b"".join(parts))
+        self._write(_LENGTH.pack(len(data)))
+        self._write(data)
+
+    def _code(self, name) -> int:
+        """
+        取得名稱在字串表中的代碼，第一次出現時配置新代碼。
+
+        Args:
+            name (str or None): 模型、任務或評審名稱。
+
+        Returns:
+            int: 字串表代碼。
+        """
+        code = self._names.get(name)
+        if code is None:
+            code = self._names[name] = len(self._names)
+            self._new_names.append(name)
+        return code
+
+    def add(self, result):
+        """
+        加入一筆處理結果。
+
+        Args:
+            result (ModelResult): 完成的模型處理結果。
+        """
+        self._pending.append(result)
+        self.count += 1
+        if len(self._pending) >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self):
+        """
+        將暫存的結果以欄式格式寫出為一個區塊。
+        """
+        results, self._pending = self._pending, []
+        if not results:
+            return
+        models = array(_INT32, [self._code(result.ollama_model) for result in results])
+        tasks = array(_INT32, [self._code(result.task) for result in results])
+        review_counts = array(_INT32, [len(result.reviews) for result in results])
+        reviewers = array(_INT32)  # 每則評審的評審名稱代碼
+        scores = array("d")  # 每則評審的總體評分 (沒有有效評分時為 NaN)
+        latencies = array("d")  # 每則評審的耗時 (沒有時為 NaN)
+        batch_sizes = array(_INT32)  # 每則評審的批次大小 (非批次評審時為 0)
+        local_gates = array("b")  # 每則評審是否為本地檢查攔截
+        evaluations = []  # 每則評審的完整評估資料
+        for result in results:
+            for review in result.reviews:
+                reviewers.append(self._code(review.reviewer_model))
+                score = review.overall_score
+                scores.append(math.nan if score is None else score)
+                latencies.append(math.nan if review.latency_s is None else review.latency_s)
+                batch_sizes.append(review.batch_size or 0)
+                local_gates.append(review.local_gate)
+                evaluations.append(review.evaluation)
+        names, self._new_names = self._new_names, []
+        self._write_block(
+            [
+                # 統計彙總需要的欄位與評估內容分開保存，彙總時不需要解碼評估內容
+                _json_bytes(
+                    {
+                        "names": names,
+                        "record_ids": [result.record_id for result in results],
+                        "snippets": [result.input_text_snippet for result in results],
+                    }
+                ),
+                _json_bytes(
+                    {
+                        "outputs": [result.ollama_output for result in results],
+                        "generation_metrics": [result.generation_metrics for result in results],
+                        "local_metrics": [result.local_metrics for result in results],
+                        "evaluations": evaluations,
+                    }
+                ),
+                _column_bytes(models),
+                _column_bytes(tasks),
+                _column_bytes(review_counts),
+                _column_bytes(reviewers),
+                _column_bytes(scores),
+                _column_bytes(latencies),
+                _column_bytes(batch_sizes),
+                _column_bytes(local_gates),
+            ]
+        )
+
+    def close(self):
+        """
+        寫出剩餘的結果並關閉檔案。
+        """
+        if self._file.closed:
+            return
+        try:
+            self._flush_block()
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def _json_bytes(value) -> bytes:
+    """
+    Returns:
+        bytes: 以 UTF-8 編碼的精簡 JSON (NaN 等非有限數值以 Python json 模組的擴充寫法保存)。
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _column_bytes(column: array) -> bytes:
+    """
+    Returns:
+        bytes: 以小端序表示的數值欄位內容。
+    """
+    if _SWAP_BYTES and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _column(typecode: str, data: bytes) -> array:
+    """
+    還原 _column_bytes 寫出的數值欄位。
+
+    Args:
+        typecode (str): array 型別代碼。
+        data (bytes): 小端序的欄位內容。
+
+    Returns:
+        array: 數值欄位。
+    """
+    column = array(typecode)
+    column.frombytes(data)
+    if _SWAP_BYTES and column.itemsize > 1:
+        column.byteswap()
+    return column
+
+
+def _split_sections(data: bytes, path: str) -> list:
+    """
+    將解壓縮後的區塊切分為欄位區段。
+
+    Returns:
+        list: 每個欄位區段的位元組內容 (memoryview，不複製資料)。
+
+    Raises:
+        ValueError: 區塊內容不完整時。
+    """
+    view = memoryview(data)
+    (count,) = _LENGTH.unpack_from(view, 0)
+    offset = _LENGTH.size
+    sections = []
+    for _ in range(count):
+        if offset + _LENGTH.size > len(view):
+            raise ValueError(f"corrupt block in run file {path}")
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if offset + length > len(view):
+            raise ValueError(f"corrupt block in run file {path}")
+        sections.append(view[offset:offset + length])
+        offset += length
+    return sections
+
+
+def _read_blocks(f, path: str):
+    """
+    依序讀取執行結果檔案的區塊。
+
+    Args:
+        f (file): 以二進位模式開啟、已讀過檔頭的檔案。
+        path (str): 檔案路徑 (錯誤訊息使用)。
+
+    Yields:
+        list: 解壓縮後的區塊欄位區段。
+
+    Raises:
+        ValueError: 檔案在區塊中間結束或區塊內容不完整時。
+    """
+    while True:
+        header = f.read(_LENGTH.size)
+        if not header:
+            return
+        if len(header) < _LENGTH.size:
+            raise ValueError(f"truncated run file {path}")
+        (length,) = _LENGTH.unpack(header)
+        data = f.read(length)
+        if len(data) < length:
+            raise ValueError(f"truncated run file {path}")
+        yield _split_sections(zlib.decompress(data), path)
+
+
+def _load_json(section) -> object:
+    return json.loads(bytes(section).decode("utf-8"))
+
+
+def _open_run(path: str):
+    """
+    開啟執行結果檔案並檢查檔頭。
+
+    Args:
+        path (str): 執行結果檔案路徑。
+
+    Returns:
+        file: 以二進位模式開啟、已讀過檔頭的檔案。
+
+    Raises:
+        ValueError: 檔案不是執行結果檔案或格式版本不符時。
+    """
+    f = open(path, "rb")
+    header = f.read(_FILE_HEADER.size)
+    magic = header[:len(RUN_FILE_MAGIC)]
+    if len(header) < _FILE_HEADER.size or magic != RUN_FILE_MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a run file")
+    _, version = _FILE_HEADER.unpack(header)
+    if version != RUN_FILE_VERSION:
+        f.close()
+        raise ValueError(
+            f"{path} uses run file format version {version}, expected {RUN_FILE_VERSION}"
+        )
+    return f
+
+
+def read_run_header(path: str) -> dict:
+    """
+    讀取執行結果檔案的檔頭資訊。
+
+    Args:
+        path (str): 執行結果檔案路徑。
+
+    Returns:
+        dict: 包含 'tasks' (任務類型列表) 鍵的字典。
+
+    Raises:
+        ValueError: 檔案不是執行結果檔案或版本不符時。
+    """
+    with _open_run(path) as f:
+        for sections in _read_blocks(f, path):
+            return _load_json(sections[0])
+    raise ValueError(f"truncated run file {path}")
+
+
+def is_run_file(path: str) -> bool:
+    """
+    Args:
+        path (str): 檔案路徑。
+
+    Returns:
+        bool: 檔案是否以執行結果檔案的格式名稱開始 (不檢查格式版本，版本不符時由讀取函數回報)。
+    """
+    with open(path, "rb") as f:
+        return f.read(len(RUN_FILE_MAGIC)) == RUN_FILE_MAGIC
+
+
+def read_run(path: str):
+    """
+    依寫入順序讀取執行結果檔案中的處理結果。
+
+    Args:
+        path (str): RunWriter 寫出的執行結果檔案路徑。
+
+    Yields:
+        ModelResult: 處理結果。
+
+    Raises:
+        ValueError: 檔案不是執行結果檔案、版本不符或內容被截斷時。
+    """
+    names = []  # 字串表
+    with _open_run(path) as f:
+        blocks = _read_blocks(f, path)
+        next(blocks, None)  # 略過檔頭
+        for sections in blocks:
+            index = _load_json(sections[0])
+            detail = _load_json(sections[1])
+            (
+                models,
+                tasks,
+                review_counts,
+                reviewers,
+                _scores,
+                latencies,
+                batch_sizes,
+                local_gates,
+            ) = sections[2:10]
+            names.extend(_intern(name) for name in index["names"])
+            record_ids = index["record_ids"]
+            snippets = index["snippets"]
+            outputs = detail["outputs"]
+            generation_metrics = detail["generation_metrics"]
+            local_metrics = detail["local_metrics"]
+            evaluations = detail["evaluations"]
+            reviewers = _column(_INT32, reviewers)
+            latency_column = _column("d", latencies)
+            batch_sizes = _column(_INT32, batch_sizes)
+            local_gates = _column("b", local_gates)
+            position = 0  # 目前結果的第一則評審在評審欄位中的位置
+            for i, (model, task, count) in enumerate(
+                zip(
+                    _column(_INT32, models),
+                    _column(_INT32, tasks),
+                    _column(_INT32, review_counts),
+                )
+            ):
+                reviews = []
+                for j in range(position, position + count):
+                    latency = latency_column[j]
+                    reviews.append(
+                        Review(
+                            names[reviewers[j]],
+                            evaluations[j],
+                            latency_s=None if latency != latency else latency,
+                            batch_size=batch_sizes[j] or None,
+                            local_gate=bool(local_gates[j]),
+                        )
+                    )
+                position += count
+                yield ModelResult(
+                    names[model],
+                    names[task],
+                    snippets[i],
+                    record_id=record_ids[i],
+                    ollama_output=outputs[i],
+                    generation_metrics=generation_metrics[i],
+                    local_metrics=local_metrics[i],
+                    reviews=reviews,
+                )
+
+
+def iter_run_scores(path: str):
+    """
+    只讀取執行結果檔案中的評分欄位，不建立 ModelResult 與 Review 物件，
+    也不解碼輸出與評估內容，供統計彙總快速重新計算。
+
+    Args:
+        path (str): RunWriter 寫出的執行結果檔案路徑。
+
+    Yields:
+        tuple: 每筆處理結果一個 (任務類型, Ollama 模型名稱, 記錄識別碼, 輸入文字片段, 評分列表)；
+               評分列表的元素為 (評審模型名稱, 總體評分或 None)。
+
+    Raises:
+        ValueError: 檔案不是執行結果檔案、版本不符或內容被截斷時。
+    """
+    names = []  # 字串表
+    with _open_run(path) as f:
+        blocks = _read_blocks(f, path)
+        next(blocks, None)  # 略過檔頭
+        for sections in blocks:
+            index = _load_json(sections[0])
+            models, tasks, review_counts, reviewers, scores = sections[2:7]
+            names.extend(_intern(name) for name in index["names"])
+            record_ids = index["record_ids"]
+            snippets = index["snippets"]
+            reviewers = _column(_INT32, reviewers)
+            score_column = _column("d", scores)
+            position = 0
+            for i, (model, task, count) in enumerate(
+                zip(
+                    _column(_INT32, models),
+                    _column(_INT32, tasks),
+                    _column(_INT32, review_counts),
+                )
+            ):
+                yield (
+                    names[task],
+                    names[model],
+                    record_ids[i],
+                    snippets[i],
+                    [
+                        (
+                            names[reviewers[j]],
+                            None if score_column[j] != score_column[j] else score_column[j],
+                        )
+                        for j in range(position, position + count)
+                    ],
+                )
+                position += count
@@ -1,20 +1,235 @@
 # reviewer_client.py
 # 此檔案包含用於評估 Ollama 模型輸出的各種評審客戶端。
-# 注意：目前這些都是模擬 (Mock) 的客戶端，用於測試和開發目的。
+# 注意：OpenAI、Gemini 與 DeepSeek 客戶端目前是模擬 (Mock) 的客戶端，用於測試和開發目的；
+# OpenAICompatibleReviewerClient 會實際呼叫 OpenAI 相容的 Chat Completions API。
 
+import asyncio # 用於非同步評審介面
+import email.utils # 用於解析 HTTP 日期格式的 Retry-After
+import json # 用於處理評審 API 的 JSON 資料
 import logging # 用於記錄程式運行訊息
+import random # 用於打亂打包評審中候選輸出的順序
+import re # 用於從評審回應中擷取 JSON 物件
+import threading # 用於保護執行中評審請求的對照表
+import time # 用於計算 Retry-After 的等待秒數
+from collections import OrderedDict # 用於保存本次執行已完成的評審結果 (LRU)
+from concurrent.futures import Future # 用於讓重複的評審請求等待同一個執行中的呼叫
 
-# 設定日誌記錄的基本配置
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+from cache_store import content_key, text_hash # 用於組合評審快取鍵
+from http_session import get_session, to_thread # 共用的非同步 HTTP 工作階段與工作執行緒呼叫
+from rate_limit import ( # 用於評審提供者的速率限制與重試
+    RateLimitError,
+    RetryableReviewerError,
+    estimate_tokens,
 )
 
 
+class ReviewCache:
+    """
+    評審結果快取類別。
+    結合兩層機制：
+    - 本次執行內的去重：相同請求 (例如兩個 Ollama 模型產生完全相同的輸出) 只會呼叫一次評審，
+      同時到達的重複請求會等待同一個執行中的呼叫。
+    - 可選的持久化儲存 (SQLiteCache，含 TTL 與 LRU 淘汰)：重新執行時直接重複使用先前的評審。
+    """
+    def __init__(self, store=None, refresh=False, memo_size=10000):
+        """
+        初始化評審快取。
+
+        Args:
+            store (SQLiteCache, optional): 持久化儲存；None 表示只在本次執行內去重。
+            refresh (bool, optional): 為 True 時略過讀取持久化儲存，但仍寫入新結果。
+            memo_size (int, optional): 本次執行內保留的已完成評審數量上限。
+        """
+        self.store = store # 持久化儲存
+        self.refresh = refresh # 是否略過讀取持久化儲存
+        self.memo_size = memo_size # 記憶體內結果數量上限
+        self.deduplicated = 0 # 本次執行內因去重而省下的評審呼叫次數
+        self._memo = OrderedDict() # 快取鍵對應已完成的評審結果
+        self._in_flight = {} # 快取鍵對應執行中呼叫的 Future
+        self._lock = threading.Lock()
+
+    def _claim(self, key: str):
+        """
+        檢查已完成與執行中的評審，必要時登記目前的呼叫者為執行者。
+
+        Args:
+            key (str): 評審請求的快取鍵。
+
+        Returns:
+            tuple: (已完成的評審結果或 None, 執行中呼叫的 Future 或 None, 是否由目前的呼叫者負責執行評審)。
+        """
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.deduplicated += 1
+                return self._memo[key], None, False
+            future = self._in_flight.get(key)
+            owner = future is None # 是否由目前的呼叫者負責執行評審
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.deduplicated += 1
+            return None, future, owner
+
+    def _settle(self, key: str, future, result=None, error=None):
+        """
+        結束執行中的評審：保存成功的結果並通知等待相同請求的呼叫者。
+
+        Args:
+            key (str): 評審請求的快取鍵。
+            future (Future): _claim 登記的 Future。
+            result (dict, optional): 評估資料。
+            error (BaseException, optional): 評審引發的例外；提供時會傳遞給等待者。
+        """
+        with self._lock:
+            del self._in_flight[key]
+            if error is None and not (isinstance(result, dict) and "error" in result):
+                self._memo[key] = result
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _stored(self, key: str):
+        # 讀取持久化儲存 (要求重新評審時略過)
+        if self.store is not None and not self.refresh:
+            return self.store.get(key)
+        return None
+
+    def _store(self, key: str, result):
+        # 錯誤結果不保存，下次執行時會重新嘗試
+        if self.store is not None and not (isinstance(result, dict) and "error" in result):
+            self.store.put(key, result)
+
+    def get_or_evaluate(self, key: str, evaluate_fn) -> dict:
+        """
+        取得快取的評審結果，若不存在則執行評審並保存結果。
+
+        Args:
+            key (str): 評審請求的快取鍵。
+            evaluate_fn (callable): 不帶參數、實際執行評審並回傳評估字典的函數。
+
+        Returns:
+            dict: 評估資料。
+        """
+        memo, future, owner = self._claim(key)
+        if future is None:
+            return memo
+        if not owner:
+            # 等待相同請求的執行中呼叫完成，例外也會一併傳遞
+            return future.result()
+        try:
+            result = self._stored(key)
+            if result is None:
+                result = evaluate_fn()
+                self._store(key, result)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def aget_or_evaluate(self, key: str, evaluate_fn) -> dict:
+        """
+        get_or_evaluate 的非同步版本；與同步呼叫者共用去重狀態，等待重複請求時不佔用執行緒。
+        持久化儲存的讀寫在工作執行緒中執行。
+
+        Args:
+            key (str): 評審請求的快取鍵。
+            evaluate_fn (callable): 不帶參數、回傳協程 (實際執行評審並回傳評估字典) 的函數。
+
+        Returns:
+            dict: 評估資料。
+        """
+        memo, future, owner = self._claim(key)
+        if future is None:
+            return memo
+        if not owner:
+            # shield: 等待者被取消時不能連帶取消執行者的 Future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await to_thread(self._stored, key) if self.store is not None else None
+            if result is None:
+                result = await evaluate_fn()
+                if self.store is not None:
+                    await to_thread(self._store, key, result)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    def lookup(self, key: str):
+        """
+        查詢已完成的評審結果 (本次執行的記憶體結果或持久化儲存)，不執行評審。
+        批次評審先以此方法找出需要實際評審的輸出。
+
+        Args:
+            key (str): 評審請求的快取鍵。
+
+        Returns:
+            dict or None: 評估資料；沒有可用結果時回傳 None。
+        """
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.deduplicated += 1
+                return self._memo[key]
+        if self.store is not None and not self.refresh:
+            result = self.store.get(key)
+            if result is not None:
+                with self._lock:
+                    self._memo[key] = result
+                    if len(self._memo) > self.memo_size:
+                        self._memo.popitem(last=False)
+                return result
+        return None
+
+    def remember(self, key: str, result: dict):
+        """
+        保存評審結果；錯誤結果不保存，下次執行時會重新嘗試。
+
+        Args:
+            key (str): 評審請求的快取鍵。
+            result (dict): 評估資料。
+        """
+        if isinstance(result, dict) and "error" in result:
+            return
+        if self.store is not None:
+            self.store.put(key, result)
+        with self._lock:
+            self._memo[key] = result
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def log_stats(self):
+        """
+        將去重次數與持久化儲存的統計記錄到日誌。
+        """
+        logging.info(f"Review cache: {self.deduplicated} in-run duplicate evaluations skipped")
+        if self.store is not None:
+            self.store.log_stats()
+
+
 class BaseReviewerClient:
     """
     評審客戶端的基礎類別。
     定義了所有評審客戶端共有的屬性和方法。
+    子類別實作 _evaluate 執行實際評審；evaluate 會先經過共用的評審快取。
     """
+    # provider: 評審提供者名稱，與 config 中 REVIEWER_MODELS 的鍵一致，用於並行上限分組
+    provider = "generic"
+    # prompt_version: 評審提示詞版本，變更提示詞時需遞增，使舊的快取結果失效
+    prompt_version = "1"
+    # packs_batches: _evaluate_many 是否將多個輸出放入同一個評審請求；
+    # 打包評審的提示詞不同，快取結果會與單一評審分開保存
+    packs_batches = False
+    # max_batch: 單一打包評審請求最多包含的輸出數量
+    max_batch = 8
+
     def __init__(self, api_key, model_name):
         """
         初始化基礎評審客戶端。
@@ -27,6 +242,361 @@ class BaseReviewerClient:
         self.model_name = model_name # 評審模型名稱
         # initialized_successfully: 標記客戶端是否成功初始化 (例如，API 金鑰是否有效)
         self.initialized_successfully = False
+        # review_cache: 共用的評審快取，未設定時每次都直接呼叫評審
+        self.review_cache = None
+        # rate_limiter: 同一提供者共用的速率限制器，未設定時不限制也不重試
+        self.rate_limiter = None
+
+    def attach_cache(self, review_cache):
+        """
+        設定此評審客戶端使用的評審快取。
+
+        Args:
+            review_cache (ReviewCache): 可由多個評審客戶端共用的評審快取。
+        """
+        self.review_cache = review_cache
+
+    def attach_limiter(self, rate_limiter):
+        """
+        設定此評審客戶端使用的速率限制器。
+
+        Args:
+            rate_limiter (ProviderLimiter): 同一評審提供者共用的速率限制器。
+        """
+        self.rate_limiter = rate_limiter
+
+    def cache_key(self, original_text, ollama_output, task_type, packed=False) -> str:
+        """
+        計算評審請求的快取鍵。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+            packed (bool, optional): 是否為打包評審的結果。
+
+        Returns:
+            str: 由評審提供者、評審模型、提示詞版本、任務類型及輸入/輸出雜湊組成的快取鍵。
+        """
+        prompt_version = self.prompt_version + ("-packed" if packed else "")
+        return content_key(
+            "review",
+            self.provider,
+            self.model_name,
+            prompt_version,
+            task_type,
+            text_hash(original_text),
+            text_hash(ollama_output),
+        )
+
+    def evaluate(self, original_text, ollama_output, task_type):
+        """
+        評估 Ollama 模型的輸出；設定評審快取時會重複使用相同請求的結果。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型 (例如 "summarize", "translate")。
+
+        Returns:
+            dict: 包含評估結果的字典。
+        """
+        if self.review_cache is None or not self.initialized_successfully:
+            return self._limited_evaluate(original_text, ollama_output, task_type)
+        key = self.cache_key(original_text, ollama_output, task_type)
+        return self.review_cache.get_or_evaluate(
+            key, lambda: self._limited_evaluate(original_text, ollama_output, task_type)
+        )
+
+    async def aevaluate(self, original_text, ollama_output, task_type):
+        """
+        evaluate 的非同步版本，等待速率限制、重試退避與重複請求時都不佔用執行緒。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            dict: 包含評估結果的字典。
+        """
+        if self.review_cache is None or not self.initialized_successfully:
+            return await self._alimited_evaluate(original_text, ollama_output, task_type)
+        key = self.cache_key(original_text, ollama_output, task_type)
+        return await self.review_cache.aget_or_evaluate(
+            key, lambda: self._alimited_evaluate(original_text, ollama_output, task_type)
+        )
+
+    def _plan_batches(self, original_text, ollama_outputs, task_type):
+        """
+        找出批次評審中快取已有結果的輸出，並將其餘的不重複輸出分成批次。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): Ollama 模型的輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            tuple: (結果列表 (快取命中者已填入), 需要評審的輸出文字對應其位置列表的字典, 批次列表)。
+        """
+        use_cache = self.review_cache is not None and self.initialized_successfully
+        results = [None] * len(ollama_outputs)
+        pending = {} # 需要評審的輸出文字對應其在 ollama_outputs 中的位置
+        for index, output in enumerate(ollama_outputs):
+            if use_cache:
+                cached = self.review_cache.lookup(
+                    self.cache_key(original_text, output, task_type, packed=self.packs_batches)
+                )
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            pending.setdefault(output, []).append(index)
+        if use_cache and self.packs_batches and len(pending) == 1:
+            # 只剩一個輸出時以單一評審的提示詞評審，改查單一評審的快取
+            output = next(iter(pending))
+            cached = self.review_cache.lookup(self.cache_key(original_text, output, task_type))
+            if cached is not None:
+                for index in pending.pop(output):
+                    results[index] = cached
+        unique_outputs = list(pending)
+        batches = [
+            unique_outputs[start:start + self.max_batch]
+            for start in range(0, len(unique_outputs), self.max_batch)
+        ]
+        return results, pending, batches
+
+    def _apply_batch(self, original_text, task_type, results, pending, batch, evaluations):
+        """
+        將一個批次的評估資料填入結果列表，並保存到評審快取。
+        只有一個輸出的批次以單一評審的提示詞評審，結果保存在單一評審的快取鍵下。
+        """
+        use_cache = self.review_cache is not None and self.initialized_successfully
+        packed = self.packs_batches and len(batch) > 1
+        for output, evaluation in zip(batch, evaluations):
+            if use_cache:
+                self.review_cache.remember(
+                    self.cache_key(original_text, output, task_type, packed=packed),
+                    evaluation,
+                )
+            for index in pending[output]:
+                results[index] = evaluation
+
+    def evaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        評估同一份原文的多個輸出 (例如不同 Ollama 模型的輸出)。
+        快取中已有的結果直接沿用，完全相同的輸出只評審一次；
+        其餘輸出交給 _evaluate_many，支援打包評審的客戶端會在同一個請求中評審多個輸出。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): Ollama 模型的輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表，順序與 ollama_outputs 一致。
+        """
+        results, pending, batches = self._plan_batches(original_text, ollama_outputs, task_type)
+        for batch in batches:
+            evaluations = self._limited_evaluate_many(original_text, batch, task_type)
+            self._apply_batch(original_text, task_type, results, pending, batch, evaluations)
+        return results
+
+    async def aevaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        evaluate_many 的非同步版本；超過 max_batch 時各批次同時送出 (仍受速率限制器約束)。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): Ollama 模型的輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表，順序與 ollama_outputs 一致。
+        """
+        # 評審快取的查詢與寫入是同步的 SQLite 操作，在工作執行緒中執行，
+        # 不會阻塞共用事件迴圈上其他進行中的 HTTP 請求
+        results, pending, batches = await to_thread(
+            self._plan_batches, original_text, ollama_outputs, task_type
+        )
+        all_evaluations = await asyncio.gather(
+            *(self._alimited_evaluate_many(original_text, batch, task_type) for batch in batches)
+        )
+        for batch, evaluations in zip(batches, all_evaluations):
+            await to_thread(
+                self._apply_batch, original_text, task_type, results, pending, batch, evaluations
+            )
+        return results
+
+    def _limited_evaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        在速率限制內執行一次 (可能打包的) 批次評審。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): 不重複的輸出文字列表 (不超過 max_batch 個)。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表；重試用盡時每個輸出都回傳包含 'error' 鍵的字典。
+        """
+        if not self.packs_batches:
+            # 不支援打包的客戶端逐一評審，每個請求各自經過速率限制器
+            return [
+                self._limited_evaluate(original_text, output, task_type)
+                for output in ollama_outputs
+            ]
+        try:
+            if self.rate_limiter is None:
+                return self._evaluate_many(original_text, ollama_outputs, task_type)
+            return self.rate_limiter.call(
+                lambda: self._evaluate_many(original_text, ollama_outputs, task_type),
+                tokens=estimate_tokens(original_text)
+                + sum(estimate_tokens(output) for output in ollama_outputs),
+            )
+        except RetryableReviewerError as e:
+            error = {"error": f"{self.model_name} request failed after retries: {e}"}
+            return [dict(error) for _ in ollama_outputs]
+
+    def _limited_evaluate(self, original_text, ollama_output, task_type):
+        """
+        在速率限制內執行評審，並重試速率限制與暫時性錯誤。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            dict: 包含評估結果的字典；重試用盡時回傳包含 'error' 鍵的字典 (不會寫入快取)。
+        """
+        try:
+            if self.rate_limiter is None:
+                return self._evaluate(original_text, ollama_output, task_type)
+            return self.rate_limiter.call(
+                lambda: self._evaluate(original_text, ollama_output, task_type),
+                tokens=estimate_tokens(original_text) + estimate_tokens(ollama_output),
+            )
+        except RetryableReviewerError as e:
+            return {"error": f"{self.model_name} request failed after retries: {e}"}
+
+    async def _alimited_evaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        _limited_evaluate_many 的非同步版本。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): 不重複的輸出文字列表 (不超過 max_batch 個)。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表；重試用盡時每個輸出都回傳包含 'error' 鍵的字典。
+        """
+        if not self.packs_batches:
+            return list(
+                await asyncio.gather(
+                    *(
+                        self._alimited_evaluate(original_text, output, task_type)
+                        for output in ollama_outputs
+                    )
+                )
+            )
+        try:
+            if self.rate_limiter is None:
+                return await self._aevaluate_many(original_text, ollama_outputs, task_type)
+            return await self.rate_limiter.acall(
+                lambda: self._aevaluate_many(original_text, ollama_outputs, task_type),
+                tokens=estimate_tokens(original_text)
+                + sum(estimate_tokens(output) for output in ollama_outputs),
+            )
+        except RetryableReviewerError as e:
+            error = {"error": f"{self.model_name} request failed after retries: {e}"}
+            return [dict(error) for _ in ollama_outputs]
+
+    async def _alimited_evaluate(self, original_text, ollama_output, task_type):
+        """
+        _limited_evaluate 的非同步版本。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            dict: 包含評估結果的字典；重試用盡時回傳包含 'error' 鍵的字典。
+        """
+        try:
+            if self.rate_limiter is None:
+                return await self._aevaluate(original_text, ollama_output, task_type)
+            return await self.rate_limiter.acall(
+                lambda: self._aevaluate(original_text, ollama_output, task_type),
+                tokens=estimate_tokens(original_text) + estimate_tokens(ollama_output),
+            )
+        except RetryableReviewerError as e:
+            return {"error": f"{self.model_name} request failed after retries: {e}"}
+
+    def _evaluate(self, original_text, ollama_output, task_type):
+        """
+        執行實際的評審呼叫，由子類別實作。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            dict: 包含評估結果的字典。
+
+        Raises:
+            RateLimitError: 評審提供者回報超過速率限制時 (由速率限制器降低並行並重試)。
+            RetryableReviewerError: 發生可重試的暫時性錯誤時。
+        """
+        raise NotImplementedError
+
+    def _evaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        在同一個請求中評審多個輸出，由 packs_batches 為 True 的子類別實作。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): Ollama 模型的輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表，順序與 ollama_outputs 一致。
+        """
+        return [
+            self._evaluate(original_text, output, task_type) for output in ollama_outputs
+        ]
+
+    async def _aevaluate(self, original_text, ollama_output, task_type):
+        """
+        _evaluate 的非同步版本。預設在工作執行緒中執行同步的 _evaluate，
+        只實作同步介面的子類別 (例如模擬客戶端) 也能在事件迴圈中使用；
+        實際呼叫 HTTP API 的子類別應覆寫此方法，直接 await 共用的 HTTP 工作階段。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            dict: 包含評估結果的字典。
+        """
+        return await to_thread(self._evaluate, original_text, ollama_output, task_type)
+
+    async def _aevaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        _evaluate_many 的非同步版本，預設在工作執行緒中執行同步的 _evaluate_many。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): Ollama 模型的輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表，順序與 ollama_outputs 一致。
+        """
+        return await to_thread(self._evaluate_many, original_text, ollama_outputs, task_type)
 
 
 class OpenAIReviewerClient(BaseReviewerClient):
@@ -34,6 +604,8 @@ class OpenAIReviewerClient(BaseReviewerClient):
     使用 OpenAI 模型進行評審的客戶端。
     這是一個模擬客戶端。
     """
+    provider = "gpt"  # 評審提供者名稱
+
     def __init__(self, api_key, model_name):
         """
         初始化 OpenAI 評審客戶端。
@@ -55,7 +627,7 @@ class OpenAIReviewerClient(BaseReviewerClient):
                 f"MockOpenAIReviewerClient ({model_name}) not initialized (API key is placeholder)."
             )
 
-    def evaluate(self, original_text, ollama_output, task_type):
+    def _evaluate(self, original_text, ollama_output, task_type):
         """
         使用 OpenAI 模型評估 Ollama 模型的輸出。
         這是一個模擬方法。
@@ -86,6 +658,8 @@ class GeminiReviewerClient(BaseReviewerClient):
     使用 Google Gemini 模型進行評審的客戶端。
     這是一個模擬客戶端。
     """
+    provider = "gemini"  # 評審提供者名稱
+
     def __init__(self, api_key, model_name):
         """
         初始化 Gemini 評審客戶端。
@@ -107,7 +681,7 @@ class GeminiReviewerClient(BaseReviewerClient):
                 f"MockGeminiReviewerClient ({model_name}) not initialized (API key is placeholder)."
             )
 
-    def evaluate(self, original_text, ollama_output, task_type):
+    def _evaluate(self, original_text, ollama_output, task_type):
         """
         使用 Gemini 模型評估 Ollama 模型的輸出。
         這是一個模擬方法。
@@ -140,6 +714,8 @@ class DeepSeekReviewerClient(BaseReviewerClient):
     使用 DeepSeek 模型進行評審的客戶端。
     這是一個模擬客戶端，且假設總是成功初始化。
     """
+    provider = "deepseek"  # 評審提供者名稱
+
     def __init__(self, api_key, model_name):
         """
         初始化 DeepSeek 評審客戶端。
@@ -154,7 +730,7 @@ class DeepSeekReviewerClient(BaseReviewerClient):
             f"MockDeepSeekReviewerClient ({model_name}) initialized (always active for mock)."
         )
 
-    def evaluate(self, original_text, ollama_output, task_type):
+    def _evaluate(self, original_text, ollama_output, task_type):
         """
         使用 DeepSeek 模型評估 Ollama 模型的輸出。
         這是一個模擬方法。
@@ -176,3 +752,365 @@ class DeepSeekReviewerClient(BaseReviewerClient):
             "overall_score": 3.8, # 模擬的總體評分
             "comment": f"Mock DeepSeek review for {task_type}: {ollama_output[:20]}...", # 模擬的評論
         }
+
+
+# 各任務類型要求評審給出的分項評分，與報告中顯示的評分項目一致
+REVIEW_SCORE_KEYS = {
+    "translate": ["accuracy_score", "fluency_score", "traditional_chinese_usage_score"],
+    "summarize": [
+        "relevance_score",
+        "completeness_score",
+        "conciseness_score",
+        "language_expression_score",
+    ],
+}
+# 評審提示詞的任務說明
+REVIEW_TASK_DESCRIPTIONS = {
+    "translate": "The candidate translates the source text into Traditional Chinese.",
+    "summarize": "The candidate summarizes the source text in Traditional Chinese.",
+}
+
+
+def build_review_messages(task_type, original_text, ollama_output) -> list:
+    """
+    建立要求評審以 JSON 回覆評分的 Chat Completions 訊息。
+
+    Args:
+        task_type (str): 任務類型。
+        original_text (str): 原始輸入文字。
+        ollama_output (str): Ollama 模型的輸出文字。
+
+    Returns:
+        list: Chat Completions API 的訊息列表。
+    """
+    keys = REVIEW_SCORE_KEYS.get(task_type, [])
+    schema = ", ".join(f'"{key}": <1-5>' for key in keys)
+    system = (
+        "You are a strict evaluator of Traditional Chinese language output. "
+        f"{REVIEW_TASK_DESCRIPTIONS.get(task_type, '')} "
+        "Score each criterion from 1 (poor) to 5 (excellent) and reply with a single JSON object: "
+        f'{{"overall_score": <1-5>, {schema}, "comment": "<one or two sentences>"}}'
+    )
+    user = f"Source text:\n{original_text}\n\nCandidate output:\n{ollama_output}"
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+def packed_candidate_order(original_text, ollama_outputs) -> list:
+    """
+    決定打包評審中候選輸出的排列順序。
+    評審模型容易偏好特定位置的候選，固定依模型順序排列會讓同一個模型每次都在同一個位置；
+    這裡以原文與所有輸出為種子打亂順序，不同記錄的位置各不相同，同一個請求則每次都相同 (可重現)。
+
+    Args:
+        original_text (str): 原始輸入文字。
+        ollama_outputs (list): 候選輸出文字列表。
+
+    Returns:
+        list: 呈現給評審的順序，第 i 個元素為第 i 個候選在 ollama_outputs 中的位置。
+    """
+    order = list(range(len(ollama_outputs)))
+    seed = text_hash("\0".join([original_text, *ollama_outputs]))
+    random.Random(seed).shuffle(order)
+    return order
+
+
+def build_packed_review_messages(task_type, original_text, ollama_outputs) -> list:
+    """
+    建立在同一個請求中評審多個候選輸出的 Chat Completions 訊息。
+    原文只出現一次，每個候選輸出以編號標示，評審需依編號回覆各自的評分。
+
+    Args:
+        task_type (str): 任務類型。
+        original_text (str): 原始輸入文字。
+        ollama_outputs (list): 候選輸出文字列表。
+
+    Returns:
+        list: Chat Completions API 的訊息列表。
+    """
+    keys = REVIEW_SCORE_KEYS.get(task_type, [])
+    schema = ", ".join(f'"{key}": <1-5>' for key in keys)
+    system = (
+        "You are a strict evaluator of Traditional Chinese language output. "
+        f"{REVIEW_TASK_DESCRIPTIONS.get(task_type, '')} "
+        "Several candidates for the same source text follow. Judge each candidate on its own merits "
+        "against the source, scoring each criterion from 1 (poor) to 5 (excellent). "
+        "Reply with a single JSON object: "
+        f'{{"candidates": [{{"candidate": <number>, "overall_score": <1-5>, {schema}, '
+        '"comment": "<one or two sentences>"}, ...]} with exactly one entry per candidate.'
+    )
+    candidates = "\n\n".join(
+        f"Candidate {number}:\n{output}" for number, output in enumerate(ollama_outputs, start=1)
+    )
+    user = f"Source text:\n{original_text}\n\n{candidates}"
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+def split_packed_review(content: str, count: int) -> list:
+    """
+    將打包評審的回應拆回每個候選輸出的評估資料。
+
+    Args:
+        content (str): 評審模型回覆的文字。
+        count (int): 候選輸出的數量。
+
+    Returns:
+        list: 長度為 count 的評估資料列表；缺少或無法解析的候選回傳包含 'error' 鍵的字典。
+    """
+    parsed = parse_review_content(content)
+    entries = parsed.get("candidates") if isinstance(parsed, dict) else None
+    if not isinstance(entries, list):
+        error = parsed.get("error") or "Packed review response has no 'candidates' list"
+        return [{"error": error} for _ in range(count)]
+    results = [None] * count
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        number = entry.pop("candidate", position + 1)
+        if isinstance(number, int) and 1 <= number <= count and results[number - 1] is None:
+            results[number - 1] = entry
+    return [
+        result if result is not None else {"error": f"Candidate {index + 1} missing from packed review"}
+        for index, result in enumerate(results)
+    ]
+
+
+def parse_review_content(content: str) -> dict:
+    """
+    從評審回應內容中解析評分 JSON。
+
+    Args:
+        content (str): 評審模型回覆的文字。
+
+    Returns:
+        dict: 評估資料；無法解析時回傳包含 'error' 鍵的字典。
+    """
+    match = re.search(r"\{.*\}", content or "", re.DOTALL)
+    if match:
+        try:
+            evaluation = json.loads(match.group(0))
+            if isinstance(evaluation, dict):
+                return evaluation
+        except json.JSONDecodeError:
+            pass
+    return {"error": f"Unparseable review response: {(content or '')[:100]}"}
+
+
+def parse_retry_after(value):
+    """
+    解析 HTTP Retry-After 標頭。
+
+    Args:
+        value (str or None): 秒數或 HTTP 日期格式的標頭值。
+
+    Returns:
+        float or None: 建議的等待秒數；沒有或無法解析時回傳 None。
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class OpenAICompatibleReviewerClient(BaseReviewerClient):
+    """
+    呼叫 OpenAI 相容 Chat Completions API (/chat/completions) 的評審客戶端。
+    可用於 OpenAI、DeepSeek 或任何相容的服務；HTTP 429 會引發 RateLimitError，
+    HTTP 5xx 與連線錯誤會引發 RetryableReviewerError，由速率限制器重試。
+    批次評審時同一份原文的多個輸出會打包在同一個請求中。
+    請求經過所有客戶端共用的 HTTP 工作階段 (見 http_session)，同一服務的連線 (與 TLS 交握)
+    在請求之間重複使用；同步方法提交到工作階段的事件迴圈執行。
+    """
+    packs_batches = True  # _evaluate_many 將多個輸出放入同一個評審請求
+
+    def __init__(
+        self, api_key, model_name, base_url, provider="openai_compatible", timeout=120, session=None
+    ):
+        """
+        初始化 OpenAI 相容評審客戶端。
+
+        Args:
+            api_key (str): API 金鑰。
+            model_name (str): 評審模型的名稱。
+            base_url (str): API 基礎位址，例如 "https://api.openai.com/v1"。
+            provider (str, optional): 評審提供者名稱，與 config 中 REVIEWER_MODELS 的鍵一致。
+            timeout (float, optional): 連線與讀取逾時 (秒)。
+            session (AsyncHTTPSession, optional): 使用的 HTTP 工作階段，預設為行程內共用的工作階段。
+        """
+        super().__init__(api_key, model_name) # 呼叫基礎類別的初始化方法
+        self.provider = provider # 評審提供者名稱
+        self.base_url = base_url.rstrip("/") # API 基礎位址
+        self.timeout = timeout # 連線與讀取逾時
+        self._session = session
+        # 檢查 API 金鑰是否提供且不是預留位置
+        if api_key and not api_key.startswith("YOUR_"):
+            self.initialized_successfully = True # 標記為成功初始化
+            logging.info(f"OpenAICompatibleReviewerClient ({model_name}) initialized for {self.base_url}.")
+        else:
+            logging.info(
+                f"OpenAICompatibleReviewerClient ({model_name}) not initialized (API key is placeholder)."
+            )
+
+    @property
+    def session(self):
+        """
+        Returns:
+            AsyncHTTPSession: 此客戶端使用的 HTTP 工作階段。
+        """
+        return self._session if self._session is not None else get_session()
+
+    async def _apost(self, path: str, payload: dict) -> dict:
+        """
+        送出 JSON POST 請求。
+
+        Args:
+            path (str): 相對於基礎位址的 API 路徑。
+            payload (dict): 請求內容。
+
+        Returns:
+            dict: 解析後的 JSON 回應。
+
+        Raises:
+            RateLimitError: HTTP 429。
+            RetryableReviewerError: HTTP 5xx 或連線錯誤。
+            RuntimeError: 其他非 200 狀態碼。
+        """
+        try:
+            response = await self.session.request(
+                "POST",
+                self.base_url + path,
+                json.dumps(payload).encode("utf-8"),
+                {
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+                self.timeout,
+            )
+        except OSError as e:
+            raise RetryableReviewerError(f"{self.base_url} connection error: {e}")
+        if response.status == 429:
+            raise RateLimitError(
+                f"HTTP 429 from {self.base_url}",
+                retry_after=parse_retry_after(response.headers.get("retry-after")),
+            )
+        if response.status >= 500:
+            raise RetryableReviewerError(
+                f"HTTP {response.status} from {self.base_url}",
+                retry_after=parse_retry_after(response.headers.get("retry-after")),
+            )
+        body = response.text()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status} from {self.base_url}: {body[:200]}")
+        return json.loads(body)
+
+    def _post(self, path: str, payload: dict) -> dict:
+        """
+        _apost 的同步版本。
+
+        Args:
+            path (str): 相對於基礎位址的 API 路徑。
+            payload (dict): 請求內容。
+
+        Returns:
+            dict: 解析後的 JSON 回應。
+        """
+        return self.session.run(self._apost(path, payload))
+
+    async def _aevaluate(self, original_text, ollama_output, task_type):
+        """
+        以 Chat Completions API 評估 Ollama 模型的輸出。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            dict: 包含評估結果的字典；非暫時性錯誤時回傳包含 'error' 鍵的字典。
+        """
+        if not self.initialized_successfully:
+            return {"error": f"{self.model_name} client not initialized or API key missing."}
+        payload = {
+            "model": self.model_name,
+            "messages": build_review_messages(task_type, original_text, ollama_output),
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+        }
+        try:
+            response = await self._apost("/chat/completions", payload)
+            content = response["choices"][0]["message"]["content"]
+        except (RuntimeError, KeyError, IndexError, ValueError) as e:
+            return {"error": f"{self.model_name} review failed: {e}"}
+        return parse_review_content(content)
+
+    def _evaluate(self, original_text, ollama_output, task_type):
+        """
+        _aevaluate 的同步版本。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_output (str): Ollama 模型的輸出文字。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            dict: 包含評估結果的字典。
+        """
+        return self.session.run(self._aevaluate(original_text, ollama_output, task_type))
+
+    async def _aevaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        以單一 Chat Completions 請求評審同一份原文的多個輸出。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): Ollama 模型的輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表，順序與 ollama_outputs 一致。
+        """
+        if not self.initialized_successfully:
+            error = {"error": f"{self.model_name} client not initialized or API key missing."}
+            return [dict(error) for _ in ollama_outputs]
+        if len(ollama_outputs) == 1:
+            return [await self._aevaluate(original_text, ollama_outputs[0], task_type)]
+        # 候選以打亂後的順序呈現，避免評審的位置偏好總是落在同一個模型上
+        order = packed_candidate_order(original_text, ollama_outputs)
+        payload = {
+            "model": self.model_name,
+            "messages": build_packed_review_messages(
+                task_type, original_text, [ollama_outputs[index] for index in order]
+            ),
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+        }
+        try:
+            response = await self._apost("/chat/completions", payload)
+            content = response["choices"][0]["message"]["content"]
+        except (RuntimeError, KeyError, IndexError, ValueError) as e:
+            error = {"error": f"{self.model_name} review failed: {e}"}
+            return [dict(error) for _ in ollama_outputs]
+        # 依呈現順序拆出的評估資料放回各輸出原本的位置
+        results = [None] * len(ollama_outputs)
+        for evaluation, index in zip(split_packed_review(content, len(order)), order):
+            results[index] = evaluation
+        return results
+
+    def _evaluate_many(self, original_text, ollama_outputs, task_type) -> list:
+        """
+        _aevaluate_many 的同步版本。
+
+        Args:
+            original_text (str): 原始輸入文字。
+            ollama_outputs (list): Ollama 模型的輸出文字列表。
+            task_type (str): 執行的任務類型。
+
+        Returns:
+            list: 評估資料列表，順序與 ollama_outputs 一致。
+        """
+        return self.session.run(self._aevaluate_many(original_text, ollama_outputs, task_type))
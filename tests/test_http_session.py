@@ -0,0 +1,301 @@
+# test_http_session.py
+# http_session 標準函式庫後端的單元測試：回應內容框架 (Content-Length、chunked、讀到連線關閉)、
+# 連線池的重複使用與關閉，以及 stream_lines 的逐行切分。
+# 以 python -m unittest discover tests 或 pytest 執行，不需要網路 (測試伺服器只監聽 127.0.0.1)。
+
+import asyncio
+import os
+import socketserver
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_session import AsyncHTTPSession, HTTPStatusError, _Connection, _Response  # noqa: E402
+
+
+def _response_for(raw: bytes, method: str = "GET"):
+    """
+    以記憶體中的串流建立 _Response，依原始回應 (狀態列、標頭與內容) 解析標頭。
+
+    Returns:
+        _Response: 讀取位置在內容開頭的回應。
+    """
+    reader = asyncio.StreamReader()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    reader.feed_data(body)
+    reader.feed_eof()
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return _Response(_Connection(reader, None), int(lines[0].split()[1]), headers, method, 5)
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class ResponseFramingTest(unittest.TestCase):
+    def read_all(self, raw: bytes, method: str = "GET"):
+        async def read():
+            response = _response_for(raw, method)
+            return response, await response.read()
+
+        return _run(read())
+
+    def test_content_length(self):
+        response, data = self.read_all(b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhello")
+        self.assertEqual(data, b"hello")
+        self.assertTrue(response.complete)
+        self.assertTrue(response.keep_alive)
+
+    def test_content_length_stops_at_boundary(self):
+        # 同一條連線上的下一個回應不能被當作本次內容讀走
+        async def read():
+            response = _response_for(b"HTTP/1.1 200 OK\r\nContent-Length: 3\r\n\r\nabcHTTP/1.1 204")
+            return await response.read(), await response.connection.reader.read()
+
+        self.assertEqual(_run(read()), (b"abc", b"HTTP/1.1 204"))
+
+    def test_content_length_truncated(self):
+        async def read():
+            await _response_for(b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nshort").read()
+
+        with self.assertRaises(ConnectionError):
+            _run(read())
+
+    def test_chunked(self):
+        raw = (
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"4\r\nWiki\r\n"
+            b"5;ext=1\r\npedia\r\n"
+            b"E\r\n in\r\n\r\nchunks.\r\n"
+            b"0\r\nX-Trailer: yes\r\n\r\n"
+        )
+        response, data = self.read_all(raw)
+        self.assertEqual(data, b"Wikipedia in\r\n\r\nchunks.")
+        self.assertTrue(response.complete)
+        self.assertTrue(response.keep_alive)
+
+    def test_chunked_truncated(self):
+        async def read():
+            await _response_for(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nab").read()
+
+        with self.assertRaises(ConnectionError):
+            _run(read())
+
+    def test_read_until_close(self):
+        response, data = self.read_all(b"HTTP/1.1 200 OK\r\n\r\nuntil the end")
+        self.assertEqual(data, b"until the end")
+        self.assertTrue(response.complete)
+        # 沒有長度資訊的回應讀到連線關閉為止，連線不能重複使用
+        self.assertFalse(response.keep_alive)
+
+    def test_no_body(self):
+        for raw, method in (
+            (b"HTTP/1.1 204 No Content\r\n\r\n", "GET"),
+            (b"HTTP/1.1 304 Not Modified\r\n\r\n", "GET"),
+            (b"HTTP/1.1 200 OK\r\nContent-Length: 42\r\n\r\n", "HEAD"),
+        ):
+            response, data = self.read_all(raw, method)
+            self.assertEqual(data, b"")
+            self.assertTrue(response.complete)
+
+    def test_connection_close_header(self):
+        response, data = self.read_all(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok")
+        self.assertEqual(data, b"ok")
+        self.assertFalse(response.keep_alive)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    依序處理同一條連線上的請求，回應由測試伺服器的 respond(path) 決定。
+    """
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        try:
+            while True:
+                request_line = self.rfile.readline()
+                if not request_line:
+                    return
+                length = 0
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = self.rfile.read(length) if length else b""
+                path = request_line.split()[1].decode("latin-1")
+                with server.lock:
+                    server.requests.append((path, body))
+                for part in server.respond(path):
+                    self.wfile.write(part)
+                    self.wfile.flush()
+                if path.startswith("/close"):
+                    return
+        except OSError:
+            return
+        finally:
+            with server.lock:
+                server.closed += 1
+
+
+class _TestServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, respond):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.respond = respond  # 路徑對應回應片段 (依序寫入並送出)
+        self.lock = threading.Lock()
+        self.connections = 0  # 已接受的連線數量
+        self.closed = 0  # 已結束的連線數量
+        self.requests = []  # (路徑, 請求內容)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+def _respond(path: str):
+    if path.startswith("/lines"):
+        # 每一行都刻意跨越 chunk 邊界，最後一行沒有換行字元
+        return [
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n",
+            b"7\r\n{\"a\":1}\r\n",
+            b"5\r\n\n{\"b\"\r\n",
+            b"4\r\n:2}\n\r\n",
+            b"1\r\n\n\r\n",
+            b"7\r\n{\"c\":3}\r\n",
+            b"0\r\n\r\n",
+        ]
+    if path.startswith("/missing"):
+        return [b"HTTP/1.1 404 Not Found\r\nContent-Length: 9\r\n\r\nnot found"]
+    if path.startswith("/close"):
+        return [b"HTTP/1.1 200 OK\r\nContent-Length: 3\r\nConnection: close\r\n\r\nbye"]
+    if path.startswith("/big"):
+        body = b"x" * 200000
+        return [b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body), body]
+    return [b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"]
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self.server = _TestServer(_respond)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        self.session = AsyncHTTPSession(max_connections=4, max_keepalive=2, timeout=5, use_httpx=False)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(5)
+
+    def wait_closed(self, count: int):
+        # 伺服器的處理執行緒在讀到 EOF 後才會記錄連線結束
+        for _ in range(200):
+            with self.server.lock:
+                if self.server.closed >= count:
+                    return
+            threading.Event().wait(0.01)
+        self.fail(f"expected {count} closed connections, got {self.server.closed}")
+
+    def request(self, path: str, method: str = "GET", body=None):
+        return self.session.run(self.session.request(method, self.server.url(path), body))
+
+    def collect(self, generator):
+        async def collect():
+            return [item async for item in generator]
+
+        return self.session.run(collect())
+
+    def test_keep_alive_reuses_connection(self):
+        for _ in range(5):
+            result = self.request("/ok")
+            self.assertEqual((result.status, result.body), (200, b"ok"))
+        self.request("/big")
+        self.request("/post", "POST", b"payload")
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.requests[-1], ("/post", b"payload"))
+
+    def test_connection_close_is_not_reused(self):
+        self.assertEqual(self.request("/close").body, b"bye")
+        self.assertEqual(self.request("/ok").body, b"ok")
+        self.assertEqual(self.server.connections, 2)
+
+    def test_concurrent_requests_bounded_by_pool(self):
+        # 閒置連線上限等於連線上限時所有連線都會被保留，總連線數量即為同時開啟的最大數量
+        self.session.close()
+        self.session = AsyncHTTPSession(max_connections=4, max_keepalive=4, timeout=5, use_httpx=False)
+
+        async def many():
+            return await asyncio.gather(
+                *(self.session.request("GET", self.server.url("/big")) for _ in range(10))
+            )
+
+        results = self.session.run(many())
+        self.assertTrue(all(len(result.body) == 200000 for result in results))
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_stale_idle_connection_is_retried(self):
+        self.request("/ok")
+        # 伺服器端關閉閒置連線後，下一個請求改用新連線重試
+        with self.server.lock:
+            opened = self.server.connections
+        for pool in self.session._stdlib._pools.values():
+            for connection in pool._idle:
+                connection.writer.transport.abort()
+        self.assertEqual(self.request("/ok").body, b"ok")
+        self.assertEqual(self.server.connections, opened + 1)
+
+    def test_close_closes_idle_connections(self):
+        self.request("/ok")
+        self.assertEqual(self.server.closed, 0)
+        self.session.close()
+        self.wait_closed(1)
+        with self.assertRaises(RuntimeError):
+            self.session.loop()
+
+    def test_stream_lines(self):
+        lines = self.collect(self.session.stream_lines("GET", self.server.url("/lines")))
+        self.assertEqual(lines, [b'{"a":1}', b'{"b":2}', b"", b'{"c":3}'])
+        # 完整讀取的串流會將連線放回連線池
+        self.request("/ok")
+        self.assertEqual(self.server.connections, 1)
+
+    def test_stream_status_error(self):
+        with self.assertRaises(HTTPStatusError) as caught:
+            self.collect(self.session.stream("GET", self.server.url("/missing")))
+        self.assertEqual((caught.exception.result.status, caught.exception.result.body), (404, b"not found"))
+        # 錯誤回應的內容已讀完，連線仍可重複使用
+        self.request("/ok")
+        self.assertEqual(self.server.connections, 1)
+
+    def test_abandoned_stream_is_not_reused(self):
+        async def first_chunk():
+            stream = self.session.stream("GET", self.server.url("/big"))
+            try:
+                return await stream.__anext__()
+            finally:
+                await stream.aclose()
+
+        self.assertTrue(self.session.run(first_chunk()))
+        self.wait_closed(1)
+        self.assertEqual(self.request("/ok").body, b"ok")
+        self.assertEqual(self.server.connections, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
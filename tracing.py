@@ -0,0 +1,316 @@
+# tracing.py
+# 此檔案包含日誌設定與各階段的追蹤 (span) 工具。
+# - setup_logging: 統一的 logging 設定，由程式進入點 (main.py、bench.py) 呼叫一次。
+# - Tracer: 記錄每個 span 的名稱、開始時間、耗時、執行緒與屬性 (模型、任務、位元組數等)，
+#   在 span 結束時立即串流寫入 JSONL 追蹤檔案與 Chrome trace (Perfetto 可開啟) 檔案。
+# - span: 模組層級的便利函數；未啟用追蹤時為幾乎沒有成本的空操作。
+# - run_profiled: 以 cProfile 剖析整個執行 (包含所有工作執行緒)。
+
+import contextvars  # 用於記錄每個執行緒與每個非同步工作的 span 堆疊
+import cProfile  # 用於 --profile 剖析
+import io  # 用於將剖析摘要輸出為字串
+import json  # 用於序列化 span
+import logging  # 用於記錄程式運行訊息
+import os  # 用於取得行程識別碼與建立輸出目錄
+import pstats  # 用於合併與排序剖析結果
+import sys  # 用於判斷 Python 版本與設定執行緒的剖析函數
+import threading  # 用於保護檔案寫入與取得執行緒名稱
+import time  # 用於量測 span 的開始時間與耗時
+
+# 統一的日誌格式
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def setup_logging(level=logging.INFO):
+    """
+    設定根 logger 的層級與格式。各模組只取得 logger 並記錄訊息，不各自設定。
+
+    Args:
+        level (int, optional): 日誌層級。
+    """
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+
+def _open_output(path: str):
+    """
+    建立輸出目錄並開啟追蹤檔案。
+
+    Args:
+        path (str): 檔案路徑。
+
+    Returns:
+        file: 以 UTF-8 寫入模式開啟的檔案。
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return open(path, "w", encoding="utf-8")
+
+
+class Span:
+    """
+    單一追蹤區段。以 Tracer.span 建立，並作為 context manager 使用。
+    """
+
+    __slots__ = ("tracer", "name", "attrs", "parent", "start_ns", "span_id")
+
+    def __init__(self, tracer, name: str, attrs: dict):
+        """
+        Args:
+            tracer (Tracer): 建立此 span 的追蹤器。
+            name (str): span 名稱，例如 "generate"、"evaluate"、"report.write"。
+            attrs (dict): span 屬性。
+        """
+        self.tracer = tracer  # 建立此 span 的追蹤器
+        self.name = name  # span 名稱
+        self.attrs = attrs  # span 屬性
+        self.parent = None  # 同一執行緒 (或同一非同步工作) 中外層 span 的識別碼
+        self.start_ns = None  # 開始時間 (奈秒，相對於追蹤器建立時間)
+        self.span_id = None  # span 識別碼
+
+    def set(self, key: str, value):
+        """
+        新增或更新 span 屬性，例如在 span 結束前才得知的輸出位元組數。
+
+        Args:
+            key (str): 屬性名稱。
+            value: 屬性值 (需可序列化為 JSON)。
+        """
+        self.attrs[key] = value
+
+    def __enter__(self):
+        self.tracer._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc_value}"
+        self.tracer._exit(self)
+        return False
+
+
+class _NoopSpan:
+    """
+    未啟用追蹤時使用的空 span。
+    """
+
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    追蹤器類別。
+    span 結束時立即寫出，記憶體用量與 span 數量無關：
+    - JSONL：每行一個 span，包含 name、start_s、duration_s、thread、span_id、parent 與 attrs。
+    - Chrome trace：Trace Event Format 的 JSON 陣列 (完整事件 "ph": "X")，
+      可在 chrome://tracing 或 https://ui.perfetto.dev 開啟。
+    """
+
+    def __init__(self, jsonl_path=None, chrome_path=None):
+        """
+        Args:
+            jsonl_path (str, optional): JSONL 追蹤檔案路徑。
+            chrome_path (str, optional): Chrome trace 檔案路徑。
+        """
+        self.jsonl_path = jsonl_path  # JSONL 追蹤檔案路徑
+        self.chrome_path = chrome_path  # Chrome trace 檔案路徑
+        self.count = 0  # 已寫出的 span 數量
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+        # _stack: 目前的 span 堆疊 (tuple)；ContextVar 讓每個執行緒與每個 asyncio 工作各有獨立的堆疊，
+        # 在共用事件迴圈中交錯執行的協程不會互相成為外層 span
+        self._stack = contextvars.ContextVar(f"tracer_stack_{id(self)}", default=())
+        self._lock = threading.Lock()
+        self._jsonl = _open_output(jsonl_path) if jsonl_path else None
+        self._chrome = _open_output(chrome_path) if chrome_path else None
+        self._chrome_events = 0  # 已寫入 Chrome trace 的事件數量
+        self._thread_names = {}  # 執行緒識別碼對應名稱，用於 Chrome trace 的中繼資料
+        if self._chrome is not None:
+            self._chrome.write("[\n")
+
+    def span(self, name: str, **attrs) -> Span:
+        """
+        建立 span。
+
+        Args:
+            name (str): span 名稱。
+            **attrs: span 屬性。
+
+        Returns:
+            Span: 以 with 陳述式使用的 span。
+        """
+        return Span(self, name, attrs)
+
+    def _enter(self, span: Span):
+        stack = self._stack.get()
+        span.parent = stack[-1].span_id if stack else None
+        with self._lock:
+            self.count += 1
+            span.span_id = self.count
+        self._stack.set(stack + (span,))
+        span.start_ns = time.perf_counter_ns() - self._origin_ns
+
+    def _exit(self, span: Span):
+        duration_ns = time.perf_counter_ns() - self._origin_ns - span.start_ns
+        stack = self._stack.get()
+        if stack and stack[-1] is span:
+            self._stack.set(stack[:-1])
+        thread = threading.current_thread()
+        with self._lock:
+            if self._jsonl is not None:
+                record = {
+                    "name": span.name,  # span 名稱
+                    "span_id": span.span_id,  # span 識別碼
+                    "parent": span.parent,  # 外層 span 識別碼
+                    "start_s": span.start_ns / 1e9,  # 開始時間 (秒，相對於追蹤開始)
+                    "duration_s": duration_ns / 1e9,  # 耗時 (秒)
+                    "thread": thread.name,  # 執行緒名稱
+                    "attrs": span.attrs,  # span 屬性
+                }
+                self._jsonl.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            if self._chrome is not None:
+                self._thread_names[thread.ident] = thread.name
+                self._write_chrome_event(
+                    {
+                        "name": span.name,
+                        "ph": "X",
+                        "ts": span.start_ns / 1000,  # 開始時間 (微秒)
+                        "dur": duration_ns / 1000,  # 耗時 (微秒)
+                        "pid": self._pid,
+                        "tid": thread.ident,
+                        "args": span.attrs,
+                    }
+                )
+
+    def _write_chrome_event(self, event: dict):
+        """
+        在持有鎖的情況下寫入一個 Chrome trace 事件。
+
+        Args:
+            event (dict): Trace Event Format 事件。
+        """
+        if self._chrome_events:
+            self._chrome.write(",\n")
+        self._chrome.write(json.dumps(event, ensure_ascii=False, default=str))
+        self._chrome_events += 1
+
+    def close(self):
+        """
+        完成並關閉追蹤檔案。
+        """
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+            if self._chrome is not None:
+                # 寫入執行緒名稱的中繼資料後結束 JSON 陣列
+                for tid, name in self._thread_names.items():
+                    self._write_chrome_event(
+                        {
+                            "name": "thread_name",
+                            "ph": "M",
+                            "pid": self._pid,
+                            "tid": tid,
+                            "args": {"name": name},
+                        }
+                    )
+                self._chrome.write("\n]\n")
+                self._chrome.close()
+                self._chrome = None
+        logging.info(f"Trace: {self.count} spans written")
+
+
+# 目前啟用的追蹤器；None 表示未啟用追蹤
+_tracer = None
+
+
+def set_tracer(tracer):
+    """
+    設定全域追蹤器。
+
+    Args:
+        tracer (Tracer or None): 要啟用的追蹤器；None 表示停用追蹤。
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def span(name: str, **attrs):
+    """
+    以全域追蹤器建立 span；未啟用追蹤時回傳空 span。
+
+    Args:
+        name (str): span 名稱。
+        **attrs: span 屬性。
+
+    Returns:
+        Span or _NoopSpan: 以 with 陳述式使用的 span。
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP_SPAN
+    return tracer.span(name, **attrs)
+
+
+def run_profiled(fn, output_path: str, top: int = 25):
+    """
+    以 cProfile 剖析 fn 的執行，將結果寫入 pstats 檔案並記錄累計耗時最高的函數。
+    Python 3.12 之前 cProfile 只記錄啟用它的執行緒，因此為執行期間建立的每個執行緒
+    各啟用一個 profiler，結束後合併。
+
+    Args:
+        fn (callable): 不帶參數的函數。
+        output_path (str): pstats 檔案路徑 (可用 snakeviz 或 python -m pstats 檢視)。
+        top (int, optional): 記錄到日誌的函數數量。
+
+    Returns:
+        任何型別: fn 的回傳值。
+    """
+    profiles = [cProfile.Profile()]
+    if sys.version_info < (3, 12):
+        profiles_lock = threading.Lock()
+
+        def start_thread_profile(frame, event, arg):
+            # 新執行緒的第一個事件：改用此執行緒專屬的 profiler
+            sys.setprofile(None)
+            profile = cProfile.Profile()
+            with profiles_lock:
+                profiles.append(profile)
+            profile.enable()
+
+        threading.setprofile(start_thread_profile)
+    profiles[0].enable()
+    try:
+        return fn()
+    finally:
+        profiles[0].disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # 沒有任何紀錄的 profiler (執行緒尚未執行任何函數)
+                continue
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        stats.dump_stats(output_path)
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats("cumulative").print_stats(top)
+        logging.info(
+            f"Profile ({len(profiles)} threads) saved to {output_path}\n{summary.getvalue()}"
+        )